@@ -0,0 +1,47 @@
+"""Wire codec throughput on typical payloads
+
+    python bench/codec.py
+
+Payloads: assist request carrying a whole file buffer, completion response
+with a large proposal list and lint response with many diagnostics.
+"""
+import time
+
+from supp import codec
+
+
+def payloads():
+    source = '\n'.join('def func{0}(arg):\n    return arg + {0}\n'.format(i)
+                       for i in range(5000))
+    names = ['name_{}'.format(i) for i in range(3000)]
+    rows = [('W01', 'Unused name: value{}'.format(i), i, 4) for i in range(2000)]
+    return [
+        ('request', (1, 'assist', (source, [5000, 10], '/path/to/module.py'), {})),
+        ('completion', (1, ('', names), True)),
+        ('lint', (1, rows, True)),
+    ]
+
+
+def measure(codec, obj, number):
+    start = time.time()
+    for _ in range(number):
+        data = codec.dumps(obj)
+    dumps = (time.time() - start) / number
+
+    start = time.time()
+    for _ in range(number):
+        codec.loads(data)
+    loads = (time.time() - start) / number
+    return len(data), dumps, loads
+
+
+def main():
+    for name, obj in payloads():
+        for c in codec.available():
+            size, dumps, loads = measure(c, obj, 20)
+            print('{:<12} {:<12} {:>8} bytes  dumps {:7.3f} ms  loads {:7.3f} ms'.format(
+                name, c.name, size, dumps * 1000, loads * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Per keystroke cost of full source vs document delta calls
+
+    python bench/delta.py [functions]
+
+Types an identifier inside a large module through a real server and calls
+assist after every keystroke, either sending the whole buffer or syncing
+it with ``doc_change`` edits.
+"""
+import sys
+import time
+
+from supp.remote import Environment
+from supp.document import text_edits
+
+sys.path.insert(0, 'bench')
+from incremental import make_source
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    lines = make_source(functions)
+    line = len(lines) // 2 // 6 * 6 + 4
+    lines.insert(line, '    ')
+    word = 'value_with_long_name'
+
+    env = Environment()
+    env.configure({'sources': ['.']})
+
+    texts = []
+    for i in range(1, len(word) + 1):
+        current = lines[:]
+        current[line] = '    ' + word[:i]
+        texts.append('\n'.join(current))
+
+    start = time.time()
+    for i, text in enumerate(texts):
+        env.assist(text, (line + 1, 5 + i), 'bench.py')
+    full = (time.time() - start) / len(texts)
+
+    prev = '\n'.join(lines)
+    env.doc_open('bench.py', prev)
+    start = time.time()
+    sent = 0
+    for i, text in enumerate(texts):
+        edits = text_edits(prev, text)
+        sent += sum(len(r[4]) for r in edits)
+        env.doc_change('bench.py', i + 1, edits)
+        env.doc_assist('bench.py', i + 1, (line + 1, 5 + i))
+        prev = text
+    delta = (time.time() - start) / len(texts)
+    env.close()
+
+    print('lines: {}, buffer {} KB'.format(len(lines), len(prev) // 1024))
+    print('full source: {:.2f} ms/keystroke, {} KB sent'.format(
+        full * 1000, len(prev) * len(texts) // 1024))
+    print('delta:       {:.2f} ms/keystroke, {} bytes of edits sent'.format(
+        delta * 1000, sent))
+
+
+if __name__ == '__main__':
+    main()
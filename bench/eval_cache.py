@@ -0,0 +1,59 @@
+"""Completion on library values, first and repeated requests
+
+    python bench/eval_cache.py [assignments]
+
+Library module of alias chains ``vN = vN-1`` over ``os.path``, buffer
+completes attributes of the last one. Repeated requests take evaluation
+results of library names from the project cache.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from supp.project import Project
+from supp.assistant import assist
+
+CHAIN = 400
+
+
+def generate(count):
+    lines = ['import os']
+    for i in range(count):
+        if i % CHAIN:
+            lines.append('v{} = v{}'.format(i, i - 1))
+        else:
+            lines.append('v{} = os.path'.format(i))
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    # cold evaluation of a chain recurses through every link
+    sys.setrecursionlimit(20000)
+    root = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(root, 'lib.py'), 'w') as f:
+            f.write(generate(count))
+
+        project = Project([root])
+        text = 'import lib\nlib.v{}.'.format(count - 1)
+        position = 2, len(text) - len('import lib\n')
+
+        times = []
+        for _ in range(3):
+            start = time.time()
+            with project.check_changes():
+                assist(project, text, position, os.path.join(root, 'buf.py'))
+            times.append((time.time() - start) * 1000)
+
+        print('{} assignments: first {:.1f} ms, next {:.1f} ms, {:.1f} ms'.format(
+            count, *times))
+        print(project.eval_cache.stats())
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Whole file resolution, per node vs batch evaluation
+
+    python bench/evaluate_many.py [assignments]
+
+Module of alias chains ``vN = vN-1`` ending in ``os.path`` attribute loads.
+Resolving every usage separately walks a chain again for each node,
+:meth:`EvalCtx.evaluate_many` shares results of bindings and attribute
+paths.
+"""
+import sys
+import time
+
+from supp.project import Project
+from supp.util import Source, get_all_usages
+from supp.nast import extract_scope
+from supp.evaluator import EvalCtx
+
+CHAIN = 100
+
+
+def generate(count):
+    lines = ['import os']
+    for i in range(count):
+        if i % CHAIN:
+            lines.append('v{} = v{}'.format(i, i - 1))
+        else:
+            lines.append('v{} = os.path'.format(i))
+    for i in range(count):
+        lines.append('v{}.join(v{}.sep)'.format(i, i))
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    text = generate(count)
+    project = Project()
+
+    source = Source(text, 'bench.py')
+    extract_scope(source, project)
+    nodes = [r[3] for r in get_all_usages(source.tree)]
+
+    start = time.time()
+    ctx = EvalCtx(project)
+    single = [ctx.evaluate(r) for r in nodes]
+    single_time = time.time() - start
+
+    start = time.time()
+    ctx = EvalCtx(project)
+    many = ctx.evaluate_many(nodes)
+    many_time = time.time() - start
+
+    assert [type(r) for r in single] == [type(r) for r in many]
+    print('{} nodes: evaluate {:.1f} ms, evaluate_many {:.1f} ms'.format(
+        len(nodes), single_time * 1000, many_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Completion latency with and without incremental buffer re-extraction
+
+Simulates typing an identifier inside a function body of a large module
+and calls ``assistant.assist`` after every keystroke. Also measures
+``assistant.location`` while cursor moves over an unchanged buffer.
+
+    python bench/incremental.py [functions]
+"""
+import sys
+import time
+
+from supp.assistant import assist, location
+from supp.incremental import BufferCache
+from supp.project import Project
+
+
+def make_source(functions):
+    lines = ['import os', '']
+    for i in range(functions):
+        lines.extend([
+            'def func{}(arg, other=None):'.format(i),
+            '    value = arg + {}'.format(i),
+            '    if other:',
+            '        value = os.path.join(value, other)',
+            '    return value',
+            '',
+        ])
+    return lines
+
+
+def session(lines, line, word, buffers):
+    project = Project()
+    start = time.time()
+    for i in range(1, len(word) + 1):
+        current = lines[:]
+        current[line] = '    ' + word[:i]
+        assist(project, '\n'.join(current), (line + 1, 4 + i), 'bench.py',
+               buffers=buffers)
+    return (time.time() - start) / len(word)
+
+
+def navigate(lines, buffers):
+    project = Project()
+    source = '\n'.join(lines)
+    cursors = [(i + 1, 12) for i, l in enumerate(lines)
+               if l.startswith('    return value')][::50]
+    location(project, source, cursors[0], 'bench.py', buffers=buffers)
+    start = time.time()
+    for pos in cursors:
+        location(project, source, pos, 'bench.py', buffers=buffers)
+    return (time.time() - start) / len(cursors)
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    lines = make_source(functions)
+    line = len(lines) // 2 // 6 * 6 + 4
+    lines.insert(line, '    ')
+    word = 'value_with_long_name'
+
+    full = session(lines, line, word, None)
+    incremental = session(lines, line, word, BufferCache())
+    print('lines: {}'.format(len(lines)))
+    print('full reparse:  {:.2f} ms/keystroke'.format(full * 1000))
+    print('incremental:   {:.2f} ms/keystroke'.format(incremental * 1000))
+
+    full = navigate(lines, None)
+    incremental = navigate(lines, BufferCache())
+    print('goto full:     {:.2f} ms/move'.format(full * 1000))
+    print('goto reused:   {:.2f} ms/move'.format(incremental * 1000))
+
+
+if __name__ == '__main__':
+    main()
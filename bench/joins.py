@@ -0,0 +1,54 @@
+"""Flow joins of long functions with many sequential branches
+
+    python bench/joins.py [branches] [names]
+
+A function defines ``names`` locals and then runs ``branches`` sequential
+if/else and try/except statements, each assigning one name. Measures
+scope extraction plus name resolution of every flow and full lint.
+"""
+import sys
+import time
+
+from supp.project import Project
+from supp.util import Source
+from supp.nast import extract_scope
+from supp.linter import lint
+
+
+def generate(branches, names):
+    lines = ['def func(cond):']
+    for i in range(names):
+        lines.append('    v{} = {}'.format(i, i))
+    for i in range(branches):
+        if i % 2:
+            lines.append('    if cond:\n        b{0} = 1\n    else:\n        b{0} = 2'.format(i))
+        else:
+            lines.append('    try:\n        b{0} = 1\n    except Exception:\n'
+                         '        b{0} = 2'.format(i))
+        lines.append('    cond = b{} + v{}'.format(i, i % names))
+    lines.append('    return cond')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    branches = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    names = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    text = generate(branches, names)
+    project = Project()
+
+    start = time.time()
+    scope = extract_scope(Source(text, 'bench.py'), project)
+    for flow in scope._all_flows:
+        flow.names.get('cond')
+    resolved = time.time() - start
+
+    start = time.time()
+    lint(project, text, 'bench.py')
+    linted = time.time() - start
+
+    print('{} branches, {} names: extract and resolve {:.1f} ms, lint {:.1f} ms'.format(
+        branches, names, resolved * 1000, linted * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""LSP front end vs multiprocessing server under a scripted editing session
+
+    python bench/lsp.py [functions]
+
+Types an identifier in a large module, every keystroke sends a change and
+a completion request. Reports mean and p95 completion latency and session
+throughput for supp.lsp, Environment with full source and Environment with
+document deltas.
+"""
+import os
+import sys
+import json
+import time
+import subprocess
+
+from supp.remote import Environment
+from supp.document import text_edits
+
+sys.path.insert(0, os.path.dirname(__file__))
+from incremental import make_source
+
+
+class LspClient(object):
+    def __init__(self):
+        self.proc = subprocess.Popen([sys.executable, '-m', 'supp.lsp'],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.ids = 0
+
+    def send(self, message):
+        message['jsonrpc'] = '2.0'
+        body = json.dumps(message).encode('utf-8')
+        self.proc.stdin.write('Content-Length: {}\r\n\r\n'.format(len(body)).encode())
+        self.proc.stdin.write(body)
+        self.proc.stdin.flush()
+
+    def recv(self):
+        size = int(self.proc.stdout.readline().split(b':')[1])
+        self.proc.stdout.readline()
+        return json.loads(self.proc.stdout.read(size).decode('utf-8'))
+
+    def request(self, method, params):
+        self.ids += 1
+        self.send({'id': self.ids, 'method': method, 'params': params})
+        while True:
+            message = self.recv()
+            if message.get('id') == self.ids:
+                return message
+
+    def notify(self, method, params):
+        self.send({'method': method, 'params': params})
+
+    def close(self):
+        self.request('shutdown', None)
+        self.notify('exit', None)
+        self.proc.wait()
+
+
+def stats(times, total):
+    times = sorted(times)
+    return '{:6.2f} ms mean, {:6.2f} ms p95, {:6.1f} keystrokes/s'.format(
+        sum(times) / len(times) * 1000, times[int(len(times) * 0.95)] * 1000,
+        len(times) / total)
+
+
+def run_lsp(initial, texts, positions):
+    client = LspClient()
+    client.request('initialize', {'rootUri': 'file://' + os.getcwd()})
+    uri = 'file://' + os.path.abspath('bench.py')
+    client.notify('textDocument/didOpen', {'textDocument': {
+        'uri': uri, 'languageId': 'python', 'version': 0, 'text': initial}})
+
+    times = []
+    prev = initial
+    start = time.time()
+    for i, (text, (line, col)) in enumerate(zip(texts, positions)):
+        changes = [{'range': {'start': {'line': r[0] - 1, 'character': r[1]},
+                              'end': {'line': r[2] - 1, 'character': r[3]}},
+                    'text': r[4]} for r in text_edits(prev, text)]
+        t = time.time()
+        client.notify('textDocument/didChange', {
+            'textDocument': {'uri': uri, 'version': i + 1}, 'contentChanges': changes})
+        client.request('textDocument/completion', {
+            'textDocument': {'uri': uri}, 'position': {'line': line - 1, 'character': col}})
+        times.append(time.time() - t)
+        prev = text
+    total = time.time() - start
+    client.close()
+    return stats(times, total)
+
+
+def run_env(initial, texts, positions, delta):
+    env = Environment()
+    env.configure({'sources': ['.']})
+    fname = os.path.abspath('bench.py')
+    if delta:
+        env.doc_open(fname, initial)
+
+    times = []
+    prev = initial
+    start = time.time()
+    for i, (text, pos) in enumerate(zip(texts, positions)):
+        t = time.time()
+        if delta:
+            env.doc_change(fname, i + 1, text_edits(prev, text))
+            env.doc_assist(fname, i + 1, pos)
+        else:
+            env.assist(text, pos, fname)
+        times.append(time.time() - t)
+        prev = text
+    total = time.time() - start
+    env.close()
+    return stats(times, total)
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    lines = make_source(functions)
+    line = len(lines) // 2 // 6 * 6 + 4
+    lines.insert(line, '    ')
+    word = 'value_with_long_name' * 3
+
+    texts, positions = [], []
+    for i in range(1, len(word) + 1):
+        current = lines[:]
+        current[line] = '    ' + word[:i]
+        texts.append('\n'.join(current))
+        positions.append((line + 1, 4 + i))
+
+    initial = '\n'.join(lines)
+    print('lsp:          ', run_lsp(initial, texts, positions))
+    print('server full:  ', run_env(initial, texts, positions, False))
+    print('server delta: ', run_env(initial, texts, positions, True))
+
+
+if __name__ == '__main__':
+    main()
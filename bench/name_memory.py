@@ -0,0 +1,62 @@
+"""Memory of scope objects of a large module
+
+    python bench/name_memory.py [file]
+
+Extracts scope of a file (generated module with many functions by
+default) and reports traced bytes per name and per flow, including AST.
+"""
+import sys
+import gc
+import tracemalloc
+
+from supp.project import Project
+from supp.util import Source
+from supp.nast import extract_scope
+
+FUNC = '''\
+def func{0}(a, b, c=None):
+    x = a + b
+    if c:
+        y = x * 2
+    else:
+        y = x
+    for i in range(y):
+        z = i
+    return x, y, z
+'''
+
+
+def generate(count=3000):
+    lines = ['import os', 'from os.path import join', '']
+    for i in range(count):
+        lines.append(FUNC.format(i))
+    return '\n'.join(lines)
+
+
+def main():
+    if len(sys.argv) > 1:
+        fname = sys.argv[1]
+        text = open(fname).read()
+    else:
+        fname = 'generated.py'
+        text = generate()
+
+    project = Project()
+    source = Source(text, fname)
+    source.tree
+
+    gc.collect()
+    tracemalloc.start()
+    scope = extract_scope(source, project)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    names = sum(1 for _ in scope.all_names)
+    flows = len(scope._all_flows)
+    print('{} names, {} flows, {:.1f} MB, {:.0f} bytes per name'.format(
+        names, flows, memory / 1e6, memory / float(names)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Name lookups through flow chains
+
+    python bench/names.py
+
+Generated modules nest ``if``, ``try`` and ``for`` blocks to given depth,
+every level assigns a few names. Measured per case: lookup of every
+visible name via ``names_at`` at the innermost position, completion
+style ``sorted(flow.names)`` of all flows and full lint.
+"""
+import time
+
+from supp.project import Project
+from supp.util import Source
+from supp.nast import extract_scope
+from supp.linter import lint
+
+BLOCKS = {
+    'if': ('if v{0}:', None),
+    'try': ('try:', '{indent}except Exception:\n{indent}    pass'),
+    'for': ('for i{0} in v{0}:', None),
+}
+
+
+def generate(kind, depth, names=5, funcs=20):
+    head, tail = BLOCKS[kind]
+    lines = []
+    for f in range(funcs):
+        lines.append('def func{}(v0):'.format(f))
+        for level in range(depth):
+            indent = '    ' * (level + 1)
+            for n in range(names):
+                lines.append('{}n{}_{} = v{}'.format(indent, level, n, level))
+            lines.append('{}v{} = n{}_0'.format(indent, level + 1, level))
+            lines.append(indent + head.format(level + 1))
+        indent = '    ' * (depth + 1)
+        uses = ['n{}_{}'.format(level, n) for level in range(depth) for n in range(names)]
+        lines.append('{}print({})'.format(indent, ', '.join(uses)))
+        for level in reversed(range(depth)):
+            if tail:
+                lines.append(tail.format(indent='    ' * (level + 1)))
+    return '\n'.join(lines) + '\n'
+
+
+def measure(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def lookups(scope, text):
+    position = len(text.splitlines()) - 1, 10
+
+    def run():
+        for flow in scope._all_flows:
+            names = flow.names_at(position)
+            for _ in range(20):
+                for name in ('v0', 'n0_0', 'missing', 'print'):
+                    names.get(name)
+    return run
+
+
+def completion(scope):
+    def run():
+        for flow in scope._all_flows:
+            sorted(flow.names)
+    return run
+
+
+def main():
+    project = Project()
+    for kind in sorted(BLOCKS):
+        for depth in (5, 20):
+            text = generate(kind, depth)
+            source = Source(text, 'bench.py')
+            scope = extract_scope(source, project)
+            print('{:4} depth {:2}: lookups {:6.1f} ms, completion {:6.1f} ms, '
+                  'lint {:6.1f} ms'.format(
+                      kind, depth, measure(lookups(scope, text)),
+                      measure(completion(scope)),
+                      measure(lambda: lint(project, text, 'bench.py'))))
+
+
+if __name__ == '__main__':
+    main()
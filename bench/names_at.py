@@ -0,0 +1,48 @@
+"""Visible names lookup in a flat module
+
+    python bench/names_at.py [assignments]
+
+Module of thousands of top-level assignments, each one using previous
+names. Measures ``names_at`` lookups for every usage and full lint.
+"""
+import sys
+import time
+
+from supp.project import Project
+from supp.util import Source, get_name_usages, np
+from supp.nast import extract_scope
+from supp.linter import lint
+
+
+def generate(count):
+    lines = ['x0 = 0']
+    for i in range(1, count):
+        lines.append('x{} = x{} + x{}'.format(i, i - 1, i // 2))
+    lines.append('print(x{})'.format(count - 1))
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    text = generate(count)
+    project = Project()
+
+    source = Source(text, 'bench.py')
+    extract_scope(source, project)
+    usages = get_name_usages(source.tree)
+
+    start = time.time()
+    for name in usages:
+        name.flow.names_at(np(name))[name.id]
+    lookups = time.time() - start
+
+    start = time.time()
+    lint(project, text, 'bench.py')
+    linted = time.time() - start
+
+    print('{} assignments, {} usages: names_at {:.1f} ms, lint {:.1f} ms'.format(
+        count, len(usages), lookups * 1000, linted * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Total CPU time and peak worker RSS of parallel lint with a shared store
+
+Generates a tree where every module star imports one large module and
+lints it with and without a shared SQLite summary store.
+
+    python bench/parallel_lint.py [jobs] [files]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+SCRIPT = '''
+import sys
+from supp import batch
+root, jobs, cache_db = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+options = {'cache_db': cache_db or None}
+files = list(batch.iter_files([root]))
+if cache_db:
+    batch.prepare_summaries(files, [root], jobs, options)
+for _ in batch.run(batch.lint_file, files, [root], jobs, options):
+    pass
+import resource
+usage = [resource.getrusage(r) for r in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+print(sum(r.ru_utime + r.ru_stime for r in usage), max(r.ru_maxrss for r in usage))
+'''
+
+
+def make_tree(root, files):
+    with open(os.path.join(root, 'popular.py'), 'w') as f:
+        for i in range(5000):
+            f.write('name{0} = {0}\n'.format(i))
+    for i in range(files):
+        with open(os.path.join(root, 'm{}.py'.format(i)), 'w') as f:
+            f.write('from popular import *\nprint(name{})\n'.format(i))
+
+
+def measure(root, jobs, cache_db):
+    start = time.time()
+    out = subprocess.check_output([sys.executable, '-c', SCRIPT, root, str(jobs), cache_db])
+    cpu, rss = out.split()
+    return time.time() - start, float(cpu), int(rss)
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    root = tempfile.mkdtemp()
+    try:
+        make_tree(root, files)
+        for title, db in (('no store', ''),
+                          ('shared store', os.path.join(root, 'cache.db'))):
+            wall, cpu, rss = measure(root, jobs, db)
+            print('{:<14}wall {:.2f}s  cpu {:.2f}s  peak rss {} KiB'.format(
+                title + ':', wall, cpu, rss))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
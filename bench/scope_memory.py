@@ -0,0 +1,68 @@
+"""Memory of loaded module scopes with and without scope budget
+
+    python bench/scope_memory.py [path]
+
+Loads exported names of every module under ``path`` (stdlib by default)
+and reports traced memory and time to touch all modules again.
+"""
+import os
+import sys
+import time
+import gc
+import tracemalloc
+
+from supp.project import Project
+from supp.batch import iter_files
+
+
+def module_names(root):
+    result = []
+    for fname in iter_files([root]):
+        rel = os.path.relpath(fname, root)[:-3].replace(os.sep, '.')
+        if rel.endswith('.__init__'):
+            rel = rel[:-9]
+        if '-' not in rel and 'test' not in rel and 'idlelib' not in rel:
+            result.append(rel)
+    return result
+
+
+def load(project, names):
+    for name in names:
+        try:
+            project.get_module(name)._attrs
+        except Exception:
+            pass
+
+
+def session(root, names, budget):
+    gc.collect()
+    tracemalloc.start()
+    project = Project([root], scope_budget=budget)
+    with project.check_changes():
+        load(project, names)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.time()
+    with project.check_changes():
+        for name in names:
+            try:
+                project.get_module(name).attr_list(None)
+            except Exception:
+                pass
+    return memory, time.time() - start, project.scope_stats()
+
+
+def main():
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.__file__)
+    names = module_names(root)[:600]
+    for budget in (None, 2000000, 500000):
+        memory, relookup, stats = session(root, names, budget)
+        print('budget={}: {} modules, {:.1f} MB, attr lookup of all {:.1f} ms, '
+              'evictions {}'.format(budget, len(names), memory / 1e6,
+                                    relookup * 1000, stats['evictions']))
+
+
+if __name__ == '__main__':
+    main()
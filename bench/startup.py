@@ -0,0 +1,49 @@
+"""Server launch time and first completion latency
+
+    python bench/startup.py [sources]
+
+Completion of ``os.path.`` inside a module importing project packages is
+measured right after start (after a short idle pause, as an editor would
+have) and again in steady state, with and without pre-warm.
+"""
+import sys
+import time
+
+from supp.remote import Environment
+
+SOURCE = '''\
+import os
+from supp import project, scope
+os.path.
+'''
+
+
+def session(sources, prewarm):
+    start = time.time()
+    env = Environment()
+    env.run()
+    launch = time.time() - start
+
+    env.configure({'sources': sources, 'prewarm': prewarm})
+    time.sleep(1)
+
+    result = []
+    for _ in range(2):
+        start = time.time()
+        env.assist(SOURCE, (3, 8), 'bench.py')
+        result.append(time.time() - start)
+    env.close()
+    return launch, result[0], result[1]
+
+
+def main():
+    sources = sys.argv[1:] or ['.']
+    for prewarm in (False, True):
+        launch, first, steady = session(sources, prewarm)
+        print('prewarm={}: launch {:.1f} ms, first assist {:.1f} ms, '
+              'steady {:.1f} ms'.format(prewarm, launch * 1000, first * 1000,
+                                        steady * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+# type: ignore
+"""Asyncio client of supplement server
+
+Speaks the same protocol as :class:`supp.remote.Environment` over a unix
+socket: frames are ``multiprocessing.connection`` compatible, length
+prefixed payloads without authentication.
+"""
+import os
+import sys
+import struct
+import asyncio
+import logging
+import itertools
+from multiprocessing.connection import arbitrary_address
+
+from . import codec
+from .remote import server_args, server_env, check_ready
+
+log = logging.getLogger('supp.aioremote')
+
+SIZE = struct.Struct('!i')
+LONG_SIZE = struct.Struct('!Q')
+
+
+class AsyncEnvironment(object):
+    """Supplement server client for asyncio applications
+
+    Any number of calls may be in flight at once, responses are matched by
+    request id. Every call accepts ``timeout``, timed out or cancelled calls
+    are cancelled on server side as well.
+    """
+
+    def __init__(self, executable=None, env=None, logfile=None, timeout=None,
+                 codecs=None, on_event=None):
+        """AsyncEnvironment constructor
+
+        :param executable: python executable, see :class:`supp.remote.Environment`.
+        :param env: extra environment variables of server process.
+        :param logfile: explicit log file, can be passed via environment SUPP_LOG_FILE
+        :param timeout: default call timeout in seconds, None means wait forever
+        :param codecs: wire codec names to offer, see :mod:`supp.codec`
+        :param on_event: ``func(event, payload)`` for server pushed events
+        """
+        self.executable = executable or sys.executable
+        self.env = env
+        self.logfile = logfile
+        self.timeout = timeout
+        self.codecs = codecs or [r.name for r in codec.available()]
+        self.codec = codec.DEFAULT
+        self.on_event = on_event
+
+        self.proc = None
+        self.reader = None
+        self.writer = None
+        self.futures = {}
+        self.ids = itertools.count(1)
+        self._start_lock = asyncio.Lock()
+        self._read_task = None
+        # set when reader exits, connection can't answer calls anymore
+        self._error = None
+
+    async def start(self, launch_timeout=5):
+        """Launch server process and connect to it"""
+        async with self._start_lock:
+            if self.writer is not None:
+                return
+
+            addr = arbitrary_address('AF_UNIX')
+            loop = asyncio.get_running_loop()
+            rfd, wfd = os.pipe()
+            try:
+                try:
+                    self.proc = await asyncio.create_subprocess_exec(
+                        *server_args(self.executable, addr, wfd),
+                        env=server_env(self.env, self.logfile), pass_fds=(wfd,))
+                finally:
+                    os.close(wfd)
+
+                ready = loop.create_future()
+                loop.add_reader(rfd, lambda: ready.done() or ready.set_result(None))
+                try:
+                    await asyncio.wait_for(ready, launch_timeout)
+                except asyncio.TimeoutError:
+                    raise Exception('Supp server launching timeout exceed')
+                finally:
+                    loop.remove_reader(rfd)
+                check_ready(os.read(rfd, 1))
+            finally:
+                os.close(rfd)
+
+            self.reader, self.writer = await asyncio.open_unix_connection(addr)
+            self._error = None
+            self.codec = codec.DEFAULT
+            self._send(0, 'handshake', (self.codecs,), {})
+            _, name, is_ok = self.codec.loads(await self._read_frame())
+            if is_ok:
+                self.codec = codec.get(name)
+
+            self._read_task = loop.create_task(self._read_responses())
+
+    async def _read_frame(self):
+        size, = SIZE.unpack(await self.reader.readexactly(SIZE.size))
+        if size == -1:
+            size, = LONG_SIZE.unpack(await self.reader.readexactly(LONG_SIZE.size))
+        return await self.reader.readexactly(size)
+
+    def _write_frame(self, data):
+        if len(data) > 0x7fffffff:
+            self.writer.write(SIZE.pack(-1) + LONG_SIZE.pack(len(data)) + data)
+        else:
+            self.writer.write(SIZE.pack(len(data)) + data)
+
+    async def _read_responses(self):
+        error = EOFError('Supp server connection is closed')
+        try:
+            while True:
+                try:
+                    rid, result, is_ok = self.codec.loads(await self._read_frame())
+                except (asyncio.IncompleteReadError, OSError):
+                    break
+                except Exception as e:
+                    # stream is out of sync, nothing more can be matched
+                    error = e
+                    break
+
+                if rid is None:
+                    if self.on_event:
+                        try:
+                            self.on_event(result, is_ok)
+                        except Exception:
+                            log.exception('Event handler error')
+                    continue
+                future = self.futures.pop(rid, None)
+                if future is None or future.done():
+                    continue
+                if is_ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(Exception(result[1]))
+        finally:
+            self._error = error
+            for future in self.futures.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.futures.clear()
+
+    def _send(self, rid, name, args, kwargs):
+        self._write_frame(self.codec.dumps((rid, name, args, kwargs)))
+
+    async def _call(self, name, *args, **kwargs):
+        timeout = kwargs.pop('timeout', None) or self.timeout
+        if self.writer is None:
+            await self.start()
+        if self._error is not None:
+            raise self._error
+
+        rid = next(self.ids)
+        future = self.futures[rid] = asyncio.get_running_loop().create_future()
+        self._send(rid, name, args, kwargs)
+        await self.writer.drain()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if self.futures.pop(rid, None) is not None and self.writer is not None:
+                self._send(0, 'cancel', (rid,), {})
+            raise
+
+    async def lint(self, source, filename, syntax_only=False, timeout=None):
+        return await self._call('lint', source, filename, syntax_only,
+                                timeout=timeout)
+
+    async def assist(self, source, position, filename, timeout=None):
+        """Return completion match and list of completion proposals
+
+        See :meth:`supp.remote.Environment.assist`
+        """
+        return await self._call('assist', source, position, filename,
+                                timeout=timeout)
+
+    async def location(self, source, position, filename, timeout=None):
+        """Return declaration locations of name under cursor
+
+        See :meth:`supp.remote.Environment.location`
+        """
+        return await self._call('location', source, position, filename,
+                                timeout=timeout)
+
+    async def doc_open(self, filename, source, version=0, timeout=None):
+        """Start tracking buffer, see :meth:`supp.remote.Environment.doc_open`"""
+        return await self._call('doc_open', filename, source, version, timeout=timeout)
+
+    async def doc_change(self, filename, version, edits, timeout=None):
+        return await self._call('doc_change', filename, version, edits, timeout=timeout)
+
+    async def doc_close(self, filename, timeout=None):
+        return await self._call('doc_close', filename, timeout=timeout)
+
+    async def doc_assist(self, filename, version, position, timeout=None):
+        return await self._call('doc_assist', filename, version, position,
+                                timeout=timeout)
+
+    async def doc_location(self, filename, version, position, timeout=None):
+        return await self._call('doc_location', filename, version, position,
+                                timeout=timeout)
+
+    async def doc_lint(self, filename, version, syntax_only=False, timeout=None):
+        return await self._call('doc_lint', filename, version, syntax_only,
+                                timeout=timeout)
+
+    async def schedule_lint(self, filename, version, timeout=None):
+        """Lint tracked buffer in background, result goes to ``on_event``"""
+        return await self._call('schedule_lint', filename, version, timeout=timeout)
+
+    async def configure(self, config, timeout=None):
+        """Reconfigure project, see :meth:`supp.remote.Environment.configure`"""
+        return await self._call('configure', config, timeout=timeout)
+
+    async def cache_stats(self, timeout=None):
+        return await self._call('cache_stats', timeout=timeout)
+
+    async def references(self, source, position, filename, timeout=None):
+        return await self._call('references', source, position, filename, timeout=timeout)
+
+    async def index_usages(self, paths=None, jobs=1, timeout=None):
+        return await self._call('index_usages', paths, jobs, timeout=timeout)
+
+    async def affected_modules(self, names, timeout=None):
+        return await self._call('affected_modules', names, timeout=timeout)
+
+    async def eval(self, source, timeout=None):
+        return await self._call('eval', source, timeout=timeout)
+
+    async def close(self):
+        """Shutdown server"""
+        if self.writer is None:
+            return
+
+        self._send(0, 'close', (), {})
+        try:
+            await self.writer.drain()
+        except OSError:
+            pass
+        await self._read_task
+        self.writer.close()
+        self.writer = self.reader = None
+        if self.proc:
+            await self.proc.wait()
+            self.proc = None
@@ -3,7 +3,9 @@ from __future__ import print_function
 import re
 import logging
 
-from .util import (Source, print_dump, get_marked_atribute, split_pkg,
+from ast import Name as AstName, Attribute, Load
+
+from .util import (Source, print_dump, get_marked_atribute, split_pkg, node_at,
                    get_marked_name, get_marked_import, get_all_usages, join_pkg)
 from .evaluator import EvalCtx
 from .nast import extract_scope
@@ -16,11 +18,64 @@ def list_packages(project, root, filename):
     return sorted(r for r in project.list_packages(root))
 
 
-def assist(project, source, position, filename=None, debug=False):
-    source = Source(source, filename, position)
-    ctx = EvalCtx(project)
+def _prepare(source, buffers, marked=True):
+    if buffers is None:
+        return source, None
+    buf = buffers.get((source.filename, marked))
+    return buf.update(source), buf
+
+
+def _extract(source, project, buf):
+    if buf is None:
+        return extract_scope(source, project)
+    return buf.scope(project)
+
+
+def _is_ident(line, col):
+    return 0 <= col < len(line) and (line[col].isalnum() or line[col] == '_')
+
+
+def node_at_cursor(project, text, position, filename, buffers, with_next=False):
+    """Find Name or Attribute at cursor without marker injection
+
+    Unmarked source stays the same while cursor moves so tree and scope
+    are reused from buffers. Returns None if source can't be parsed or
+    cursor isn't on an identifier, caller falls back to marked source.
+    """
     ln, col = position
-    line = source.lines[ln - 1][:col]
+    lines = text.splitlines()
+    if ln > len(lines):
+        return None
+    line = lines[ln - 1]
+    if not (_is_ident(line, col - 1) or with_next and _is_ident(line, col)):
+        return None
+
+    source, buf = _prepare(Source(text, filename), buffers, False)
+    try:
+        tree = source.tree
+    except SyntaxError:
+        return None
+
+    # AST columns count UTF-8 bytes
+    bcol = len(line[:col].encode('utf-8'))
+    node = node_at(tree, (ln, bcol))
+    ntype = type(node)
+    if ntype is not AstName and ntype is not Attribute or type(node.ctx) is not Load:
+        return None
+    if ntype is Attribute and (node.end_lineno != ln
+                               or node.end_col_offset - len(node.attr.encode('utf-8')) > bcol):
+        return None
+
+    _extract(source, project, buf)
+    if ntype is AstName and not hasattr(node, 'flow'):
+        return None
+    return node
+
+
+def assist(project, text, position, filename=None, debug=False, buffers=None):
+    ln, col = position
+    line = (text.splitlines() or [''])[ln - 1:ln]
+    line = line[0][:col] if line else ''
     if line.lstrip().startswith('from ') and ' import ' not in line:
         iname = line.rpartition(' ')[2]
         package, sep, prefix = iname.rpartition('.')
@@ -28,6 +83,16 @@ def assist(project, source, position, filename=None, debug=False):
             package += '.'
         return prefix, list_packages(project, package, filename)
 
+    prefix = re.split(r'(\.|\s|\()', line)[-1]
+    ctx = EvalCtx(project)
+    node = not debug and node_at_cursor(project, text, position, filename, buffers)
+    if node:
+        if type(node) is Attribute:
+            value = ctx.evaluate(node.value)
+            return prefix, sorted(value.attr_list(ctx) if value else {})
+        return prefix, sorted(node.flow.names_at(position))
+
+    source, buf = _prepare(Source(text, filename, position), buffers)
     debug and print_dump(source.tree)
 
     marked_import = get_marked_import(source.tree)
@@ -41,9 +106,8 @@ def assist(project, source, position, filename=None, debug=False):
             module = project.get_nmodule(head, filename)
             return tail, sorted(set(plist) | set(module.attr_list(ctx)))
 
-    scope = extract_scope(source, project)
+    _extract(source, project, buf)
 
-    prefix = re.split(r'(\.|\s|\()', line)[-1]
     attr = get_marked_atribute(source.tree)
     names = {}
     if attr:
@@ -62,15 +126,20 @@ def _loc(location, filename):
     return {'loc': location, 'file': filename}
 
 
-def location(project, source, position, filename=None, debug=False):
-    source = Source(source, filename, position)
+def location(project, text, position, filename=None, debug=False, buffers=None):
+    ctx = EvalCtx(project)
+    node = not debug and node_at_cursor(project, text, position, filename,
+                                        buffers, with_next=True)
+    if node:
+        return _locations(ctx.declarations(node, []))
+
+    source, buf = _prepare(Source(text, filename, position), buffers)
 
     debug and print_dump(source.tree)
-    scope = extract_scope(source, project)
+    _extract(source, project, buf)
 
     result = []
     marked_import = get_marked_import(source.tree)
-    ctx = EvalCtx(project)
 
     if marked_import:
         head, tail = marked_import
@@ -94,6 +163,10 @@ def location(project, source, position, filename=None, debug=False):
         if node:
             result = ctx.declarations(node, [])
 
+    return _locations(result)
+
+
+def _locations(result):
     locs = []
     for r in result:
         if isinstance(r, list):
@@ -104,17 +177,35 @@ def location(project, source, position, filename=None, debug=False):
     return locs
 
 
-def usages(project, source, filename=None):
+def references(project, index, text, position, filename=None, buffers=None):
+    """Reference sites of a name under cursor from usage index
+
+    Only final declaration counts, so references made through imports of
+    the name are found too.
+    """
+    result = []
+    for loc in location(project, text, position, filename, buffers=buffers)[-1:]:
+        for r in (loc if isinstance(loc, list) else [loc]):
+            for fname, rloc in index.references(r['file'] or filename, r['loc']):
+                result.append(_loc(rloc, fname))
+    return result
+
+
+def find_usages(project, source, filename=None):
     source = Source(source, filename)
-    scope = extract_scope(source, project)
+    extract_scope(source, project)
     ctx = EvalCtx(project)
 
-    for utype, nname, loc, node in get_all_usages(source.tree):
-        # print(scope, node)
-        value = ctx.declarations(node, [])
-
+    all_usages = list(get_all_usages(source.tree))
+    values = ctx.declarations_many(r[3] for r in all_usages)
+    for (utype, nname, loc, node), value in zip(all_usages, values):
         if value:
             if utype == 'attr':
-                print('GUT', utype, nname, loc, value)
+                yield 'GUT', utype, nname, loc, value
         else:
-            print('BAD', utype, nname, loc, vars(node))
+            yield 'BAD', utype, nname, loc, vars(node)
+
+
+def usages(project, source, filename=None):
+    for r in find_usages(project, source, filename):
+        print(*r)
@@ -0,0 +1,196 @@
+"""Multi-process driver for command line tools
+
+Each worker process owns its own :class:`Project` with module caches.
+Results are returned in input order so output is stable regardless of
+job count.
+"""
+import os
+import re
+import traceback
+from multiprocessing import Pool, cpu_count
+
+from .project import Project
+from .module import SourceModule
+# linter and assistant are not type checked, mypy sees no attributes there
+from .linter import lint  # type: ignore[attr-defined]
+from .assistant import find_usages  # type: ignore[attr-defined]
+from . import usages, imports
+
+if False:
+    import typing as t
+
+    T = t.TypeVar('T')
+    R = t.TypeVar('R')
+
+_project = None  # type: Project | None
+
+STAR_IMPORT_RE = re.compile(r'^\s*from\s+([\w.]+)\s+import\s+\*', re.M)
+
+
+def iter_files(paths):
+    # type: (list[str]) -> t.Iterator[str]
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, fnames in os.walk(path):
+                dirs.sort()
+                for fname in sorted(fnames):
+                    if fname.endswith('.py'):
+                        yield os.path.join(root, fname)
+        else:
+            yield os.path.abspath(path)
+
+
+def init_worker(sources, options=None):
+    # type: (list[str], dict[str, t.Any] | None) -> None
+    global _project
+    _project = Project(sources, **(options or {}))
+
+
+def get_project():
+    # type: () -> Project
+    assert _project is not None, 'Worker is not initialized'
+    return _project
+
+
+def run(func, items, sources, jobs=1, options=None):
+    # type: (t.Callable[[T], R], t.Iterable[T], list[str], int, dict[str, t.Any] | None) -> t.Iterator[R]
+    """Apply ``func`` to every item using ``jobs`` worker processes
+
+    ``jobs`` less than 1 means number of CPUs.
+    """
+    if jobs < 1:
+        jobs = cpu_count()
+
+    if jobs == 1:
+        init_worker(sources, options)
+        for it in items:
+            yield func(it)
+        return
+
+    pool = Pool(jobs, init_worker, (sources, options))
+    try:
+        for r in pool.imap(func, items, chunksize=4):
+            yield r
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def lint_file(fname):
+    # type: (str) -> tuple[str, list[tuple[str, str, int, int, str | None]]]
+    try:
+        with open(fname) as f:
+            source = f.read()
+    except (OSError, UnicodeDecodeError) as err:
+        return fname, [('E01', 'Unable to read file: {}'.format(err), 1, 0, None)]
+
+    result = []
+    for e, msg, line, col, flow in lint(get_project(), source, fname):
+        debug = None
+        if flow:
+            debug = '{} {}'.format(flow, flow.scope)
+        result.append((e, msg, line, col, debug))
+    return fname, result
+
+
+def find_file(fname):
+    # type: (str) -> tuple[str, list[str]]
+    try:
+        with open(fname) as f:
+            source = f.read()
+    except (OSError, UnicodeDecodeError):
+        return fname, []
+
+    return fname, [' '.join(map(str, r))
+                   for r in find_usages(get_project(), source, fname)]
+
+
+def index_file(fname):
+    # type: (str) -> tuple[str, float, list[usages.entry_t], str | None]
+    try:
+        mtime = os.path.getmtime(fname)
+        with open(fname) as f:
+            source = f.read()
+        return fname, mtime, usages.file_usages(get_project(), source, fname), None
+    except Exception:
+        # one broken file must not stop indexing of a whole tree, error is
+        # reported by parent process, workers may have no log handlers
+        return fname, 0, [], traceback.format_exc()
+
+
+def collect_imports(fname):
+    # type: (str) -> tuple[str, list[imports.request_t], list[t.Any]]
+    try:
+        with open(fname) as f:
+            source = f.read()
+    except (OSError, UnicodeDecodeError):
+        return fname, [], []
+    requests, errors = imports.collect(get_project(), source, fname)
+    return fname, requests, errors
+
+
+def resolve_imports(item):
+    # type: (tuple[str, list[str]]) -> tuple[str, tuple[bool, list[str]]]
+    module, names = item
+    return module, imports.resolve(get_project(), module, names)
+
+
+def check_imports(files, sources, jobs=1, options=None):
+    # type: (list[str], list[str], int, dict[str, t.Any] | None) -> t.Iterator[tuple[str, list[t.Any]]]
+    """Check imports of all files, each imported module is resolved once
+
+    First pass collects import requests of every file, second one
+    resolves unique modules with all names imported from them.
+    """
+    collected = list(run(collect_imports, files, sources, jobs, options))
+    modules = {}  # type: dict[str, set[str]]
+    for _, requests, _ in collected:
+        for module, names in imports.module_requests(requests).items():
+            modules.setdefault(module, set()).update(names)
+
+    items = [(k, sorted(v)) for k, v in sorted(modules.items())]
+    resolved = dict(run(resolve_imports, items, sources, jobs, options))
+    for fname, requests, errors in collected:
+        yield fname, errors + imports.report(requests, resolved)
+
+
+def summarize_module(name):
+    # type: (str) -> str | None
+    try:
+        module = get_project().get_module(name)
+    except Exception:
+        return None
+    if isinstance(module, SourceModule):
+        module.summary
+        return module.filename
+    return None
+
+
+def star_imported_modules(files, project):
+    # type: (t.Iterable[str], Project) -> list[str]
+    result = set()
+    for fname in files:
+        try:
+            with open(fname) as f:
+                source = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+        for mname in STAR_IMPORT_RE.findall(source):
+            try:
+                result.add(project.norm_package(mname, fname))
+            except Exception:
+                pass
+    return sorted(result)
+
+
+def prepare_summaries(files, sources, jobs=1, options=None):
+    # type: (list[str], list[str], int, dict[str, t.Any] | None) -> list[str]
+    """First pass which fills shared summary store
+
+    Summaries of star imported modules are computed exactly once across all
+    workers, later passes read them from the store configured in
+    ``options``.
+    """
+    names = star_imported_modules(files, Project(sources, **(options or {})))
+    return [r for r in run(summarize_module, names, sources, jobs, options) if r]
@@ -0,0 +1,320 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from os.path import getmtime
+
+log = logging.getLogger('supp.cache')
+
+CACHE_VERSION = 1
+
+if False:
+    import typing as t
+    import sqlite3
+    from .scope import SourceScope
+    from .project import Project
+    from .util import loc_t
+
+
+def default_cache_dir():
+    # type: () -> str
+    root = (os.environ.get('XDG_CACHE_HOME')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(root, 'supp')
+
+
+def content_hash(source):
+    # type: (str) -> str
+    return hashlib.sha1(source.encode('utf-8', 'surrogateescape')).hexdigest()
+
+
+class ModuleSummary(object):
+    """Compact picklable part of a module scope
+
+    Holds only what is needed without evaluation: exported names with
+    their declaration points, imported modules and star imported modules.
+    """
+    def __init__(self, names, imports, star_imports, deps=None):
+        # type: (dict[str, loc_t], list[str], list[str], list[tuple[str, float]] | None) -> None
+        self.names = names
+        self.imports = imports
+        self.star_imports = star_imports
+        self.deps = deps or []
+
+    def __repr__(self):
+        # type: () -> str
+        return 'ModuleSummary({})'.format(sorted(self.names))
+
+    @classmethod
+    def from_scope(cls, scope, project):
+        # type: (SourceScope, Project) -> ModuleSummary
+        names = {k: tuple(getattr(v, 'declared_at', (1, 0)))
+                 for k, v in scope.exported_names.items()}
+
+        # exported names depend on the whole star import closure
+        deps = {}  # type: dict[str, float]
+        todo = [(mname, scope.filename) for mname in scope._star_modules]
+        while todo:
+            mname, filename = todo.pop()
+            try:
+                module = project.get_nmodule(mname, filename)
+            except ImportError:
+                continue
+            fname = getattr(module, 'filename', None)
+            if not fname or fname in deps or fname == scope.filename:
+                continue
+            deps[fname] = module.mtime  # type: ignore[union-attr]
+            if 'scope' in module.__dict__:
+                stars = module.scope._star_modules  # type: ignore[union-attr]
+            else:
+                stars = module.summary.star_imports  # type: ignore[union-attr]
+            todo.extend((r, fname) for r in stars)
+
+        return cls(names, list(scope._imports),
+                   list(scope._star_modules), sorted(deps.items()))
+
+    def to_dict(self):
+        # type: () -> dict[str, t.Any]
+        return {'names': self.names, 'imports': self.imports,
+                'star_imports': self.star_imports, 'deps': self.deps}
+
+    @classmethod
+    def from_dict(cls, data):
+        # type: (dict[str, t.Any]) -> ModuleSummary
+        return cls({k: tuple(v) for k, v in data['names'].items()},
+                   data['imports'], data['star_imports'],
+                   [tuple(r) for r in data['deps']])
+
+    @property
+    def valid(self):
+        # type: () -> bool
+        for fname, mtime in self.deps:
+            try:
+                if getmtime(fname) != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+
+class BaseScopeCache(object):
+    """Persistent store of module summaries
+
+    Entries are keyed by module path and validated by mtime. If mtime
+    differs but content hash is the same entry is still valid and
+    mtime is updated.
+    """
+    def __init__(self, max_entries=10000):
+        # type: (int) -> None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        # type: () -> dict[str, int]
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': self.size}
+
+    @property
+    def size(self):
+        # type: () -> int
+        raise NotImplementedError
+
+    def _load(self, filename):
+        # type: (str) -> dict[str, t.Any] | None
+        raise NotImplementedError
+
+    def _save(self, filename, data):
+        # type: (str, dict[str, t.Any]) -> None
+        raise NotImplementedError
+
+    def shrink(self, size=None):
+        # type: (int | None) -> None
+        raise NotImplementedError
+
+    def clear(self):
+        # type: () -> None
+        self.shrink(0)
+
+    def get(self, filename, mtime, source=None):
+        # type: (str, float, str | None) -> ModuleSummary | None
+        data = self._load(filename)
+        if (not data or data.get('version') != CACHE_VERSION
+                or data.get('path') != filename):
+            self.misses += 1
+            return None
+
+        if data['mtime'] != mtime:
+            if source is None:
+                try:
+                    source = open(filename).read()
+                except (OSError, UnicodeDecodeError):
+                    source = ''
+            if data['hash'] != content_hash(source):
+                self.misses += 1
+                return None
+            data['mtime'] = mtime
+            self._save(filename, data)
+
+        summary = ModuleSummary.from_dict(data['summary'])
+        if not summary.valid:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return summary
+
+    def put(self, filename, mtime, source, summary):
+        # type: (str, float, str, ModuleSummary) -> None
+        data = {'version': CACHE_VERSION, 'path': filename, 'mtime': mtime,
+                'hash': content_hash(source), 'summary': summary.to_dict()}
+        self._save(filename, data)
+        if self.size > self.max_entries:
+            self.shrink()
+
+    def _target_size(self, size):
+        # type: (int | None) -> int
+        if size is None:
+            return self.max_entries * 9 // 10
+        return size
+
+
+class ScopeCache(BaseScopeCache):
+    """Directory of JSON summary entries"""
+    def __init__(self, path, max_entries=10000):
+        # type: (str, int) -> None
+        BaseScopeCache.__init__(self, max_entries)
+        self.path = path
+        self._count = None  # type: int | None
+
+    @property
+    def size(self):
+        # type: () -> int
+        if self._count is None:
+            self._count = len(self._entries())
+        return self._count
+
+    def _entries(self):
+        # type: () -> list[str]
+        try:
+            return [os.path.join(self.path, r)
+                    for r in os.listdir(self.path) if r.endswith('.json')]
+        except OSError:
+            return []
+
+    def _entry_path(self, filename):
+        # type: (str) -> str
+        key = hashlib.sha1(os.path.abspath(filename).encode('utf-8')).hexdigest()
+        return os.path.join(self.path, key + '.json')
+
+    def _load(self, filename):
+        # type: (str) -> dict[str, t.Any] | None
+        try:
+            with open(self._entry_path(filename)) as f:
+                return json.load(f)  # type: ignore[no-any-return]
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, filename, data):
+        # type: (str, dict[str, t.Any]) -> None
+        epath = self._entry_path(filename)
+        exists = os.path.exists(epath)
+        tmp = '{}.{}.tmp'.format(epath, os.getpid())
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            with open(tmp, 'w') as f:
+                json.dump(data, f)
+            os.rename(tmp, epath)
+        except OSError:
+            log.exception('Unable to write cache entry %s', epath)
+            return
+
+        if not exists:
+            self._count = self.size + 1
+
+    def shrink(self, size=None):
+        # type: (int | None) -> None
+        """Remove least recently written entries to fit into ``size``
+
+        Default target is 90% of ``max_entries``.
+        """
+        size = self._target_size(size)
+        entries = []
+        for e in self._entries():
+            try:
+                entries.append((getmtime(e), e))
+            except OSError:
+                pass
+
+        entries.sort()
+        count = len(entries)
+        for _, e in entries[:max(0, count - size)]:
+            try:
+                os.remove(e)
+            except OSError:
+                continue
+            count -= 1
+            self.evictions += 1
+        self._count = count
+
+
+class SqliteScopeCache(BaseScopeCache):
+    """Single SQLite database shared by several processes
+
+    Connection is reopened after fork, WAL journal allows concurrent
+    readers while one of workers writes.
+    """
+    def __init__(self, path, max_entries=10000):
+        # type: (str, int) -> None
+        BaseScopeCache.__init__(self, max_entries)
+        self.path = path
+        self._conn = None  # type: sqlite3.Connection | None
+        self._pid = None   # type: int | None
+
+    @property
+    def conn(self):
+        # type: () -> sqlite3.Connection
+        if self._conn is None or self._pid != os.getpid():
+            import sqlite3
+            dname = os.path.dirname(os.path.abspath(self.path))
+            if not os.path.isdir(dname):
+                os.makedirs(dname)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS summaries '
+                         '(path TEXT PRIMARY KEY, data TEXT, updated REAL)')
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @property
+    def size(self):
+        # type: () -> int
+        return self.conn.execute('SELECT count(*) FROM summaries').fetchone()[0]  # type: ignore[no-any-return]
+
+    def _load(self, filename):
+        # type: (str) -> dict[str, t.Any] | None
+        row = self.conn.execute('SELECT data FROM summaries WHERE path = ?',
+                                (filename,)).fetchone()
+        if row:
+            return json.loads(row[0])  # type: ignore[no-any-return]
+        return None
+
+    def _save(self, filename, data):
+        # type: (str, dict[str, t.Any]) -> None
+        self.conn.execute('INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)',
+                          (filename, json.dumps(data), time.time()))
+
+    def shrink(self, size=None):
+        # type: (int | None) -> None
+        size = self._target_size(size)
+        count = self.size
+        if count > size:
+            self.conn.execute(
+                'DELETE FROM summaries WHERE path IN '
+                '(SELECT path FROM summaries ORDER BY updated LIMIT ?)',
+                (count - size,))
+            self.evictions += count - size
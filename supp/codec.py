@@ -0,0 +1,88 @@
+"""Wire serializers of client/server protocol
+
+Peers start with :data:`DEFAULT` (pure python umsgpack) and may switch to
+a faster codec agreed with a ``handshake`` call. Client offers names of
+codecs it has in preference order, server picks the first one it has too.
+"""
+import sys
+import marshal
+
+from . import umsgpack
+
+if False:
+    import typing as t
+
+
+class Codec(object):
+    def __init__(self, name, dumps, loads):
+        # type: (str, t.Callable[[t.Any], bytes], t.Callable[[bytes], t.Any]) -> None
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        # type: () -> str
+        return 'Codec({})'.format(self.name)
+
+
+def _msgpack_codec():
+    # type: () -> Codec | None
+    try:
+        import msgpack  # type: ignore[import-not-found]
+    except ImportError:
+        return None
+
+    def loads(data):
+        # type: (bytes) -> t.Any
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    return Codec('msgpack', lambda obj: msgpack.packb(obj, use_bin_type=True), loads)
+
+
+def _lists(obj):
+    # type: (t.Any) -> t.Any
+    """Replace tuples with lists, as msgpack codecs decode arrays"""
+    otype = type(obj)
+    if otype is tuple or otype is list:
+        return [_lists(r) for r in obj]
+    if otype is dict:
+        return {k: _lists(v) for k, v in obj.items()}
+    return obj
+
+
+def _marshal_codec():
+    # type: () -> Codec
+    # marshal format is only stable within one python version, also it
+    # must never see untrusted data. Fine for a private local socket.
+    name = 'marshal-{}.{}'.format(*sys.version_info[:2])
+    return Codec(name, lambda obj: marshal.dumps(obj, 2),
+                 lambda data: _lists(marshal.loads(data)))
+
+
+# vendored umsgpack is not type checked and binds these at import time
+DEFAULT = Codec('umsgpack', umsgpack.dumps, umsgpack.loads)  # type: ignore[attr-defined]
+
+
+def available():
+    # type: () -> list[Codec]
+    """Codecs usable in this process, fastest first"""
+    result = [_msgpack_codec(), _marshal_codec(), DEFAULT]
+    return [r for r in result if r]
+
+
+def get(name):
+    # type: (str) -> Codec
+    for r in available():
+        if r.name == name:
+            return r
+    raise KeyError(name)
+
+
+def negotiate(offered):
+    # type: (list[str]) -> Codec
+    """Pick first offered codec this process supports"""
+    names = {r.name: r for r in available()}
+    for name in offered:
+        if name in names:
+            return names[name]
+    return DEFAULT
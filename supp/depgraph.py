@@ -0,0 +1,90 @@
+"""Reverse import dependency index of loaded modules"""
+from .name import ImportedName
+
+if False:
+    import typing as t
+    from .scope import SourceScope
+    from .project import Project
+
+
+def _with_parents(name, result):
+    # type: (str, set[str]) -> None
+    parts = name.split('.')
+    for i in range(1, len(parts) + 1):
+        result.add('.'.join(parts[:i]))
+
+
+def _norm(project, name, filename, result):
+    # type: (Project, str, str, set[str]) -> None
+    try:
+        name = project.norm_package(name, filename)
+    except Exception:
+        return
+    if name:
+        _with_parents(name, result)
+
+
+def scope_imports(scope, project):
+    # type: (SourceScope, Project) -> set[str]
+    """Absolute names of modules scope may take names from
+
+    Covers plain imports, star imports and ``from`` imports in any nested
+    scope. Imported attribute may be a submodule, so ``from a import b``
+    yields both ``a`` and ``a.b``.
+    """
+    filename = scope.filename
+    result = set()  # type: set[str]
+    for mname in scope._imports:
+        _norm(project, mname, filename, result)
+    for mname in scope._star_modules:
+        _norm(project, mname, filename, result)
+    for _, name in scope.all_names:
+        if type(name) is ImportedName:
+            _norm(project, name.module, filename, result)
+            if name.mname and not name.is_star:
+                sep = '.' if name.module.strip('.') else ''
+                _norm(project, name.module + sep + name.mname, filename, result)
+    return result
+
+
+def summary_imports(summary, filename, project):
+    # type: (t.Any, str, Project) -> set[str]
+    result = set()  # type: set[str]
+    for mname in summary.imports + summary.star_imports:
+        _norm(project, mname, filename, result)
+    return result
+
+
+class DependencyGraph(object):
+    """Module name -> imported module names and the reverse index"""
+    def __init__(self):
+        # type: () -> None
+        self.deps = {}  # type: dict[str, set[str]]
+        self.rdeps = {}  # type: dict[str, set[str]]
+
+    def set_deps(self, name, deps):
+        # type: (str, t.Iterable[str]) -> None
+        deps = set(deps)
+        deps.discard(name)
+        for d in self.deps.get(name, ()):
+            if d not in deps:
+                self.rdeps[d].discard(name)
+        for d in deps:
+            self.rdeps.setdefault(d, set()).add(name)
+        self.deps[name] = deps
+
+    def dependents(self, name):
+        # type: (str) -> set[str]
+        return set(self.rdeps.get(name, ()))
+
+    def affected(self, names):
+        # type: (t.Iterable[str]) -> set[str]
+        """Given modules and all their transitive dependents"""
+        result = set(names)
+        todo = list(result)
+        while todo:
+            for d in self.rdeps.get(todo.pop(), ()):
+                if d not in result:
+                    result.add(d)
+                    todo.append(d)
+        return result
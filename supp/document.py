@@ -0,0 +1,96 @@
+"""Versioned text buffers synced by edits
+
+Edit is a ``(line, col, end_line, end_col, text)`` tuple: range of current
+text to replace. Lines are 1-based, columns are 0-based character offsets,
+end is exclusive. Edits of one change are applied in order.
+"""
+
+if False:
+    import typing as t
+
+    edit_t = tuple[int, int, int, int, str]
+
+
+class VersionError(Exception):
+    pass
+
+
+def apply_edit(lines, edit):
+    # type: (list[str], edit_t) -> None
+    """Replace edit range in text split by lines"""
+    line, col, end_line, end_col, text = edit
+    if not (1 <= line <= end_line <= len(lines)):
+        raise ValueError('Edit range {}:{}-{}:{} is out of document'.format(
+            line, col, end_line, end_col))
+    head = lines[line - 1][:col]
+    tail = lines[end_line - 1][end_col:]
+    lines[line - 1:end_line] = (head + text + tail).split('\n')
+
+
+class Document(object):
+    def __init__(self, filename, text, version=0):
+        # type: (str, str, int) -> None
+        self.filename = filename
+        self.version = version
+        self.lines = text.split('\n')
+        self._text = text  # type: str | None
+
+    @property
+    def text(self):
+        # type: () -> str
+        if self._text is None:
+            self._text = '\n'.join(self.lines)
+        return self._text
+
+    def apply(self, version, edits):
+        # type: (int, t.Iterable[edit_t]) -> None
+        if version <= self.version:
+            raise VersionError('Document {} version {} is not newer than {}'.format(
+                self.filename, version, self.version))
+
+        # edits go to a copy, failed change leaves document intact
+        lines = self.lines[:]
+        for edit in edits:
+            apply_edit(lines, edit)
+
+        self.lines = lines
+        self.version = version
+        self._text = None
+
+
+def text_edits(old, new):
+    # type: (str, str) -> list[edit_t]
+    """Single edit turning ``old`` into ``new``
+
+    Helper for clients which have only full buffer text, common prefix and
+    suffix are cut so edit size is proportional to the change.
+    """
+    if old == new:
+        return []
+
+    # skip equal lines first, char level scan is limited to changed ones
+    a = old.split('\n')
+    b = new.split('\n')
+    n = min(len(a), len(b))
+    i = 0
+    while i < n - 1 and a[i] == b[i]:
+        i += 1
+    j = 0
+    while j < n - i - 1 and a[-j - 1] == b[-j - 1]:
+        j += 1
+
+    size = min(len(old), len(new))
+    start = sum(len(r) + 1 for r in a[:i])
+    while start < size and old[start] == new[start]:
+        start += 1
+
+    end = sum(len(r) + 1 for r in a[len(a) - j:])
+    while end < size - start and old[-end - 1] == new[-end - 1]:
+        end += 1
+
+    line = old.count('\n', 0, start) + 1
+    col = start - (old.rfind('\n', 0, start) + 1)
+    old_end = len(old) - end
+    end_line = old.count('\n', 0, old_end) + 1
+    end_col = old_end - (old.rfind('\n', 0, old_end) + 1)
+    return [(line, col, end_line, end_col, new[start:len(new) - end])]
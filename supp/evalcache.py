@@ -0,0 +1,64 @@
+"""Evaluation results of library names shared between requests
+
+Every request creates a new :class:`supp.evaluator.EvalCtx`, but names of
+loaded source modules stay the same objects until their module is reloaded.
+Results are grouped by module and tagged with the module object. An entry
+is valid while the module is current, which is checked once per request
+together with module dependencies, see :meth:`supp.project.Project.is_current`.
+Project drops entries of invalidated and evicted modules together with
+their dependents.
+"""
+from threading import Lock
+
+if False:
+    import typing as t
+    from .module import SourceModule
+    from .project import Project
+
+
+class EvalCache(object):
+    def __init__(self):
+        # type: () -> None
+        self._modules = {}  # type: dict[str, tuple[SourceModule, dict[t.Hashable, t.Any]]]
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, project, module, key, default=None):
+        # type: (Project, SourceModule, t.Hashable, t.Any) -> t.Any
+        current = project.is_current(module)
+        with self._lock:
+            entry = self._modules.get(module.name)
+            if entry is not None and entry[0] is module:
+                if not current:
+                    del self._modules[module.name]
+                    self.invalidations += 1
+                elif key in entry[1]:
+                    self.hits += 1
+                    return entry[1][key]
+            self.misses += 1
+            return default
+
+    def put(self, module, key, value):
+        # type: (SourceModule, t.Hashable, t.Any) -> None
+        with self._lock:
+            entry = self._modules.get(module.name)
+            if entry is None or entry[0] is not module:
+                entry = self._modules[module.name] = module, {}
+            entry[1][key] = value
+
+    def discard(self, names):
+        # type: (t.Iterable[str]) -> None
+        with self._lock:
+            for name in names:
+                if self._modules.pop(name, None):
+                    self.invalidations += 1
+
+    def stats(self):
+        # type: () -> dict[str, int]
+        with self._lock:
+            return {'modules': len(self._modules),
+                    'entries': sum(len(r) for _, r in self._modules.values()),
+                    'hits': self.hits, 'misses': self.misses,
+                    'invalidations': self.invalidations}
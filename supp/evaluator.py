@@ -26,17 +26,66 @@ if False:
     from .name import Name
 
 
+#: Name types whose evaluation results are memoized in batch mode
+MEMO_TYPES = ImportedName, MultiName, AssignedName
+
+_missing = object()
+
+
 class EvalCtx(object):
     def __init__(self, project):
         # type: (Project) -> None
         self.project = project
         self.level = 0
         self.nodes = set()  # type: set[t.Hashable]
+        # evaluation results of bindings and (binding, attr path) pairs,
+        # enabled by batch calls
+        self.memo = None  # type: dict[t.Hashable, Object | None] | None
+        self.cuts = 0
 
     def evaluate(self, node):
-        # type: (AST | Object | Name | None) -> Object | None
-        if node is None or node in self.nodes:
+        # type: (AST | Object | Name | MultiName | None) -> Object | None
+        if node is None:
+            return None
+        if node in self.nodes:
+            # recursion guard, results computed meanwhile are incomplete
+            self.cuts += 1
             return None
+
+        ntype = type(node)
+        if ntype not in MEMO_TYPES:
+            return self._guarded_evaluate(node)
+
+        memo = self.memo
+        if memo is not None:
+            try:
+                return memo[node]
+            except KeyError:
+                pass
+
+        # names of loaded modules are evaluated once between requests
+        module = None
+        if ntype is not MultiName and self.project is not None:
+            scope = node.scope  # type: ignore[union-attr]
+            module = scope and scope.top.module
+        if module:
+            result = self.project.eval_cache.get(self.project, module, node, _missing)
+            if result is not _missing:
+                if memo is not None:
+                    memo[node] = result
+                return result  # type: ignore[no-any-return]
+
+        cuts = self.cuts
+        result = self._guarded_evaluate(node)
+        if cuts == self.cuts:
+            if memo is not None:
+                memo[node] = result
+            if module:
+                self.project.eval_cache.put(module, node, result)
+        return result
+
+    def _guarded_evaluate(self, node):
+        # type: (t.Any) -> Object | None
         self.nodes.add(node)
         self.level += 1
         result = self._evaluate(node)  # type: ignore[no-untyped-call]
@@ -44,6 +93,91 @@ class EvalCtx(object):
         self.nodes.remove(node)
         return result  # type: ignore[no-any-return]
 
+    def _binding_path(self, node):
+        # type: (t.Any) -> tuple[t.Any, tuple[str, ...]] | None
+        path = []
+        while type(node) is Attribute:
+            path.append(node.attr)
+            node = node.value
+        if type(node) is not AstName:
+            return None
+        binding = node.flow.names_at(np(node)).get(node.id)  # type: ignore[attr-defined]
+        if binding is None:
+            return None
+        path.reverse()
+        return binding, tuple(path)
+
+    def _evaluate_path(self, binding, path):
+        # type: (t.Any, tuple[str, ...]) -> Object | None
+        if not path:
+            return self.evaluate(binding)
+
+        memo = self.memo
+        assert memo is not None
+        key = binding, path
+        try:
+            return memo[key]
+        except KeyError:
+            pass
+
+        cuts = self.cuts
+        result = None
+        value = self._evaluate_path(binding, path[:-1])
+        if value:
+            result = self.evaluate(value.get_attr(self, path[-1]))
+        if cuts == self.cuts:
+            memo[key] = result
+        return result
+
+    def evaluate_many(self, nodes):
+        # type: (t.Iterable[AST]) -> list[Object | None]
+        """Evaluate nodes of one snapshot sharing intermediate results
+
+        Names and attribute chains are memoized by their binding and
+        attribute path, so each one is evaluated once per context.
+        """
+        if self.memo is None:
+            self.memo = {}
+
+        result = []  # type: list[Object | None]
+        for node in nodes:
+            key = self._binding_path(node)
+            if key is None:
+                result.append(self.evaluate(node))
+            else:
+                result.append(self._evaluate_path(*key))
+        return result
+
+    def declarations_many(self, nodes):
+        # type: (t.Iterable[AST]) -> list[list[Name]]
+        """Batch version of :meth:`declarations` with shared memo"""
+        if self.memo is None:
+            self.memo = {}
+
+        result = []  # type: list[list[Name]]
+        decls = {}  # type: dict[t.Hashable, list[Name]]
+        for node in nodes:
+            key = self._binding_path(node)
+            if key is None:
+                result.append(self.declarations(node, []))  # type: ignore[arg-type]
+                continue
+
+            try:
+                r = decls[key]
+            except KeyError:
+                binding, path = key
+                if path:
+                    r = []
+                    value = self._evaluate_path(binding, path[:-1])
+                    cname = value and value.get_attr(self, path[-1])
+                    if cname:
+                        r = self.declarations(cname, [])  # type: ignore[arg-type]
+                else:
+                    r = self.declarations(binding, [])
+                decls[key] = r
+            result.append(list(r))
+        return result
+
     def _evaluate(self, node):  # type: ignore[no-untyped-def]
         node_type = type(node)
 
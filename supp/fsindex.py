@@ -0,0 +1,98 @@
+import os
+from contextlib import contextmanager
+
+if False:
+    import typing as t
+    from .watcher import InotifyWatcher
+
+EMPTY = frozenset()  # type: frozenset[str]
+
+
+class FSIndex(object):
+    """Directory listings cache validated by directory mtime
+
+    Outside of :meth:`snapshot` every lookup costs one ``stat`` of the
+    directory. Inside a snapshot each directory is validated only once,
+    subsequent lookups are plain dict lookups. Directories tracked by
+    ``watcher`` are never stat-ed again, they are invalidated explicitly.
+    Paths are keyed in absolute form, the same one watcher reports.
+    """
+    def __init__(self, watcher=None):
+        # type: (InotifyWatcher | None) -> None
+        self.watcher = watcher
+        self._dirs = {}  # type: dict[str, tuple[float | None, frozenset[str], int]]
+        self._generation = 0
+        self._frozen = 0
+        self.stat_calls = 0
+        self.listdir_calls = 0
+        self.lookups = 0
+
+    def stats(self):
+        # type: () -> dict[str, int]
+        return {'stat': self.stat_calls, 'listdir': self.listdir_calls,
+                'lookups': self.lookups, 'dirs': len(self._dirs)}
+
+    @contextmanager
+    def snapshot(self):
+        # type: () -> t.Iterator[None]
+        self._generation += 1
+        self._frozen += 1
+        try:
+            yield
+        finally:
+            self._frozen -= 1
+
+    def invalidate(self, path=None):
+        # type: (str | None) -> None
+        if path is None:
+            self._dirs.clear()
+        else:
+            self._dirs.pop(os.path.abspath(path), None)
+
+    def listdir(self, path):
+        # type: (str) -> frozenset[str]
+        self.lookups += 1
+        path = os.path.abspath(path)
+        entry = self._dirs.get(path)
+        watcher = self.watcher
+        if entry is not None:
+            if self._frozen and entry[2] == self._generation:
+                return entry[1]
+            if watcher is not None and (path in watcher or
+                                        os.path.dirname(path) in watcher):
+                # parent watch reports creation/removal of path itself
+                return entry[1]
+
+        if watcher is not None:
+            watcher.watch(path)
+
+        self.stat_calls += 1
+        try:
+            mtime = os.stat(path).st_mtime  # type: float | None
+        except OSError:
+            mtime = None
+            if watcher is not None:
+                watcher.watch(os.path.dirname(path))
+
+        if entry is not None and entry[0] == mtime:
+            names = entry[1]
+        elif mtime is None:
+            names = EMPTY
+        else:
+            self.listdir_calls += 1
+            try:
+                names = frozenset(os.listdir(path))
+            except OSError:
+                names = EMPTY
+
+        self._dirs[path] = mtime, names, self._generation
+        return names
+
+    def exists(self, path):
+        # type: (str) -> bool
+        dname, name = os.path.split(path)
+        return name in self.listdir(dname or '.')
+
+    def is_package(self, path):
+        # type: (str) -> bool
+        return '__init__.py' in self.listdir(path)
@@ -0,0 +1,164 @@
+"""Imports checker
+
+Every ``import`` and ``from ... import`` of a file is resolved against a
+project: missing modules are reported as ``E03``, names a module doesn't
+provide as ``E04``. Imports in ``try/except ImportError`` statements are
+skipped, they are expected to fail.
+
+Checking is split into collecting of import requests (parse only) and
+resolving of modules, so a batch over many files resolves each module
+once, see :func:`supp.batch.check_imports`.
+"""
+import sys
+from ast import NodeVisitor, Name as AstName, Attribute, Tuple
+
+from .util import Source, np
+
+if False:
+    import typing as t
+    import ast
+    from .project import Project
+
+    # module, imported name or None, line, col
+    request_t = tuple[str, str | None, int, int]
+
+GUARD_EXCEPTIONS = {'ImportError', 'ModuleNotFoundError', 'Exception', 'BaseException'}
+
+
+def _is_guard(handler):
+    # type: (ast.ExceptHandler) -> bool
+    htype = handler.type
+    if htype is None:
+        return True
+    types = htype.elts if type(htype) is Tuple else [htype]
+    for r in types:
+        if type(r) is AstName and r.id in GUARD_EXCEPTIONS:
+            return True
+        if type(r) is Attribute and r.attr in GUARD_EXCEPTIONS:
+            return True
+    return False
+
+
+class ImportCollector(NodeVisitor):
+    def __init__(self, project, filename):
+        # type: (Project, str) -> None
+        self.project = project
+        self.filename = filename
+        self.requests = []  # type: list[request_t]
+        self.errors = []  # type: list[tuple[str, str, int, int, None]]
+
+    def norm(self, module, node):
+        # type: (str, ast.AST) -> str | None
+        try:
+            return self.project.norm_package(module, self.filename)
+        except Exception:
+            line, col = np(node)
+            self.errors.append(('E03', 'Unresolved import: {}'.format(module),
+                                line, col, None))
+            return None
+
+    def visit_Try(self, node):
+        # type: (ast.Try) -> None
+        # both the import and it's fallback are allowed to fail
+        if not any(_is_guard(h) for h in node.handlers):
+            for r in node.body:
+                self.visit(r)
+            for h in node.handlers:
+                self.visit(h)
+        for r in node.orelse + node.finalbody:
+            self.visit(r)
+
+    visit_TryExcept = visit_Try
+
+    def visit_Import(self, node):
+        # type: (ast.Import) -> None
+        line, col = np(node)
+        for a in node.names:
+            self.requests.append((a.name, None, line, col))
+
+    def visit_ImportFrom(self, node):
+        # type: (ast.ImportFrom) -> None
+        if node.module == '__future__':
+            return
+        module = self.norm('.' * (node.level or 0) + (node.module or ''), node)
+        if module is None:
+            return
+        line, col = np(node)
+        for a in node.names:
+            self.requests.append((module, None if a.name == '*' else a.name, line, col))
+
+
+def collect(project, source, filename):
+    # type: (Project, str, str) -> tuple[list[request_t], list[tuple[str, str, int, int, None]]]
+    """Import requests of a source and errors found without resolving"""
+    collector = ImportCollector(project, filename)
+    try:
+        tree = Source(source, filename).tree
+    except SyntaxError:
+        return [], []
+    collector.visit(tree)
+    return collector.requests, collector.errors
+
+
+def module_requests(requests):
+    # type: (t.Iterable[request_t]) -> dict[str, set[str]]
+    """Group imported names by module"""
+    result = {}  # type: dict[str, set[str]]
+    for module, name, _, _ in requests:
+        names = result.setdefault(module, set())
+        if name:
+            names.add(name)
+    return result
+
+
+def resolve(project, module, names):
+    # type: (Project, str, t.Iterable[str]) -> tuple[bool, list[str]]
+    """Check module exists, return it's status and missing names"""
+    try:
+        m = project.get_module(module)
+    except Exception:
+        return module in sys.builtin_module_names, []
+
+    try:
+        attrs = m.attr_list(None)  # type: ignore[arg-type]
+    except Exception:
+        return True, []
+    if '__getattr__' in attrs:
+        return True, []
+
+    # names may be created at runtime, already imported module knows them
+    runtime = sys.modules.get(module)
+    missing = []
+    for name in sorted(names):
+        if name in attrs or hasattr(runtime, name):
+            continue
+        if project.find_module(module + '.' + name):
+            continue
+        missing.append(name)
+    return True, missing
+
+
+def report(requests, resolved):
+    # type: (list[request_t], dict[str, tuple[bool, list[str]]]) -> list[tuple[str, str, int, int, None]]
+    result = []  # type: list[tuple[str, str, int, int, None]]
+    seen = set()  # type: set[tuple[str, int, int]]
+    for module, name, line, col in requests:
+        found, missing = resolved[module]
+        if not found:
+            if (module, line, col) not in seen:
+                seen.add((module, line, col))
+                result.append(('E03', 'Unresolved import: {}'.format(module),
+                               line, col, None))
+        elif name in missing:
+            result.append(('E04', 'Missing name: {} in {}'.format(name, module),
+                           line, col, None))
+    return result
+
+
+def check(project, source, filename):
+    # type: (Project, str, str) -> list[tuple[str, str, int, int, None]]
+    """Check imports of a single source"""
+    requests, errors = collect(project, source, filename)
+    resolved = {module: resolve(project, module, names)
+                for module, names in module_requests(requests).items()}
+    return errors + report(requests, resolved)
@@ -0,0 +1,276 @@
+import logging
+from ast import parse, increment_lineno, FunctionDef, ClassDef, Import, walk
+from bisect import bisect_left, bisect_right
+
+from .nast import extract_scope, extract_visitor
+from .scope import FuncScope
+
+try:
+    from ast import AsyncFunctionDef
+except ImportError:  # pragma: no cover
+    class AsyncFunctionDef: pass  # type: ignore[no-redef]
+
+if False:
+    import typing as t
+    from ast import AST, stmt, expr, Module
+    from .util import Source
+    from .scope import SourceScope, Scope
+    from .project import Project
+
+    FuncDef = FunctionDef | AsyncFunctionDef
+    ScopeDef = FunctionDef | AsyncFunctionDef | ClassDef
+
+log = logging.getLogger('supp.incremental')
+
+FUNC_NODES = FunctionDef, AsyncFunctionDef
+SCOPE_NODES = FunctionDef, AsyncFunctionDef, ClassDef
+
+
+def stmt_start(node):
+    # type: (stmt) -> int
+    decorators = getattr(node, 'decorator_list', None)  # type: list[expr] | None
+    if decorators:
+        return min(node.lineno, decorators[0].lineno)
+    return node.lineno
+
+
+def find_func_path(node, first, last):
+    # type: (ScopeDef, int, int) -> list[int] | None
+    """Return body index path to innermost function with [first, last] inside its body"""
+    result = None
+    path = []  # type: list[int]
+    while True:
+        if (isinstance(node, FUNC_NODES) and first > node.lineno
+                and first >= node.body[0].lineno and last <= (node.end_lineno or 0)):
+            result = path[:]
+
+        for idx, child in enumerate(node.body):
+            if (isinstance(child, SCOPE_NODES) and
+                    stmt_start(child) <= first and last <= (child.end_lineno or 0)):
+                path.append(idx)
+                node = child
+                break
+        else:
+            return result
+
+
+def follow_path(node, path):
+    # type: (stmt, list[int]) -> stmt
+    for idx in path:
+        node = node.body[idx]  # type: ignore[attr-defined]
+    return node
+
+
+def has_imports(node):
+    # type: (AST) -> bool
+    return any(type(n) is Import for n in walk(node))
+
+
+def reset_eval_caches(scope):
+    # type: (SourceScope) -> None
+    """Drop evaluation results cached on scope objects between requests"""
+    scope.__dict__.pop('_ctx_values', None)
+    for flow in scope._all_flows:
+        flow.scope.__dict__.pop('_ctx_values', None)
+        for name in flow._names:
+            _unset(name, '_ctx_values')
+            _unset(name, '_ref')
+    for name in scope._global_names.values():
+        _unset(name, '_ref')
+
+
+def _unset(obj, attr):
+    # type: (object, str) -> None
+    # names have slots, missing value means not computed yet
+    try:
+        delattr(obj, attr)
+    except AttributeError:
+        pass
+
+
+class Buffer(object):
+    """Last source, tree and scope of an edited file"""
+    def __init__(self):
+        # type: () -> None
+        self.lines = None   # type: list[str] | None
+        self.source = None  # type: Source | None
+        self._scope = None  # type: SourceScope | None
+        self._plan = None   # type: tuple[t.Any, ...] | None
+
+    def _full(self, source, lines):
+        # type: (Source, list[str] | None) -> Source
+        self.lines = lines
+        self.source = source
+        self._scope = None
+        self._plan = ('full',)
+        return source
+
+    def update(self, source):
+        # type: (Source) -> Source
+        text = source.source
+        if text.count('\r') != text.count('\r\n'):
+            return self._full(source, None)
+
+        if self._plan and self._plan[0] == 'func':
+            # pending function refresh wasn't applied, scope is stale
+            self._scope = None
+            self._plan = ('full',)
+
+        lines = text.split('\n')
+        old = self.lines
+        prev = self.source
+        if old is None or prev is None or 'tree' not in prev.__dict__:
+            return self._full(source, lines)
+
+        if old == lines:
+            return prev
+
+        n, m = len(old), len(lines)
+        a = 0
+        lim = min(n, m)
+        while a < lim and old[a] == lines[a]:
+            a += 1
+        s = 0
+        while s < lim - a and old[n - 1 - s] == lines[m - 1 - s]:
+            s += 1
+
+        delta = (m - s) - (n - s)
+        first, last = a + 1, max(n - s, a + 1)
+
+        tree = prev.tree  # type: Module  # type: ignore[assignment]
+        body = tree.body
+        starts = [stmt_start(r) for r in body]
+        # statements i..k cover edited lines, several ones may start on
+        # the same line
+        k = bisect_right(starts, last) - 1
+        i = bisect_right(starts, first) - 1
+        if i < 0:
+            return self._full(source, lines)
+        i = bisect_left(starts, starts[i])
+
+        end = starts[k + 1] - 1 if k + 1 < len(starts) else n
+
+        try:
+            chunk = parse('\n'.join(lines[starts[i] - 1:end + delta]),
+                          source.filename).body
+        except SyntaxError:
+            return self._full(source, lines)
+
+        old_stmt = body[i]
+        if (self._scope is not None and delta == 0 and len(chunk) == 1 and i == k
+                and type(chunk[0]) is type(old_stmt)
+                and isinstance(old_stmt, SCOPE_NODES)):
+            new_stmt = chunk[0]
+            increment_lineno(new_stmt, starts[i] - 1)
+            path = find_func_path(old_stmt, first, last)
+            if path is not None:
+                old_func = follow_path(old_stmt, path)
+                new_func = follow_path(new_stmt, path)
+                if (type(new_func) is type(old_func)
+                        and new_func.name == old_func.name  # type: ignore[attr-defined]
+                        and new_func.lineno == old_func.lineno
+                        and not has_imports(old_func)
+                        and not has_imports(new_func)):
+                    old_func.body = new_func.body  # type: ignore[attr-defined]
+                    old_func.end_col_offset = new_func.end_col_offset
+                    source.__dict__['tree'] = tree
+                    self.lines = lines
+                    self.source = source
+                    self._plan = ('func', old_func)
+                    return source
+        else:
+            for r in chunk:
+                increment_lineno(r, starts[i] - 1)
+
+        if delta:
+            for r in body[k + 1:]:
+                increment_lineno(r, delta)
+
+        tree.body = body[:i] + chunk + body[k + 1:]
+        source.__dict__['tree'] = tree
+        self._plan = ('full',)
+        self._scope = None
+        self.lines = lines
+        self.source = source
+        return source
+
+    def scope(self, project):
+        # type: (Project) -> SourceScope
+        plan = self._plan
+        scope = self._scope
+        if scope is not None and plan:
+            if plan[0] == 'same':
+                reset_eval_caches(scope)
+                return scope
+            elif plan[0] == 'func' and self._refresh_function(scope, plan[1]):
+                reset_eval_caches(scope)
+                self._plan = ('same',)
+                return scope
+
+        assert self.source
+        scope = self._scope = extract_scope(self.source, project)
+        self._plan = ('same',)
+        return scope
+
+    def _refresh_function(self, top, node):
+        # type: (SourceScope, FuncDef) -> bool
+        fscope = None
+        for flow in top._all_flows:
+            if type(flow.scope) is FuncScope and flow.scope.node is node:
+                fscope = flow.scope
+                break
+
+        if fscope is None:
+            return False
+
+        def inside(scope):
+            # type: (Scope) -> bool
+            while scope is not None and scope is not top:
+                if scope is fscope:
+                    return True
+                scope = scope.parent
+            return False
+
+        top._all_flows[:] = [r for r in top._all_flows if not inside(r.scope)]
+        top._attr_assigns[:] = [r for r in top._attr_assigns if not inside(r[0])]
+        for k, v in list(top._global_names.items()):
+            if inside(v.scope):
+                del top._global_names[k]
+
+        assert self.source
+        top.source = self.source
+        FuncScope.__init__(fscope, fscope.parent, node, top)
+
+        visitor = extract_visitor()
+        visitor.top = top
+        visitor.flow = fscope.flow
+        visitor.visit_in_flow(node.body, fscope.flow)
+        return True
+
+
+class BufferCache(object):
+    """Per filename incremental parse and scope extraction
+
+    Only the top-level statement containing an edit is re-parsed. If an edit
+    doesn't change line count and is confined to a function body, only that
+    function is re-extracted and flows of other scopes are reused.
+    """
+    def __init__(self, size=10):
+        # type: (int) -> None
+        self.size = size
+        self._buffers = {}  # type: dict[str, Buffer]
+
+    def get(self, filename):
+        # type: (str) -> Buffer
+        try:
+            buf = self._buffers.pop(filename)
+        except KeyError:
+            buf = Buffer()
+            if len(self._buffers) >= self.size:
+                del self._buffers[next(iter(self._buffers))]
+        self._buffers[filename] = buf
+        return buf
+
+    def clear(self):
+        # type: () -> None
+        self._buffers.clear()
@@ -1,5 +1,8 @@
 # type: ignore
+import re
 import logging
+import tokenize
+from io import StringIO
 
 from .util import Source, get_name_usages, np
 from .name import MultiName, ArgumentName, ImportedName
@@ -12,6 +15,73 @@ from .evaluator import EvalCtx
 IGNORED_SCOPES = SourceScope, ClassScope
 log = logging.getLogger('supp.linter')
 
+NOQA_RE = re.compile(r'#\s*(supp:\s*)?noqa\b(?::\s*([\w\s,]+))?', re.I)
+
+
+class Suppressions(object):
+    """Codes suppressed by ``# noqa`` comments
+
+    ``# noqa`` or ``# noqa: W01,E02`` on a line suppress all or given codes
+    of this line. ``# supp: noqa`` or ``# supp: noqa: W01`` comment on its
+    own line does the same for whole file. ``None`` means all codes.
+    """
+    def __init__(self):
+        self.file = set()
+        self.lines = {}
+
+    def add(self, codes, line=None):
+        if line is None:
+            current = self.file
+        else:
+            current = self.lines.get(line, set())
+
+        if codes is None or current is None:
+            current = None
+        else:
+            current = current | codes
+
+        if line is None:
+            self.file = current
+        else:
+            self.lines[line] = current
+
+    def file_suppressed(self, code):
+        return self.file is None or code in self.file
+
+    def suppressed(self, code, line):
+        if self.file is None or code in self.file:
+            return True
+        try:
+            codes = self.lines[line]
+        except KeyError:
+            return False
+        return codes is None or code in codes
+
+
+def suppressions(source):
+    result = Suppressions()
+    if '#' not in source or 'noqa' not in source.lower():
+        return result
+
+    line_start = True
+    try:
+        for tok in tokenize.generate_tokens(StringIO(source).readline):
+            if tok[0] == tokenize.COMMENT:
+                m = NOQA_RE.match(tok[1])
+                if m:
+                    codes = m.group(2)
+                    if codes:
+                        codes = set(r.upper() for r in re.split(r'[\s,]+', codes) if r)
+                    if m.group(1) and line_start:
+                        result.add(codes or None)
+                    else:
+                        result.add(codes or None, tok[2][0])
+            line_start = tok[0] in (tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT,
+                                    tokenize.INDENT, tokenize.DEDENT)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+    return result
+
 
 def use_name(name):
     if isinstance(name, MultiName):
@@ -33,6 +103,13 @@ def lint(project, source, filename=None, debug=False):
         print_dump(source.tree)
 
     result = []
+    noqa = suppressions(source.source)
+    # suppressed diagnostics are not computed at all
+    check_undefined = not noqa.file_suppressed('E02')
+    check_unused = not (noqa.file_suppressed('W01') and noqa.file_suppressed('W02'))
+    if not (check_undefined or check_unused):
+        return result
+
     scope = extract_scope(source, project)
     name_usages = get_name_usages(source.tree)
     qualified_imports = set()
@@ -42,8 +119,13 @@ def lint(project, source, filename=None, debug=False):
         try:
             flow = name.flow
         except AttributeError:
-            result.append(('E42', 'UNKNOWN NAME: {}'.format(name.id),
-                           location[0], location[1], None))
+            if not noqa.suppressed('E42', location[0]):
+                result.append(('E42', 'UNKNOWN NAME: {}'.format(name.id),
+                               location[0], location[1], None))
+            continue
+
+        # usages mark names as used, needed only for unused names check
+        if not check_unused and noqa.suppressed('E02', location[0]):
             continue
 
         snames = flow.names_at(location)
@@ -52,8 +134,9 @@ def lint(project, source, filename=None, debug=False):
             sname = snames[name.id]
             # print('@@', name.id, sname)
         except KeyError:
-            result.append(('E02', 'Undefined name: {}'.format(name.id),
-                           location[0], location[1], flow))
+            if not noqa.suppressed('E02', location[0]):
+                result.append(('E02', 'Undefined name: {}'.format(name.id),
+                               location[0], location[1], flow))
         else:
             # if type(sname) is MultiName and sname.has_undefined:
             #     use_name(sname)
@@ -69,10 +152,13 @@ def lint(project, source, filename=None, debug=False):
 
                 use_name(sname)
 
+    if not check_unused:
+        return result
+
     for flow, name in scope.all_names:
         w = 'W01'
         message = 'Unused name: {}'
-        if hasattr(name, 'used'):
+        if getattr(name, 'used', False):
             continue
         if name.name.startswith('_'):
             continue
@@ -91,6 +177,8 @@ def lint(project, source, filename=None, debug=False):
         if (isinstance(name, ArgumentName) and
                 isinstance(flow.scope.parent, ClassScope)):
             continue
+        if noqa.suppressed(w, name.declared_at[0]):
+            continue
 
         # print('###', name)
         result.append((w, message.format(name.name),
@@ -105,9 +193,8 @@ def check_names(project, source, filename=None):
     ctx = EvalCtx(project)
 
     name_usages = get_name_usages(source.tree)
-    for name in name_usages:
+    for name, value in zip(name_usages, ctx.evaluate_many(name_usages)):
         print('@@@', name.id, np(name))
-        value = ctx.evaluate(name)
         if value:
             print('GUT', name.id, np(name), value)
         else:
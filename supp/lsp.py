@@ -0,0 +1,339 @@
+# type: ignore
+"""Language Server Protocol front end over stdio
+
+    python -m supp.lsp
+
+Maps ``textDocument/completion`` to :func:`supp.assistant.assist`,
+``textDocument/definition`` to :func:`supp.assistant.location` and publishes
+:func:`supp.linter.lint` results as debounced diagnostics. Documents and
+lint scheduling are handled by :class:`supp.server.Server`. Positions are
+counted in code points when client supports ``utf-32`` position encoding,
+otherwise they are converted from and to UTF-16 units. Columns of results
+come from AST nodes and are UTF-8 byte offsets.
+"""
+import sys
+import json
+import logging
+import linecache
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from urllib.parse import urlparse, unquote, quote
+except ImportError:  # pragma: no cover
+    from urlparse import urlparse
+    from urllib import unquote, quote
+
+from .server import Server
+from .document import VersionError, apply_edit
+
+log = logging.getLogger('supp.lsp')
+
+REQUEST_CANCELLED = -32800
+CONTENT_MODIFIED = -32801
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+SYNC_INCREMENTAL = 2
+SEVERITY_ERROR = 1
+SEVERITY_WARNING = 2
+
+
+def uri_to_path(uri):
+    return unquote(urlparse(uri).path)
+
+
+def path_to_uri(path):
+    return 'file://' + quote(path)
+
+
+def lsp_position(line, col):
+    return {'line': line - 1, 'character': col}
+
+
+def utf16_to_col(text, units):
+    """Code point column of UTF-16 offset in a line"""
+    count = 0
+    for i, ch in enumerate(text):
+        if count >= units:
+            return i
+        count += 2 if ord(ch) > 0xFFFF else 1
+    return len(text)
+
+
+def byte_to_col(text, offset):
+    """Code point column of UTF-8 byte offset in a line"""
+    return len(text.encode('utf-8')[:offset].decode('utf-8', 'ignore'))
+
+
+def col_to_utf16(text, col):
+    return col + sum(1 for ch in text[:col] if ord(ch) > 0xFFFF)
+
+
+def lsp_range(line, col, end_line=None, end_col=None):
+    return {'start': lsp_position(line, col),
+            'end': lsp_position(end_line or line, col if end_col is None else end_col)}
+
+
+class LanguageServer(object):
+    """JSON-RPC dispatcher
+
+    Document notifications are applied by reader thread in arrival order.
+    Completion and definition run on a bounded pool. Lint is scheduled by
+    :class:`supp.scheduler.LintScheduler` ``lint_delay`` seconds after the
+    last change of a document, when no completion or definition is pending.
+    """
+    def __init__(self, rfile, wfile, workers=2, lint_delay=0.3):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.lint_delay = lint_delay
+        self.server = Server(None, publish=self.publish_diagnostics,
+                             is_busy=lambda: bool(self.requests))
+        self.executor = ThreadPoolExecutor(workers)
+        self.write_lock = Lock()
+        self.requests = {}
+        self.requests_lock = Lock()
+        self.running = False
+        # LSP default, until client agrees to code points
+        self.utf16 = True
+
+        self.sync_handlers = {
+            'initialize': self.initialize,
+            'initialized': lambda params: None,
+            'shutdown': lambda params: None,
+            'exit': self.exit,
+            '$/cancelRequest': self.cancel,
+            'textDocument/didOpen': self.did_open,
+            'textDocument/didChange': self.did_change,
+            'textDocument/didClose': self.did_close,
+            'textDocument/didSave': lambda params: None,
+        }
+        self.pool_handlers = {
+            'textDocument/completion': self.completion,
+            'textDocument/definition': self.definition,
+        }
+
+    def read_message(self):
+        size = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                break
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-length':
+                size = int(value)
+
+        if size is None:
+            return None
+        return json.loads(self.rfile.read(size).decode('utf-8'))
+
+    def write_message(self, message):
+        body = json.dumps(message).encode('utf-8')
+        with self.write_lock:
+            self.wfile.write('Content-Length: {}\r\n\r\n'.format(len(body)).encode('ascii'))
+            self.wfile.write(body)
+            self.wfile.flush()
+
+    def respond(self, rid, result=None, error=None):
+        message = {'jsonrpc': '2.0', 'id': rid}
+        if error:
+            message['error'] = {'code': error[0], 'message': error[1]}
+        else:
+            message['result'] = result
+        self.write_message(message)
+
+    def notify(self, method, params):
+        self.write_message({'jsonrpc': '2.0', 'method': method, 'params': params})
+
+    def run(self):
+        self.running = True
+        try:
+            while self.running:
+                message = self.read_message()
+                if message is None:
+                    break
+                self.handle(message)
+        finally:
+            self.server.lint_scheduler.stop()
+            self.executor.shutdown(wait=True)
+
+    def handle(self, message):
+        method = message.get('method')
+        rid = message.get('id')
+        if method is None:
+            return
+
+        params = message.get('params') or {}
+        if method in self.sync_handlers:
+            try:
+                result = self.sync_handlers[method](params)
+            except Exception as e:
+                log.exception('%s error', method)
+                if rid is not None:
+                    self.respond(rid, error=(INTERNAL_ERROR, str(e)))
+                return
+            if rid is not None:
+                self.respond(rid, result)
+        elif method in self.pool_handlers:
+            # snapshot document version, result must match what client sent
+            version = self.version(params)
+            # registered before it can finish, removed when done
+            with self.requests_lock:
+                future = self.executor.submit(self.process, rid, method, params, version)
+                self.requests[rid] = future
+            future.add_done_callback(lambda f: self.forget(rid, f))
+        elif rid is not None:
+            self.respond(rid, error=(METHOD_NOT_FOUND, 'Unknown method: ' + method))
+
+    def process(self, rid, method, params, version):
+        try:
+            result = self.pool_handlers[method](params, version)
+        except VersionError as e:
+            self.respond(rid, error=(CONTENT_MODIFIED, str(e)))
+        except Exception as e:
+            log.exception('%s error', method)
+            self.respond(rid, error=(INTERNAL_ERROR, str(e)))
+        else:
+            self.respond(rid, result)
+
+    def forget(self, rid, future):
+        with self.requests_lock:
+            if self.requests.get(rid) is future:
+                del self.requests[rid]
+
+    def cancel(self, params):
+        rid = params['id']
+        with self.requests_lock:
+            future = self.requests.pop(rid, None)
+        if future and future.cancel():
+            self.respond(rid, error=(REQUEST_CANCELLED, 'Request cancelled'))
+
+    def exit(self, params):
+        self.running = False
+
+    def initialize(self, params):
+        options = params.get('initializationOptions') or {}
+        root = params.get('rootUri')
+        sources = options.get('sources') or [uri_to_path(root) if root else '.']
+        config = dict(options, sources=sources)
+        config.setdefault('lint_delay', self.lint_delay)
+        self.server.configure(config)
+        general = (params.get('capabilities') or {}).get('general') or {}
+        self.utf16 = 'utf-32' not in (general.get('positionEncodings') or ())
+        return {
+            'capabilities': {
+                'positionEncoding': 'utf-16' if self.utf16 else 'utf-32',
+                'textDocumentSync': {'openClose': True, 'change': SYNC_INCREMENTAL},
+                'completionProvider': {'triggerCharacters': ['.']},
+                'definitionProvider': True,
+            },
+            'serverInfo': {'name': 'supp'},
+        }
+
+    def line_text(self, filename, line, lines=None):
+        if lines is None:
+            doc = self.server.documents.get(filename)
+            if doc is None:
+                return linecache.getline(filename, line).rstrip('\n')
+            lines = doc.lines
+        return lines[line - 1] if 1 <= line <= len(lines) else ''
+
+    def position(self, filename, pos, lines=None):
+        """1-based line and code point column of LSP position"""
+        line, character = pos['line'] + 1, pos['character']
+        if self.utf16:
+            character = utf16_to_col(self.line_text(filename, line, lines), character)
+        return line, character
+
+    def lsp_range(self, filename, line, offset):
+        """LSP range of UTF-8 byte offset, as AST nodes report it"""
+        text = self.line_text(filename, line)
+        col = byte_to_col(text, offset)
+        if self.utf16:
+            col = col_to_utf16(text, col)
+        return lsp_range(line, col)
+
+    def version(self, params):
+        doc = self.server.documents.get(uri_to_path(params['textDocument']['uri']))
+        return doc and doc.version
+
+    def did_open(self, params):
+        doc = params['textDocument']
+        filename = uri_to_path(doc['uri'])
+        version = doc.get('version', 0)
+        self.server.doc_open(filename, doc['text'], version)
+        self.server.schedule_lint(filename, version)
+
+    def did_change(self, params):
+        doc = params['textDocument']
+        filename = uri_to_path(doc['uri'])
+        edits = []
+        # edits are relative to text after preceding ones
+        lines = self.server.documents[filename].lines[:]
+        for change in params['contentChanges']:
+            rng = change.get('range')
+            if rng:
+                edit = (self.position(filename, rng['start'], lines)
+                        + self.position(filename, rng['end'], lines)
+                        + (change['text'],))
+                apply_edit(lines, edit)
+                edits.append(edit)
+            else:
+                # full text replaces document, earlier edits don't matter
+                current = self.server.documents[filename].version
+                self.server.doc_open(filename, change['text'], current)
+                lines = change['text'].split('\n')
+                edits = []
+        self.server.doc_change(filename, doc['version'], edits)
+        self.server.schedule_lint(filename, doc['version'])
+
+    def did_close(self, params):
+        filename = uri_to_path(params['textDocument']['uri'])
+        self.server.doc_close(filename)
+        self.notify('textDocument/publishDiagnostics',
+                    {'uri': path_to_uri(filename), 'diagnostics': []})
+
+    def completion(self, params, version):
+        filename = uri_to_path(params['textDocument']['uri'])
+        position = self.position(filename, params['position'])
+        _, names = self.server.doc_assist(filename, version, position)
+        return {'isIncomplete': False, 'items': [{'label': r} for r in names]}
+
+    def definition(self, params, version):
+        filename = uri_to_path(params['textDocument']['uri'])
+        position = self.position(filename, params['position'])
+        result = []
+        for r in self.server.doc_location(filename, version, position):
+            for loc in (r if isinstance(r, list) else [r]):
+                line, col = loc['loc']
+                target = loc['file'] or filename
+                result.append({'uri': path_to_uri(target),
+                               'range': self.lsp_range(target, line, col)})
+        return result
+
+    def publish_diagnostics(self, filename, version, rows):
+        diagnostics = []
+        for code, message, line, col in rows:
+            diagnostics.append({
+                'range': self.lsp_range(filename, line or 1, col or 0),
+                'severity': SEVERITY_ERROR if code.startswith('E') else SEVERITY_WARNING,
+                'code': code,
+                'source': 'supp',
+                'message': message,
+            })
+        self.notify('textDocument/publishDiagnostics',
+                    {'uri': path_to_uri(filename), 'version': version,
+                     'diagnostics': diagnostics})
+
+
+def main():
+    logging.basicConfig(stream=sys.stderr, level=logging.ERROR,
+                        format='%(name)s %(levelname)s: %(message)s')
+    LanguageServer(sys.stdin.buffer, sys.stdout.buffer).run()
+
+
+if __name__ == '__main__':
+    main()
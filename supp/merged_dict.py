@@ -1,46 +1,96 @@
 from .compat import iteritems
 
+_missing = object()
+
+#: Lookups served by walking layers before a view is merged into one dict
+FLATTEN_AFTER = 8
+
 
 class MergedDict(object):
+    """Read-only view of a mapping chain, first mapping wins
+
+    Nested views are kept as layers, not copied, so once a parent view is
+    flattened every view built on top of it benefits. A view is flattened
+    into a single dict on iteration or after ``FLATTEN_AFTER`` lookups.
+    Layers must not change after view creation.
+    """
+    __slots__ = ('_dicts', '_flat', '_lookups')
+
     def __init__(self, *dicts):
-        self._dicts = dd = []
-        for d in dicts:
-            if type(d) == MergedDict:
-                dd.extend(d._dicts)
-            else:
-                dd.append(d)
+        self._dicts = dicts
+        self._flat = None
+        self._lookups = 0
+        if len(dicts) == 1 and type(dicts[0]) is dict:
+            self._flat = dicts[0]
 
-    def __getitem__(self, key):
-        for p in self._dicts:
-            try:
-                return p[key]
-            except KeyError:
-                pass
+    def flat(self):
+        flat = self._flat
+        if flat is not None:
+            return flat
 
-        raise KeyError(key)
+        # last layers form parent chains which may be long, walk them
+        # without recursion
+        chain = []
+        m = self
+        while type(m) is MergedDict and m._flat is None:
+            chain.append(m)
+            m = m._dicts[-1] if m._dicts else {}
 
-    def __contains__(self, key):
-        return any(key in p for p in self._dicts)
+        flat = dict(m.flat() if type(m) is MergedDict else m)
+        for m in reversed(chain):
+            for d in reversed(m._dicts[:-1]):
+                flat.update(d.flat() if type(d) is MergedDict else d)
+        self._flat = flat
+        return flat
 
-    def iteritems(self):
-        result = {}
-        for p in reversed(self._dicts):
-            result.update(p)
+    def get(self, key, default=None):
+        m = self
+        while True:
+            flat = m._flat
+            if flat is not None:
+                return flat.get(key, default)
 
-        return iteritems(result)
+            m._lookups += 1
+            if m._lookups > FLATTEN_AFTER:
+                return m.flat().get(key, default)
 
-    items = iteritems
+            dicts = m._dicts
+            if not dicts:
+                return default
+            for d in dicts[:-1]:
+                value = d.get(key, _missing)
+                if value is not _missing:
+                    return value
+
+            last = dicts[-1]
+            if type(last) is not MergedDict:
+                return last.get(key, default)
+            m = last
+
+    def __getitem__(self, key):
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def __len__(self):
+        return len(self.flat())
 
     def __iter__(self):
-        return (r[0] for r in self.iteritems())
+        return iter(self.flat())
+
+    def keys(self):
+        return self.flat().keys()
+
+    def iteritems(self):
+        return iteritems(self.flat())
+
+    items = iteritems
 
     def itervalues(self):
         return (r[1] for r in self.iteritems())
 
     values = itervalues
-
-    def get(self, key, default=None):
-        try:
-            return self[key]
-        except KeyError:
-            return default
@@ -3,11 +3,16 @@ import typing as t
 KT = t.TypeVar('KT')
 VT = t.TypeVar('VT')
 
+FLATTEN_AFTER: int
+
 
 class MergedDict(t.Mapping[KT, VT]):
     def __init__(self, *dicts: t.Mapping[KT, VT]) -> None:
         ...
 
+    def flat(self) -> dict[KT, VT]:
+        ...
+
     def __getitem__(self, key: KT) -> VT:
         ...
 
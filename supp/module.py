@@ -4,12 +4,15 @@ from .util import cached_property, Source
 from .nast import extract_scope
 from .compat import iteritems
 from .name import RuntimeName, Object
+from .cache import ModuleSummary
+from .depgraph import scope_imports, summary_imports
 
 if False:
     import typing as t
-    from .name import Attributes, Name
+    from .name import Attributes, Name, AttrList
     from .scope import SourceScope
     from .project import Project
+    from .evaluator import EvalCtx
 
 
 class SourceModule(Object):
@@ -20,6 +23,8 @@ class SourceModule(Object):
         self.filename = filename
         self.mtime = getmtime(filename)
         self.declared_at = 1, 0
+        self.watched = False
+        self.evicted = False
 
     def __repr__(self):
         # type: () -> str
@@ -28,18 +33,60 @@ class SourceModule(Object):
     @property
     def changed(self):
         # type: () -> bool
-        return self.mtime != getmtime(self.filename)
+        try:
+            return self.mtime != getmtime(self.filename)
+        except OSError:
+            return True
+
+    @cached_property
+    def source(self):
+        # type: () -> str
+        return open(self.filename).read()
 
     @cached_property
     def scope(self):
         # type: () -> SourceScope
-        source = Source(open(self.filename).read(), self.filename)
+        source = Source(self.source, self.filename)
         scope = extract_scope(source, self.project)
+        scope.module = self
+        self.project.deps.set_deps(self.name, scope_imports(scope, self.project))
+        self.project.scope_loaded(self, len(self.source))
         return scope
 
+    def drop_scope(self):
+        # type: () -> None
+        """Free full scope, exported names stay available from summary"""
+        if 'scope' in self.__dict__:
+            self.summary
+            del self.__dict__['scope']
+            self.__dict__.pop('source', None)
+
+    @cached_property
+    def summary(self):
+        # type: () -> ModuleSummary
+        cache = self.project.scope_cache
+        if cache and 'scope' not in self.__dict__:
+            summary = cache.get(self.filename, self.mtime)
+            if summary:
+                self.project.deps.set_deps(
+                    self.name, summary_imports(summary, self.filename, self.project))
+                return summary
+
+        summary = ModuleSummary.from_scope(self.scope, self.project)
+        if cache:
+            cache.put(self.filename, self.mtime, self.source, summary)
+        return summary
+
+    def attr_list(self, ctx):
+        # type: (EvalCtx) -> AttrList
+        if 'scope' in self.__dict__:
+            return self._attrs
+        return self.summary.names
+
     @property
     def _attrs(self):
         # type: () -> dict[str, Object | Name]
+        self.project.touch_scope(self.name)
         return self.scope.exported_names  # type: ignore[return-value]
 
 
@@ -48,6 +95,7 @@ class ImportedModule(Object):
         # type: (object) -> None
         self.module = module
         self.changed = False
+        self.watched = True
 
     @cached_property
     def _attrs(self):
@@ -25,6 +25,8 @@ if False:
 
 
 class Object(object):
+    __slots__ = ()  # type: tuple[str, ...]
+
     def attr_list(self, ctx):
         # type: (EvalCtx) -> AttrList
         return self._attrs
@@ -40,14 +42,18 @@ class Object(object):
 
 
 class Callable(object):
-    pass
+    __slots__ = ()  # type: tuple[str, ...]
 
 
 class Resolvable(object):
-    pass
+    __slots__ = ()  # type: tuple[str, ...]
 
 
 class Name(Location):
+    # names are the most numerous objects of a scope, subclasses declare
+    # slots too, lazily cached values stay unset until computed
+    __slots__ = ('name', 'scope', 'used')
+
     if False:
         scope = None  # type: Scope
 
@@ -55,6 +61,8 @@ class Name(Location):
         # type: (str, loc_t) -> None
         self.name = name
         self.location = location
+        self.scope = None  # type: ignore[assignment]
+        self.used = False
 
     def __repr__(self):
         # type: () -> str
@@ -70,6 +78,8 @@ class Name(Location):
 
 
 class ArgumentName(Name, Resolvable):
+    __slots__ = ('declared_at', 'func', 'idx', '_ctx_values')
+
     def __init__(self, idx, name, location, declared_at, func):
         # type: (list[int], str, loc_t, loc_t, FuncScope) -> None
         Name.__init__(self, name, location)
@@ -89,6 +99,8 @@ class ArgumentName(Name, Resolvable):
 
 
 class AssignedName(Name):
+    __slots__ = ('declared_at', 'value_node')
+
     def __init__(self, name, location, declared_at, value_node):
         # type: (str, loc_t, loc_t, ast.AST) -> None
         Name.__init__(self, name, location)
@@ -156,6 +168,8 @@ class CompositeValue(Object):
 
 
 class ImportedName(Name, Resolvable):
+    __slots__ = ('declared_at', 'module', 'mname', 'is_star', 'qualified', '_ref')
+
     if False:
         _ref = None   # type: Object | None
         scope = None  # type: SourceScope
@@ -298,10 +312,11 @@ class MultiName(object):
 
 
 class AssignedAttribute(Name, Resolvable):
+    __slots__ = ('attr', 'declared_at', 'value', '_ctx_values')
+
     def __init__(self, scope, attr, value, declared_at):
         # type: (SourceScope, ast.Attribute, ast.AST, loc_t) -> None
-        self.name = attr.attr
-        self.location = 0, 0
+        Name.__init__(self, attr.attr, (0, 0))
         self.attr = attr
         self.declared_at = declared_at
         self.scope = scope
@@ -1,10 +1,17 @@
 import os
 import sys
 
+from threading import RLock
+from collections import OrderedDict
 from contextlib import contextmanager
 
 from .compat import range
 from .module import SourceModule, ImportedModule
+from .cache import ScopeCache, SqliteScopeCache, BaseScopeCache
+from .fsindex import FSIndex
+from .watcher import create_watcher
+from .depgraph import DependencyGraph
+from .evalcache import EvalCache
 
 try:
     import importlib.machinery
@@ -21,13 +28,31 @@ if False:
 
 
 class Project(object):
-    def __init__(self, sources=None, dyn_modules=None):
-        # type: (list[str] | None, list[str] | None) -> None
+    def __init__(self, sources=None, dyn_modules=None, cache_dir=None,
+                 cache_size=10000, cache_db=None, watch=False, scope_budget=None):
+        # type: (list[str] | None, list[str] | None, str | None, int, str | None, bool, int | None) -> None
         self.sources = sources or ['.']
         self._norm_cache = {}  # type: dict[str, list[str]]
         self._module_cache = {}  # type: dict[str, ImportedModule | SourceModule]
         self._context_cache = {}  # type: dict[str, ImportedModule | SourceModule]
+        self.deps = DependencyGraph()
+        self.eval_cache = EvalCache()
+        # full scopes of source modules in LRU order, total size is
+        # limited by scope_budget in source characters
+        self.scope_budget = scope_budget
+        self._scope_lru = OrderedDict()  # type: OrderedDict[str, tuple[SourceModule, int]]
+        self._scope_size = 0
+        self._scope_lock = RLock()
+        self.scope_evictions = 0
+        self.scope_rebuilds = 0
         self.dyn_modules = set(dyn_modules or [])
+        self.watcher = create_watcher() if watch else None
+        self.fs_index = FSIndex(self.watcher)
+        self.scope_cache = None  # type: BaseScopeCache | None
+        if cache_db:
+            self.scope_cache = SqliteScopeCache(cache_db, cache_size)
+        elif cache_dir:
+            self.scope_cache = ScopeCache(cache_dir, cache_size)
 
     def get_path(self):
         # type: () -> list[str]
@@ -47,14 +72,11 @@ class Project(object):
             for package in sys.modules:
                 modules.add(package.partition('.')[0])
 
+        index = self.fs_index
+        parts = root.split('.') if root else []
         for p in path:
-            pdir = os.path.join(p, *root.split('.'))
-            try:
-                dlist = os.listdir(pdir)
-            except OSError:
-                continue
-
-            for name in dlist:
+            pdir = os.path.join(p, *parts)
+            for name in index.listdir(pdir):
                 for s in SUFFIXES:
                     if name.endswith(s):
                         mname = name[:-len(s)]
@@ -63,7 +85,7 @@ class Project(object):
                         modules.add(mname)
                         break
                 else:
-                    if os.path.exists(os.path.join(pdir, name, '__init__.py')):
+                    if index.is_package(os.path.join(pdir, name)):
                         modules.add(name)
 
         return modules
@@ -72,7 +94,127 @@ class Project(object):
     def check_changes(self):
         # type: () -> t.Iterator[None]
         self._context_cache.clear()
-        yield
+        self.process_changes()
+        with self.fs_index.snapshot():
+            yield
+
+    def process_changes(self):
+        # type: () -> None
+        """Apply invalidations reported by file watcher"""
+        if not self.watcher:
+            return
+
+        changes = self.watcher.poll()
+        if not changes:
+            return
+
+        if changes.overflow:
+            self.fs_index.invalidate()
+        for d in changes.dirs:
+            self.fs_index.invalidate(d)
+
+        # deleted or moved directories lose their watches, modules from
+        # them are checked by mtime from now on
+        dirs = tuple(os.path.join(d, '') for d in changes.dirs
+                     if d not in self.watcher)
+        changed = []
+        for name, m in self._module_cache.items():
+            if not isinstance(m, SourceModule):
+                continue
+            filename = os.path.abspath(m.filename)
+            if changes.overflow or filename in changes.files:
+                changed.append(name)
+            elif dirs and filename.startswith(dirs):
+                m.watched = False
+        self.invalidate_modules(changed)
+
+    def invalidate_modules(self, names):
+        # type: (t.Iterable[str]) -> set[str]
+        """Drop modules and all modules importing them from cache"""
+        affected = self.deps.affected(names)
+        with self._scope_lock:
+            for name in affected:
+                self._module_cache.pop(name, None)
+                self._context_cache.pop(name, None)
+                _, size = self._scope_lru.pop(name, (None, 0))
+                self._scope_size -= size
+        self.eval_cache.discard(affected)
+        return affected
+
+    def scope_loaded(self, module, size):
+        # type: (SourceModule, int) -> None
+        """Account full scope of a module, evict least recently used ones"""
+        with self._scope_lock:
+            if module.evicted:
+                self.scope_rebuilds += 1
+            _, old = self._scope_lru.pop(module.name, (None, 0))
+            self._scope_lru[module.name] = module, size
+            self._scope_size += size - old
+
+            budget = self.scope_budget
+            while budget is not None and self._scope_size > budget and len(self._scope_lru) > 1:
+                _, (m, size) = self._scope_lru.popitem(last=False)
+                self._scope_size -= size
+                self.scope_evictions += 1
+                m.evicted = True
+                m.drop_scope()
+                # cached values of dependents may hold objects of dropped scope
+                self.eval_cache.discard(self.deps.affected([m.name]))
+
+    def touch_scope(self, name):
+        # type: (str) -> None
+        lru = self._scope_lru
+        if self.scope_budget is not None and name in lru:
+            with self._scope_lock:
+                try:
+                    lru[name] = lru.pop(name)
+                except KeyError:
+                    pass
+
+    def scope_stats(self):
+        # type: () -> dict[str, int | None]
+        return {'modules': len(self._module_cache), 'scopes': len(self._scope_lru),
+                'size': self._scope_size, 'budget': self.scope_budget,
+                'evictions': self.scope_evictions, 'rebuilds': self.scope_rebuilds}
+
+    def affected_modules(self, names):
+        # type: (t.Iterable[str]) -> list[str]
+        """Loaded modules which see changes of given modules or files"""
+        names = [self.module_name(r) if r.endswith(SOURCE_SUFFIXES) else r
+                 for r in names]
+        return sorted(self.deps.affected(names))
+
+    def module_name(self, filename):
+        # type: (str) -> str
+        root, name = os.path.split(os.path.abspath(filename))
+        parts = [os.path.splitext(name)[0]]
+        if parts[0] == '__init__':
+            parts = []
+        while self.fs_index.is_package(root):
+            root, name = os.path.split(root)
+            parts.insert(0, name)
+        return '.'.join(parts)
+
+    def _deps_changed(self, name):
+        # type: (str) -> bool
+        for d in list(self.deps.deps.get(name, ())):
+            if d in self._module_cache and d not in self._context_cache:
+                try:
+                    self.get_module(d)
+                except ImportError:
+                    pass
+        return name not in self._module_cache
+
+    def is_current(self, module):
+        # type: (SourceModule | ImportedModule) -> bool
+        """Module is loaded and up to date, checked once per context"""
+        name = module.name  # type: ignore[union-attr]
+        if self._context_cache.get(name) is module:
+            return True
+        try:
+            return self.get_module(name) is module
+        except ImportError:
+            return False
 
     def get_nmodule(self, name, filename):
         # type: (str, str) -> SourceModule | ImportedModule
@@ -85,36 +227,22 @@ class Project(object):
         except KeyError:
             pass
 
-        try:
-            m = self._module_cache[name]
-            if m.changed:
-                del self._module_cache[name]
-            else:
+        m = self._module_cache.get(name)
+        if m is not None:
+            if m.watched:
                 self._context_cache[name] = m
                 return m
-        except KeyError:
-            pass
-
-        path = self.get_path()
-        filename = None
-        is_source = False
-        for p in path:
-            mpath = os.path.join(p, *name.split('.'))
-            for s in SUFFIXES:
-                fname = mpath + s
-                if os.path.exists(fname):
-                    filename = fname
-                    is_source = s in SOURCE_SUFFIXES
-                    break
+            elif m.changed:
+                self.invalidate_modules([name])
             else:
-                fname = os.path.join(mpath, '__init__.py')
-                if os.path.exists(fname):
-                    filename = fname
-                    is_source = True
-                    break
+                # imported modules are validated once per context too,
+                # their change evicts this module as well
+                self._context_cache[name] = m
+                if not self._deps_changed(name):
+                    return m
 
-            if filename:
-                break
+        filename = self.find_module(name)
+        is_source = bool(filename) and filename.endswith(SOURCE_SUFFIXES)  # type: ignore[union-attr]
 
         module = None  # type: SourceModule | ImportedModule | None
         if not filename:
@@ -127,6 +255,9 @@ class Project(object):
                 module = ImportedModule(sys.modules[name])
             else:
                 module = SourceModule(self, name, filename)
+                if self.watcher:
+                    module.watched = self.watcher.watch(
+                        os.path.dirname(os.path.abspath(filename)))
 
         if not module:
             raise ImportError(name)
@@ -134,6 +265,28 @@ class Project(object):
         self._module_cache[name] = module
         return module
 
+    def find_module(self, name):
+        # type: (str) -> str | None
+        index = self.fs_index
+        parts = name.split('.')
+        last = parts[-1]
+        for p in self.get_path():
+            pdir = os.path.join(p, *parts[:-1])
+            entries = index.listdir(pdir)
+            if not entries:
+                continue
+
+            for s in SUFFIXES:
+                if last + s in entries:
+                    return os.path.join(pdir, last + s)
+
+            if last in entries:
+                mpath = os.path.join(pdir, last)
+                if index.is_package(mpath):
+                    return os.path.join(mpath, '__init__.py')
+
+        return None
+
     def norm_package(self, package, filename):
         # type: (str, str) -> str
         if not package.startswith('.'):
@@ -149,7 +302,7 @@ class Project(object):
         except KeyError:
             parts = []
             while True:
-                if os.path.exists(os.path.join(root, '__init__.py')):
+                if self.fs_index.is_package(root):
                     parts.insert(0, os.path.basename(root))
                     root = os.path.dirname(root)
                 else:
@@ -2,19 +2,60 @@
 import sys
 import time
 import os.path
+import itertools
 
 from threading import Thread, Lock
+from concurrent.futures import Future, TimeoutError
 
-from .umsgpack import dumps, loads
-from . import umsgpack
+from . import codec
 
-# umsgpack.compatibility = True
+#: Seconds blocking calls wait for a server answer
+DEFAULT_TIMEOUT = 60
+
+
+def server_args(executable, addr, ready_fd=None):
+    supp_server = os.path.join(os.path.dirname(__file__), 'server.py')
+    args = [executable, supp_server, addr]
+    if ready_fd is not None:
+        args.append(str(ready_fd))
+    return args
+
+
+def check_ready(data):
+    if not data:
+        raise Exception('Supp server exited before accepting connections')
+
+
+def wait_ready(fd, timeout):
+    """Wait for server readiness byte on pipe ``fd``"""
+    import select
+    if not select.select([fd], [], [], timeout)[0]:
+        raise Exception('Supp server launching timeout exceed')
+    check_ready(os.read(fd, 1))
+
+
+def server_env(extra=None, logfile=None):
+    env = os.environ.copy()
+    if extra:
+        env.update(extra)
+
+    if logfile and 'SUPP_LOG_FILE' not in env:
+        env['SUPP_LOG_FILE'] = logfile
+    return env
 
 
 class Environment(object):
-    """Supplement server client"""
+    """Supplement server client
 
-    def __init__(self, executable=None, env=None, logfile=None):
+    Calls are thread safe. Every request carries an id, responses are
+    matched to pending futures by a reader thread so several requests may
+    be in flight at once. ``*_future`` methods return
+    :class:`concurrent.futures.Future`, ``*_async`` ones return awaitable
+    asyncio futures bound to a running loop.
+    """
+
+    def __init__(self, executable=None, env=None, logfile=None, codecs=None,
+                 on_event=None, timeout=DEFAULT_TIMEOUT):
         """Environment constructor
 
         :param executable: path to python executable. May be path to virtualenv interpreter
@@ -23,47 +64,116 @@ class Environment(object):
         :param env: environment variables dict, e.g. ``DJANGO_SETTINGS_MODULE`` value.
 
         :param logfile: explicit log file, can be passed via environment SUPP_LOG_FILE
+
+        :param codecs: wire codec names to offer in preference order, all
+              available ones by default, see :mod:`supp.codec`.
+
+        :param on_event: ``func(event, payload)`` called from reader thread for
+              server pushed events, e.g. ``diagnostics`` with
+              ``(filename, version, lint_result)`` payload.
+
+        :param timeout: seconds blocking calls wait for a result, None means
+              wait forever. Timed out call is cancelled.
         """
         self.executable = executable or sys.executable
         self.env = env
         self.logfile = logfile
+        self.codecs = codecs or [r.name for r in codec.available()]
+        self.codec = codec.DEFAULT
+        self.on_event = on_event
+        self.timeout = timeout
 
         self.prepare_thread = None
         self.prepare_lock = Lock()
 
+        self.send_lock = Lock()
+        self.reader_thread = None
+        self.futures = {}
+        self.ids = itertools.count(1)
+
     def _run(self):
         from subprocess import Popen
         from multiprocessing.connection import Client, arbitrary_address
 
+        env = server_env(self.env, self.logfile)
         if sys.platform == 'win32':
             addr = arbitrary_address('AF_PIPE')
+            self.proc = Popen(server_args(self.executable, addr), env=env)
+            conn = self._connect(Client, addr)
         else:
             addr = arbitrary_address('AF_UNIX')
+            rfd, wfd = os.pipe()
+            try:
+                self.proc = Popen(server_args(self.executable, addr, wfd),
+                                  env=env, pass_fds=(wfd,))
+            finally:
+                os.close(wfd)
+            try:
+                wait_ready(rfd, 5)
+            finally:
+                os.close(rfd)
+            conn = Client(addr)
 
-        supp_server = os.path.join(os.path.dirname(__file__), 'server.py')
-        args = [self.executable, supp_server, addr]
-
-        env = os.environ.copy()
-        if self.env:
-            env.update(self.env)
-
-        if self.logfile and 'SUPP_LOG_FILE' not in env:
-            env['SUPP_LOG_FILE'] = self.logfile
-
-        self.proc = Popen(args, env=env)
-
+        # connection is published only when it is ready for calls, other
+        # threads check ``self.conn`` presence without locking
+        try:
+            conn.send_bytes(codec.DEFAULT.dumps((0, 'handshake', (self.codecs,), {})))
+            _, name, is_ok = codec.DEFAULT.loads(conn.recv_bytes())
+        except Exception:
+            conn.close()
+            raise
+        self.codec = codec.get(name) if is_ok else codec.DEFAULT
+
+        self.reader_thread = Thread(target=self._read_responses, args=(conn,))
+        self.reader_thread.daemon = True
+        self.reader_thread.start()
+        self.conn = conn
+
+    def _connect(self, client, addr):
         start = time.time()
         while True:
             try:
-                self.conn = Client(addr)
+                return client(addr)
             except Exception as e:
                 if time.time() - start > 5:
                     raise Exception('Supp server launching timeout exceed: ' + str(e))
 
                 time.sleep(0.3)
-            else:
+
+    def _read_responses(self, conn):
+        error = EOFError('Supp server connection is closed')
+        while True:
+            try:
+                rid, result, is_ok = self.codec.loads(conn.recv_bytes())
+            except (EOFError, OSError):
+                break
+            except Exception as e:
+                # stream is out of sync, nothing more can be matched
+                error = e
                 break
 
+            if rid is None:
+                if self.on_event:
+                    try:
+                        self.on_event(result, is_ok)
+                    except Exception:
+                        pass
+                continue
+
+            future = self.futures.pop(rid, None)
+            if future is None or not future.set_running_or_notify_cancel():
+                continue
+
+            if is_ok:
+                future.set_result(result)
+            else:
+                future.set_exception(Exception(result[1]))
+
+        for rid in list(self.futures):
+            future = self.futures.pop(rid, None)
+            if future and future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
     def _threaded_run(self):
         try:
             self._run()
@@ -89,23 +199,64 @@ class Environment(object):
             if not hasattr(self, 'conn'):
                 self._run()
 
-    def _call(self, name, *args, **kwargs):
+    def _send(self, rid, name, args, kwargs):
+        with self.send_lock:
+            self.conn.send_bytes(self.codec.dumps((rid, name, args, kwargs)))
+
+    def _call_future(self, name, *args, **kwargs):
         try:
             self.conn
         except AttributeError:
             self.run()
 
-        self.conn.send_bytes(dumps((name, args, kwargs)))
-        result, is_ok = loads(self.conn.recv_bytes())
+        future = Future()
+        future.request_id = rid = next(self.ids)
+        self.futures[rid] = future
+        try:
+            self._send(rid, name, args, kwargs)
+        except Exception:
+            self.futures.pop(rid, None)
+            raise
+        future.add_done_callback(self._notify_cancel)
+        return future
+
+    def _notify_cancel(self, future):
+        if future.cancelled() and self.futures.pop(future.request_id, None):
+            try:
+                self._send(0, 'cancel', (future.request_id,), {})
+            except Exception:
+                pass
 
-        if is_ok:
-            return result
-        else:
-            raise Exception(result[1])
+    def _call_async(self, name, *args, **kwargs):
+        import asyncio
+        return asyncio.wrap_future(self._call_future(name, *args, **kwargs))
+
+    def _call(self, name, *args, **kwargs):
+        future = self._call_future(name, *args, **kwargs)
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def cancel(self, future):
+        """Cancel superseded call
+
+        Same as ``future.cancel()``: queued request is dropped by server,
+        result of already running one is discarded. Returns False if
+        future is already done.
+        """
+        return future.cancel()
 
     def lint(self, source, filename, syntax_only=False):
         return self._call('lint', source, filename, syntax_only)
 
+    def lint_future(self, source, filename, syntax_only=False):
+        return self._call_future('lint', source, filename, syntax_only)
+
+    def lint_async(self, source, filename, syntax_only=False):
+        return self._call_async('lint', source, filename, syntax_only)
+
     def assist(self, source, position, filename):
         """Return completion match and list of completion proposals
 
@@ -116,6 +267,12 @@ class Environment(object):
         """
         return self._call('assist', source, position, filename)
 
+    def assist_future(self, source, position, filename):
+        return self._call_future('assist', source, position, filename)
+
+    def assist_async(self, source, position, filename):
+        return self._call_async('assist', source, position, filename)
+
     def location(self, source, position, filename):
         """Return position and file path where name under cursor is defined
 
@@ -129,6 +286,63 @@ class Environment(object):
         """
         return self._call('location', source, position, filename)
 
+    def location_future(self, source, position, filename):
+        return self._call_future('location', source, position, filename)
+
+    def location_async(self, source, position, filename):
+        return self._call_async('location', source, position, filename)
+
+    def references(self, source, position, filename):
+        """Return reference sites of name under cursor from usage index
+
+        :returns: list of dicts with ``loc`` and ``file`` keys
+        """
+        return self._call('references', source, position, filename)
+
+    def index_usages(self, paths=None, jobs=1):
+        """Reindex changed files of usage index, see :mod:`supp.usages`"""
+        return self._call('index_usages', paths, jobs)
+
+    def doc_open(self, filename, source, version=0):
+        """Start tracking buffer on server side
+
+        Following ``doc_*`` calls refer to the buffer by filename and version
+        instead of sending full source.
+        """
+        return self._call('doc_open', filename, source, version)
+
+    def doc_change(self, filename, version, edits):
+        """Apply edits to tracked buffer and set its version
+
+        :param edits: list of ``(line, col, end_line, end_col, text)``
+              replacements, see :mod:`supp.document`. :func:`supp.document.text_edits`
+              builds them from old and new text.
+        """
+        return self._call('doc_change', filename, version, edits)
+
+    def doc_close(self, filename):
+        return self._call('doc_close', filename)
+
+    def schedule_lint(self, filename, version):
+        """Lint tracked buffer in background
+
+        Result is pushed as ``diagnostics`` event to ``on_event`` handler.
+        Calls are coalesced per file and superseded versions are dropped.
+        """
+        return self._call('schedule_lint', filename, version)
+
+    def lint_stats(self):
+        return self._call('lint_stats')
+
+    def doc_assist(self, filename, version, position):
+        return self._call('doc_assist', filename, version, position)
+
+    def doc_location(self, filename, version, position):
+        return self._call('doc_location', filename, version, position)
+
+    def doc_lint(self, filename, version, syntax_only=False):
+        return self._call('doc_lint', filename, version, syntax_only)
+
     # def get_docstring(self, project_path, source, position, filename):
     #     """Return signature and docstring for current cursor call context
 
@@ -153,10 +367,22 @@ class Environment(object):
     def configure(self, config):
         """Reconfigure project
 
-        :param config: dict with config key/values
+        :param config: dict with config key/values. Known keys are
+              ``sources``, ``dyn_modules``, ``cache_dir``, ``cache_db``,
+              ``cache_size``, ``watch`` (use inotify instead of mtime polling)
+              and ``prewarm`` (load builtins, sys.path listing and most
+              imported modules in background).
         """
         return self._call('configure', config)
 
+    def cache_stats(self):
+        """Return scope cache, filesystem index and loaded modules counters"""
+        return self._call('cache_stats')
+
+    def affected_modules(self, names):
+        """Return loaded modules depending on given module names or files"""
+        return self._call('affected_modules', names)
+
     # def get_scope(self, project_path, source, lineno, filename, continous=True):
     #     """
     #     Return scope name at cursor position
@@ -191,6 +417,9 @@ class Environment(object):
         except AttributeError:
             pass
         else:
-            self.conn.send_bytes(dumps(('close', (), {}), 2))
+            self._send(0, 'close', (), {})
+            if self.reader_thread:
+                self.reader_thread.join(5)
+                self.reader_thread = None
             self.conn.close()
             del self.conn
@@ -0,0 +1,122 @@
+"""Background lint of edited documents
+
+Requests are coalesced per file: only the latest scheduled version is kept
+and it runs ``delay`` seconds after the last request. Lint is started only
+when interactive work is idle, results of versions superseded while lint
+was running are dropped.
+"""
+import time
+import logging
+from threading import Thread, Condition
+
+from .document import VersionError
+
+if False:
+    import typing as t
+
+    LintFunc = t.Callable[[str, int], t.Any]
+    PublishFunc = t.Callable[[str, int, t.Any], None]
+    VersionFunc = t.Callable[[str], t.Any]
+
+log = logging.getLogger('supp.scheduler')
+
+
+class LintScheduler(object):
+    def __init__(self, lint, publish, current_version, is_busy, delay=0.3):
+        # type: (LintFunc, PublishFunc, VersionFunc, t.Callable[[], bool], float) -> None
+        self.lint = lint
+        self.publish = publish
+        self.current_version = current_version
+        self.is_busy = is_busy
+        self.delay = delay
+        self.idle_wait = 0.01
+        self._pending = {}  # type: dict[str, tuple[int, float]]
+        self._cond = Condition()
+        self._thread = None  # type: Thread | None
+        self._stopped = False
+        self.scheduled = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.published = 0
+
+    def stats(self):
+        # type: () -> dict[str, int]
+        return {'scheduled': self.scheduled, 'coalesced': self.coalesced,
+                'dropped': self.dropped, 'published': self.published,
+                'pending': len(self._pending)}
+
+    def schedule(self, filename, version):
+        # type: (str, int) -> None
+        with self._cond:
+            self.scheduled += 1
+            if filename in self._pending:
+                self.coalesced += 1
+            self._pending[filename] = version, time.time() + self.delay
+            if self._thread is None:
+                self._thread = Thread(target=self._loop)
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self, filename):
+        # type: (str) -> None
+        with self._cond:
+            self._pending.pop(filename, None)
+
+    def stop(self):
+        # type: () -> None
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._cond.notify()
+
+    def _next(self):
+        # type: () -> tuple[str, int] | None
+        with self._cond:
+            while not self._stopped:
+                now = time.time()
+                due = [(d, f) for f, (_, d) in self._pending.items()]
+                if not due:
+                    self._cond.wait()
+                    continue
+
+                when, filename = min(due)
+                if when > now:
+                    self._cond.wait(when - now)
+                elif self.is_busy():
+                    # interactive calls go first
+                    self._cond.wait(self.idle_wait)
+                else:
+                    return filename, self._pending.pop(filename)[0]
+        return None
+
+    def _loop(self):
+        # type: () -> None
+        while True:
+            item = self._next()
+            if item is None:
+                break
+
+            filename, version = item
+            if self.current_version(filename) != version:
+                self.dropped += 1
+                continue
+
+            try:
+                result = self.lint(filename, version)
+            except VersionError:
+                self.dropped += 1
+                continue
+            except Exception:
+                log.exception('Lint error %s', filename)
+                continue
+
+            if self.current_version(filename) != version:
+                self.dropped += 1
+                continue
+
+            self.published += 1
+            try:
+                self.publish(filename, version, result)
+            except Exception:
+                log.exception('Publish error %s', filename)
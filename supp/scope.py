@@ -6,21 +6,22 @@ from ast import Name as AstName, Attribute, Call, FunctionDef, ClassDef, Lambda
 
 from .util import (Location, np, insert_loc, cached_property,
                    get_indexes_for_target, context_property)
-from .compat import PY2, itervalues, builtins, iteritems, iterkeys
+from .compat import PY2, itervalues, builtins, iteritems
 from .name import (ArgumentName, MultiName, UndefinedName, ImportedName,
                    RuntimeName, AdditionalNameWrapper, AssignedName,
                    MultiValue, AssignedAttribute, Object, Resolvable,
                    Callable, ClassObject, AttrObject, FuncObject, first_name)
 from .merged_dict import MergedDict
+from .evaluator import EvalCtx
 from . import compat
 
 if False:
-    from ast import stmt, AST
+    from ast import stmt, AST, AsyncFunctionDef
     import typing as t
-    from .evaluator import EvalCtx
     from .util import Source, loc_t
     from .name import Name
     from .project import Project
+    from .module import SourceModule
 
 IMPORT_DELIMETERS = string.whitespace + '(,'
 IMPORT_END_DELIMETERS = string.whitespace + '),.;'
@@ -57,7 +58,129 @@ class Scope(BaseScope):
         return self.top.source.filename
 
 
+_missing = object()
+
+
+class NamesAt(object):
+    """Names visible in a flow at a location
+
+    Lookup of a name is a bisect in its own location list, full dict is
+    built only for iteration.
+    """
+    __slots__ = ('flow', 'loc')
+
+    def __init__(self, flow, loc):
+        # type: (Flow, loc_t) -> None
+        self.flow = flow
+        self.loc = loc
+
+    def get(self, key, default=None):
+        # type: (str, t.Any) -> t.Any
+        flow = self.flow
+        entry = flow.name_index.get(key)
+        if entry:
+            idx = bisect(entry[0], self.loc)
+            if idx:
+                return entry[1][idx - 1]
+        return flow.parent_names.get(key, default)
+
+    def __getitem__(self, key):
+        # type: (str) -> Name | MultiName
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value  # type: ignore[no-any-return]
+
+    def __contains__(self, key):
+        # type: (str) -> bool
+        return self.get(key, _missing) is not _missing
+
+    def flat(self):
+        # type: () -> dict[str, Name | MultiName]
+        flow = self.flow
+        idx = bisect(flow._names, Location(self.loc))
+        return MergedDict({n.name: n for n in flow._names[:idx]},
+                          flow.parent_names).flat()
+
+    def __len__(self):
+        # type: () -> int
+        return len(self.flat())
+
+    def __iter__(self):
+        # type: () -> t.Iterator[str]
+        return iter(self.flat())
+
+    def keys(self):
+        # type: () -> t.Iterable[str]
+        return self.flat().keys()
+
+    def items(self):
+        # type: () -> t.Iterable[tuple[str, Name | MultiName]]
+        return self.flat().items()
+
+    iteritems = items
+
+    def values(self):
+        # type: () -> t.Iterable[Name | MultiName]
+        return self.flat().values()
+
+    itervalues = values
+
+
+def _chain_parent(mapping):
+    # type: (t.Mapping[str, t.Any]) -> t.Mapping[str, t.Any] | None
+    if type(mapping) is MergedDict:
+        return mapping._dicts[-1]  # type: ignore[attr-defined,no-any-return]
+    return None
+
+
+def join_base(mappings):
+    # type: (list[t.Mapping[str, t.Any]]) -> tuple[t.Mapping[str, t.Any] | None, set[str]]
+    """Nearest mapping shared by all name chains and names above it
+
+    Flow names are ``MergedDict(own, parent_names)`` chains. Chains are
+    walked in lockstep until a mapping is met in every one of them.
+    Without a common mapping all names are returned.
+    """
+    count = len(mappings)
+    seen = {}  # type: dict[int, set[int]]
+    current = list(mappings)  # type: list[t.Any]
+    chains = [[] for _ in mappings]  # type: list[list[t.Mapping[str, t.Any]]]
+    base = None
+    while base is None and any(r is not None for r in current):
+        for i, m in enumerate(current):
+            if m is None:
+                continue
+            owners = seen.setdefault(id(m), set())
+            owners.add(i)
+            if len(owners) == count:
+                base = m
+                break
+            chains[i].append(m)
+            current[i] = _chain_parent(m)
+
+    nameset = set()  # type: set[str]
+    for chain in chains:
+        for m in chain:
+            if base is not None and m is base:
+                break
+            if type(m) is MergedDict:
+                for layer in m._dicts[:-1]:  # type: ignore[attr-defined]
+                    nameset.update(layer)
+            else:
+                nameset.update(m)
+    return base, nameset
+
+
 class Flow(object):
+    __slots__ = ('hint', 'scope', '_names', 'parents', '_names_map', '_parent_names',
+                 '_name_index')
+
+    if False:
+        _names_map = None  # type: t.Mapping[str, Name | MultiName]
+        _parent_names = None  # type: t.Mapping[str, Name | MultiName]
+        _name_index = None  # type: dict[str, tuple[list[loc_t], list[Name]]]
+
     def __init__(self, hint, scope, parents=None):
         # type: (str, Scope, t.MutableSequence[Flow | LoopFlow] | None) -> None
         self.hint = hint
@@ -77,24 +200,62 @@ class Flow(object):
         else:
             self.scope.locals.add(name.name)
             insert_loc(self._names, name)
+            try:
+                del self._name_index
+            except AttributeError:
+                pass
 
-    @cached_property
+    @property
+    def name_index(self):
+        # type: () -> dict[str, tuple[list[loc_t], list[Name]]]
+        """Locations and bindings of every name in location order"""
+        try:
+            return self._name_index
+        except AttributeError:
+            pass
+        index = {}  # type: dict[str, tuple[list[loc_t], list[Name]]]
+        for n in self._names:
+            try:
+                locs, names = index[n.name]
+            except KeyError:
+                locs, names = index[n.name] = [], []
+            locs.append(n.location)
+            names.append(n)
+        self._name_index = index
+        return index
+
+    @property
     def names(self):
         # type: () -> t.Mapping[str, Name | MultiName]
-        return MergedDict({n.name: n for n in self._names}, self.parent_names)
+        try:
+            return self._names_map
+        except AttributeError:
+            pass
+        result = self._names_map = MergedDict({n.name: n for n in self._names},
+                                              self.parent_names)
+        return result
 
-    @cached_property
+    @property
     def parent_names(self):
+        # type: () -> t.Mapping[str, Name | MultiName ]
+        try:
+            return self._parent_names
+        except AttributeError:
+            pass
+        result = self._parent_names = self._get_parent_names()
+        return result
+
+    def _get_parent_names(self):
         # type: () -> t.Mapping[str, Name | MultiName ]
         if len(self.parents) == 1:
             return self.parents[0].names  # type: ignore[return-value]
         elif len(self.parents) > 1:
             names = {}  # type: dict[str, Name | MultiName]
-            nameset = set()  # type: set[str]
             pnames = [p.names for p in self.parents
                       if p.names is not UNRESOLVED]  # type: list[t.Mapping[str, Name]] # type: ignore[misc]
-            for p in pnames:
-                nameset.update(p)
+            # only names assigned in branches after common ancestor may
+            # differ, the rest is shared with it by reference
+            base, nameset = join_base(pnames)
             for n in nameset:
                 nrow = set(r.get(n, UndefinedName(n)) for r in pnames)
                 if len(nrow) == 1:
@@ -102,6 +263,8 @@ class Flow(object):
                     names[n] = list(nrow)[0]  # type: ignore[assignment]
                 else:
                     names[n] = MultiName(list(nrow))
+            if base is not None:
+                return MergedDict(names, base)
             return names
         else:
             pscope = self.scope.parent
@@ -117,8 +280,7 @@ class Flow(object):
 
     def names_at(self, loc):
         # type: (loc_t) -> t.Mapping[str, Name | MultiName]
-        idx = bisect(self._names, Location(loc))
-        return MergedDict({n.name: n for n in self._names[:idx]}, self.parent_names)
+        return NamesAt(self, loc)  # type: ignore[return-value]
 
     def loop(self, to):
         # type: (Flow) -> None
@@ -126,6 +288,8 @@ class Flow(object):
 
 
 class LoopFlow(object):
+    __slots__ = ('parent', '_resolving', '_names')
+
     if False:
         _names = None  # type: t.Mapping[str, Name | MultiName]
 
@@ -160,6 +324,7 @@ class SourceScope(Scope):
         _global_names = None  # type: dict[str, Name]
         _attr_assigns = None  # type: list[tuple[Scope, Attribute, AST]]
         _star_imports = None  # type: list[tuple[loc_t, loc_t, str, Flow]]
+        _star_modules = None  # type: list[str]
         _unvisited = None     # type: list[tuple[Flow, AST]]
         source = None         # type: Source
 
@@ -172,8 +337,11 @@ class SourceScope(Scope):
         self._unvisited = []
         self._imports = []
         self._star_imports = []
+        self._star_modules = []
         self._attr_assigns = []
         self._global_names = {}
+        # loaded project module, None for edited buffers
+        self.module = None  # type: SourceModule | None
 
     def __repr__(self):
         # type: () -> str
@@ -259,13 +427,15 @@ class SourceScope(Scope):
 
     def resolve_star_imports(self, project):
         # type: (Project) -> None
+        ctx = EvalCtx(project)
         for loc, declared_at, mname, flow in self._star_imports:
+            self._star_modules.append(mname)
             try:
                 module = project.get_nmodule(mname, self.filename)
             except ImportError:
                 continue
 
-            for name in iterkeys(module._attrs):
+            for name in module.attr_list(ctx):
                 if not name.startswith('_'):
                     flow.add_name(ImportedName(name, loc, declared_at, mname, name, True))
 
@@ -289,7 +459,7 @@ def get_first_body_node_loc(body):
 
 class FuncScope(Scope, Location, Resolvable):
     def __init__(self, parent, node, top):
-        # type: (Scope, FunctionDef | Lambda, SourceScope) -> None
+        # type: (Scope, FunctionDef | AsyncFunctionDef | Lambda, SourceScope) -> None
         Scope.__init__(self, parent, top)
         self.args = []
         self.node = node
@@ -2,6 +2,13 @@
 import sys
 import os.path
 import logging
+import itertools
+from threading import Thread, Lock, RLock
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
 
 logger = logging.getLogger('server')
 
@@ -15,9 +22,13 @@ except ImportError:
     finally:
         sys.path = old_path
 
-from supp import assistant, linter
-from supp.umsgpack import loads, dumps
+from supp import assistant, linter, warmup, batch
+from supp import codec
 from supp.project import Project
+from supp.incremental import BufferCache
+from supp.document import Document, VersionError
+from supp.scheduler import LintScheduler
+from supp.usages import UsageIndex
 from supp.compat import nstr
 
 
@@ -26,14 +37,109 @@ if False:
     from multiprocessing.connection import _ConnectionBase
 
 
+#: Lower value runs first, interactive calls overtake queued lints
+PRIORITY = {'assist': 0, 'location': 0, 'doc_assist': 0, 'doc_location': 0,
+            'references': 0, 'lint': 2, 'doc_lint': 2, 'index_usages': 2}
+DEFAULT_PRIORITY = 1
+
+#: Calls processed by reader thread in arrival order
+INLINE = {'configure', 'doc_open', 'doc_change', 'doc_close', 'schedule_lint'}
+
+
+class Request(object):
+    def __init__(self, rid, name, args, kwargs):
+        # type: (int, str, tuple[t.Any], dict[str, t.Any]) -> None
+        self.id = rid
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+
+
 class Server(object):
-    def __init__(self, conn):
-        # type: (_ConnectionBase) -> None
+    """Supplement server
+
+    Two message formats are accepted. Legacy ``(name, args, kwargs)`` is
+    processed synchronously and answered with ``(result, is_ok)``.
+    ``(id, name, args, kwargs)`` is queued by priority to worker threads
+    and answered with ``(id, result, is_ok)`` in completion order.
+    ``(id, 'cancel', (request_id,), {})`` drops a queued request or
+    discards result of a running one, cancelled requests get no answer.
+    ``(id, 'handshake', (codec_names,), {})`` switches both directions to
+    the first offered codec server supports, see :mod:`supp.codec`.
+    Server initiated messages have ``None`` id: ``(None, event, payload)``.
+    Workers run calls using the project one at a time, under ``project_lock``:
+    queued interactive calls overtake queued lints, but a lint already
+    running is not preempted and delays them until it finishes. Calls not
+    touching the project, e.g. ``doc_*`` bookkeeping or ``lint_stats``, do
+    not wait for it.
+    """
+    def __init__(self, conn, workers=2, publish=None, is_busy=None):
+        # type: (_ConnectionBase, int, t.Callable[[str, int, t.Any], None] | None, t.Callable[[], bool] | None) -> None
         self.conn = conn
+        self.buffers = BufferCache()
+        self.workers = workers
+        self.queue = queue.PriorityQueue()  # type: queue.PriorityQueue[tuple[int, int, Request | None]]
+        self.pending = {}  # type: dict[int, Request]
+        self.pending_lock = Lock()
+        # Project, buffers and usage index are not thread safe, every
+        # call using them holds this lock
+        self.project_lock = RLock()
+        self.send_lock = Lock()
+        self._seq = itertools.count()
+        self.codec = codec.DEFAULT
+        self.documents = {}  # type: dict[str, Document]
+        self.documents_lock = Lock()
+        self.lint_scheduler = LintScheduler(
+            self.doc_lint, publish or self.push_diagnostics,
+            self.document_version, is_busy or self.is_busy)
 
     def configure(self, config):
         # type: (dict[str, t.Any]) -> None
-        self.project = Project(config['sources'], dyn_modules=config.get('dyn_modules'))
+        project = Project(config['sources'],
+                          dyn_modules=config.get('dyn_modules'),
+                          cache_dir=config.get('cache_dir'),
+                          cache_db=config.get('cache_db'),
+                          cache_size=config.get('cache_size', 10000),
+                          watch=config.get('watch', False),
+                          scope_budget=config.get('scope_budget'))
+        usage_index = UsageIndex(config.get('usage_index'))
+        with self.project_lock:
+            self.project = project
+            self.usage_index = usage_index
+            self.buffers.clear()
+        self.lint_scheduler.delay = config.get('lint_delay', 0.3)
+        if config.get('prewarm'):
+            th = Thread(target=warmup.prewarm, args=(project,),
+                        kwargs={'lock': self.project_lock})
+            th.daemon = True
+            th.start()
+
+    def cache_stats(self):
+        with self.project_lock:
+            cache = self.project.scope_cache
+            return {'scope': cache.stats() if cache else {},
+                    'fs': self.project.fs_index.stats(),
+                    'modules': self.project.scope_stats(),
+                    'eval': self.project.eval_cache.stats()}
+
+    def index_usages(self, paths=None, jobs=1):
+        with self.project_lock:
+            paths = paths or self.project.sources
+            files = list(batch.iter_files(paths))
+            count = self.usage_index.update(files, self.project.sources, jobs,
+                                            {'dyn_modules': list(self.project.dyn_modules)},
+                                            paths)
+            return dict(self.usage_index.stats(), updated=count)
+
+    def references(self, source, position, filename):
+        with self.project_lock, self.project.check_changes():
+            return assistant.references(self.project, self.usage_index, nstr(source),
+                                        tuple(position), filename, buffers=self.buffers)
+
+    def affected_modules(self, names):
+        with self.project_lock, self.project.check_changes():
+            return self.project.affected_modules(names)
 
     def process(self, name, args, kwargs):
         # type: (str, tuple[t.Any], dict[str, t.Any]) -> tuple[t.Any, bool]
@@ -50,17 +156,78 @@ class Server(object):
 
     def assist(self, source, position, filename):
         # type: (str, list[int], str) -> t.TODO
-        with self.project.check_changes():
-            return assistant.assist(self.project, nstr(source), tuple(position), filename)
+        with self.project_lock, self.project.check_changes():
+            return assistant.assist(self.project, nstr(source), tuple(position),
+                                    filename, buffers=self.buffers)
 
     def location(self, source, position, filename):
-        with self.project.check_changes():
-            return assistant.location(self.project, nstr(source), tuple(position), filename)
+        with self.project_lock, self.project.check_changes():
+            return assistant.location(self.project, nstr(source), tuple(position),
+                                      filename, buffers=self.buffers)
 
     def lint(self, source, filename, syntax_only=False):
-        with self.project.check_changes():
+        with self.project_lock, self.project.check_changes():
             return [r[:4] for r in linter.lint(self.project, nstr(source), filename)]
 
+    def doc_open(self, filename, source, version=0):
+        with self.documents_lock:
+            self.documents[filename] = Document(filename, nstr(source), version)
+
+    def doc_change(self, filename, version, edits):
+        with self.documents_lock:
+            try:
+                doc = self.documents[filename]
+            except KeyError:
+                raise VersionError('Document {} is not open'.format(filename))
+            doc.apply(version, [(r[0], r[1], r[2], r[3], nstr(r[4])) for r in edits])
+
+    def doc_close(self, filename):
+        self.lint_scheduler.cancel(filename)
+        with self.documents_lock:
+            self.documents.pop(filename, None)
+
+    def document_version(self, filename):
+        doc = self.documents.get(filename)
+        return doc and doc.version
+
+    def document(self, filename, version):
+        with self.documents_lock:
+            doc = self.documents.get(filename)
+            if doc is None:
+                raise VersionError('Document {} is not open'.format(filename))
+            if doc.version != version:
+                raise VersionError('Document {} has version {}, not {}'.format(
+                    filename, doc.version, version))
+            return doc.text
+
+    def doc_assist(self, filename, version, position):
+        return self.assist(self.document(filename, version), position, filename)
+
+    def doc_location(self, filename, version, position):
+        return self.location(self.document(filename, version), position, filename)
+
+    def doc_lint(self, filename, version, syntax_only=False):
+        return self.lint(self.document(filename, version), filename, syntax_only)
+
+    def schedule_lint(self, filename, version):
+        """Lint document in background and push ``diagnostics`` event
+
+        Repeated calls for the same file are coalesced, only the latest
+        version is linted and only while no assist/location is pending.
+        """
+        self.lint_scheduler.schedule(filename, version)
+
+    def push_diagnostics(self, filename, version, result):
+        self.send(None, 'diagnostics', (filename, version, result))
+
+    def is_busy(self):
+        # type: () -> bool
+        with self.pending_lock:
+            return any(PRIORITY.get(r.name) == 0 for r in self.pending.values())
+
+    def lint_stats(self):
+        return self.lint_scheduler.stats()
+
     def eval(self, source):
         ctx = {}
         source = '\n'.join('    ' + r for r in nstr(source).splitlines())
@@ -68,31 +235,89 @@ class Server(object):
         exec(source, ctx)
         return ctx['result']
 
+    def send(self, *response):
+        try:
+            content = self.codec.dumps(response)
+        except Exception:
+            content = self.codec.dumps(response[:-2] + (('SerializeError', 'Serialize error'), False))
+        try:
+            with self.send_lock:
+                self.conn.send_bytes(content)
+        except Exception:
+            logger.exception('Send error')
+
+    def dispatch(self, rid, name, args, kwargs):
+        # type: (int, str, tuple[t.Any], dict[str, t.Any]) -> None
+        if name == 'cancel':
+            with self.pending_lock:
+                for r in args:
+                    req = self.pending.get(r)
+                    if req:
+                        req.cancelled = True
+            return
+
+        if name == 'handshake':
+            # answer with current codec, switch after
+            chosen = codec.negotiate(args[0])
+            self.send(rid, chosen.name, True)
+            self.codec = chosen
+            return
+
+        if name in INLINE:
+            self.send(rid, *self.process(name, args, kwargs))
+            return
+
+        req = Request(rid, name, args, kwargs)
+        with self.pending_lock:
+            self.pending[rid] = req
+        self.queue.put((PRIORITY.get(name, DEFAULT_PRIORITY), next(self._seq), req))
+
+    def worker(self):
+        while True:
+            req = self.queue.get()[2]
+            if req is None:
+                break
+
+            if not req.cancelled:
+                result, is_ok = self.process(req.name, req.args, req.kwargs)
+
+            with self.pending_lock:
+                self.pending.pop(req.id, None)
+
+            if not req.cancelled:
+                self.send(req.id, result, is_ok)
+
     def run(self):
         conn = self.conn
-        while True:
-            if conn.poll(1):
-                try:
-                    args = loads(conn.recv_bytes())
-                except EOFError:
-                    break
-                except Exception:
-                    logger.exception('IO error')
-                    break
-
-                if args[0] == 'close':
-                    conn.close()
-                    break
-                else:
-                    result, is_ok = self.process(*args)
-                    try:
-                        content = dumps((result, is_ok))
-                    except:
-                        content = dumps((('SerializeError', 'Serialize error'), False))
+        threads = []
+        for _ in range(self.workers):
+            th = Thread(target=self.worker)
+            th.daemon = True
+            th.start()
+            threads.append(th)
+
+        try:
+            while True:
+                if conn.poll(1):
                     try:
-                        self.conn.send_bytes(content)
-                    except:
-                        logger.exception('Send error')
+                        msg = self.codec.loads(conn.recv_bytes())
+                    except (EOFError, OSError):
+                        break
+                    except Exception:
+                        logger.exception('IO error')
+                        break
+
+                    if msg[-3] == 'close':
+                        conn.close()
+                        break
+                    elif len(msg) == 3:
+                        self.send(*self.process(*msg))
+                    else:
+                        self.dispatch(*msg)
+        finally:
+            self.lint_scheduler.stop()
+            for _ in threads:
+                self.queue.put((-1, next(self._seq), None))
 
 
 if __name__ == '__main__':
@@ -111,6 +336,12 @@ if __name__ == '__main__':
         logging.basicConfig(format="%(name)s %(levelname)s: %(message)s", level=level)
 
     listener = Listener(sys.argv[1])
+    if len(sys.argv) > 2:
+        # socket is bound, tell client it can connect
+        ready_fd = int(sys.argv[2])
+        os.write(ready_fd, b'1')
+        os.close(ready_fd)
+
     conn = listener.accept()
     server = Server(conn)
     server.run()
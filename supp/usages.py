@@ -0,0 +1,181 @@
+"""Project wide index of name references
+
+Every load of a name or attribute is resolved to its final declaration
+with :meth:`EvalCtx.declarations_many`. Index maps a declaration
+``(filename, declared_at)`` to reference sites. Files are indexed in
+parallel by :func:`supp.batch.run` and reindexed only when their mtime
+changes or when a file they reference was reindexed. All filenames in
+the index are absolute.
+"""
+import os
+import json
+import logging
+from os.path import getmtime
+
+from .util import Source, get_all_usages
+from .nast import extract_scope
+from .evaluator import EvalCtx
+
+if False:
+    import typing as t
+    from .project import Project
+    from .util import loc_t
+
+    # name, line, col, decl filename, decl line, decl col
+    entry_t = tuple[str, int, int, str, int, int]
+    decl_t = tuple[str, loc_t]
+
+log = logging.getLogger('supp.usages')
+
+INDEX_VERSION = 1
+
+
+def _declared(result, out):
+    # type: (list[t.Any], list[t.Any]) -> None
+    for r in result:
+        if isinstance(r, list):
+            _declared(r, out)
+            continue
+        filename = getattr(r, 'filename', None)
+        declared_at = getattr(r, 'declared_at', None)
+        if filename and declared_at:
+            out.append((os.path.abspath(filename), tuple(declared_at)))
+
+
+def file_usages(project, source, filename):
+    # type: (Project, str, str) -> list[entry_t]
+    """Reference sites of a source resolved to declarations"""
+    src = Source(source, filename)
+    extract_scope(src, project)
+    ctx = EvalCtx(project)
+
+    all_usages = list(get_all_usages(src.tree))
+    declarations = ctx.declarations_many(r[3] for r in all_usages)
+
+    result = []  # type: list[entry_t]
+    for (_, name, loc, _), value in zip(all_usages, declarations):
+        decls = []  # type: list[decl_t]
+        _declared(value, decls)
+        if not decls:
+            continue
+        # last one is final declaration, preceding are imports on the way
+        dfile, dloc = decls[-1]
+        result.append((name, loc[0], loc[1], dfile, dloc[0], dloc[1]))
+    return result
+
+
+class UsageIndex(object):
+    def __init__(self, path=None):
+        # type: (str | None) -> None
+        self.path = path
+        self.files = {}  # type: dict[str, tuple[float, list[entry_t]]]
+        self._refs = None  # type: dict[decl_t, list[tuple[str, loc_t]]] | None
+        if path:
+            self.load()
+
+    def stats(self):
+        # type: () -> dict[str, int]
+        return {'files': len(self.files),
+                'references': sum(len(r) for _, r in self.files.values())}
+
+    def load(self):
+        # type: () -> None
+        try:
+            with open(self.path) as f:  # type: ignore[arg-type]
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != INDEX_VERSION:
+            return
+        self.files = {k: (mtime, [tuple(r) for r in entries])
+                      for k, (mtime, entries) in data['files'].items()}
+        self._refs = None
+
+    def save(self):
+        # type: () -> None
+        if not self.path:
+            return
+        tmp = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'version': INDEX_VERSION, 'files': self.files}, f)
+            os.rename(tmp, self.path)
+        except OSError:
+            log.exception('Unable to write usage index %s', self.path)
+
+    def set_file(self, filename, mtime, entries):
+        # type: (str, float, list[entry_t]) -> None
+        self.files[os.path.abspath(filename)] = mtime, entries
+        self._refs = None
+
+    def remove_file(self, filename):
+        # type: (str) -> None
+        if self.files.pop(os.path.abspath(filename), None):
+            self._refs = None
+
+    def stale_files(self, files, paths=None):
+        # type: (t.Iterable[str], t.Iterable[str] | None) -> list[str]
+        """Files to (re)index to make index actual for given file set
+
+        Changed files plus files which referenced declarations in them,
+        declaration points may have moved. Indexed files which no longer
+        exist, or are under ``paths`` but not in ``files``, are removed.
+        """
+        files = set(os.path.abspath(r) for r in files)
+        changed = set()
+        for fname in files:
+            try:
+                mtime = getmtime(fname)
+            except OSError:
+                if fname in self.files:
+                    self.remove_file(fname)
+                    changed.add(fname)
+                continue
+            if self.files.get(fname, (None,))[0] != mtime:
+                changed.add(fname)
+
+        roots = tuple(os.path.abspath(r) for r in paths or ())
+        for fname in set(self.files) - files:
+            if (not os.path.exists(fname)
+                    or any(fname == r or fname.startswith(os.path.join(r, '')) for r in roots)):
+                self.remove_file(fname)
+                changed.add(fname)
+
+        result = set(r for r in changed if r in files and os.path.exists(r))
+        if changed:
+            for fname, (_, entries) in self.files.items():
+                if fname not in result and any(r[3] in changed for r in entries):
+                    result.add(fname)
+        return sorted(result)
+
+    def update(self, files, sources, jobs=1, options=None, paths=None):
+        # type: (t.Iterable[str], list[str], int, dict[str, t.Any] | None, t.Iterable[str] | None) -> int
+        """Reindex stale files in worker processes, return their count
+
+        ``paths`` are roots ``files`` were collected from, see :meth:`stale_files`.
+        """
+        from . import batch
+        stale = self.stale_files(files, paths)
+        for fname, mtime, entries, error in batch.run(batch.index_file, stale,
+                                                      sources, jobs, options):
+            if error:
+                log.error('Unable to index %s: %s', fname, error)
+            self.set_file(fname, mtime, entries)
+        if stale:
+            self.save()
+        return len(stale)
+
+    @property
+    def refs(self):
+        # type: () -> dict[decl_t, list[tuple[str, loc_t]]]
+        if self._refs is None:
+            refs = {}  # type: dict[decl_t, list[tuple[str, loc_t]]]
+            for fname in sorted(self.files):
+                for _, line, col, dfile, dline, dcol in self.files[fname][1]:
+                    refs.setdefault((dfile, (dline, dcol)), []).append((fname, (line, col)))
+            self._refs = refs
+        return self._refs
+
+    def references(self, filename, declared_at):
+        # type: (str, loc_t) -> list[tuple[str, loc_t]]
+        return self.refs.get((os.path.abspath(filename), tuple(declared_at)), [])  # type: ignore[arg-type]
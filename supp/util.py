@@ -2,19 +2,25 @@ from __future__ import print_function
 
 import sys
 from bisect import insort
-from ast import iter_fields, Store, Load, NodeVisitor, parse, Tuple, List, AST
+from ast import (iter_fields, Store, Load, NodeVisitor, parse, Tuple, List, AST,
+                 Import, ImportFrom)
 
 try:
     from ast import Starred
 except ImportError:
     class Starred: pass  # type: ignore[no-redef]
 
+try:
+    from ast import JoinedStr
+except ImportError:
+    class JoinedStr: pass  # type: ignore[no-redef]
+
 from .compat import iteritems, string_types
 
 if False:
     import typing as t, abc
     from .scope import Scope, Flow, SourceScope
-    from ast import ImportFrom, Import, Name as AstName, Attribute, Subscript, Constant
+    from ast import Name as AstName, Attribute, Subscript, Constant
     from functools import cached_property as cached_property
 
     T = t.TypeVar('T')
@@ -83,6 +89,8 @@ class AttributeException(Exception): pass
 
 
 class Location(object):
+    __slots__ = ('location',)
+
     def __init__(self, location):
         # type: (loc_t) -> None
         self.location = location
@@ -323,6 +331,79 @@ def np(node):
     return node.lineno, node.col_offset
 
 
+def node_start(node):
+    # type: (AST) -> loc_t
+    decorators = getattr(node, 'decorator_list', None)
+    if decorators:
+        return min(np(decorators[0]), np(node))
+    return node.lineno, node.col_offset  # type: ignore[attr-defined]
+
+
+def node_contains(node, position):
+    # type: (AST, loc_t) -> bool
+    end_line = getattr(node, 'end_lineno', None)
+    if end_line is None:
+        return False
+    return node_start(node) <= position <= (end_line, node.end_col_offset)  # type: ignore[attr-defined]
+
+
+def _child_at(node, position):
+    # type: (AST, loc_t) -> AST | None
+    for _, value in iter_fields(node):
+        if type(value) is list:
+            items = value
+            # Dict.keys has None for ** entries, they break source order
+            if len(items) > 8 and hasattr(items[0], 'lineno') and None not in items:
+                # nodes are in source order, bisect candidate
+                lo, hi = 0, len(items)
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if node_start(items[mid]) <= position:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                items = items[max(lo - 1, 0):lo]
+        elif isinstance(value, AST):
+            items = [value]
+        else:
+            continue
+
+        for it in items:
+            if not isinstance(it, AST):
+                continue
+            if hasattr(it, 'lineno'):
+                if node_contains(it, position):
+                    return it
+            else:
+                # positionless helper nodes: arguments, comprehension, etc
+                result = _child_at(it, position)
+                if result is not None:
+                    return result
+
+    return None
+
+
+CURSOR_STOP_NODES = Import, ImportFrom, JoinedStr
+
+
+def node_at(tree, position):
+    # type: (AST, loc_t) -> AST
+    """Return innermost node containing position
+
+    Descends from the root using node positions, statement lists are
+    bisected so lookup doesn't depend on tree size. End of a node
+    is inclusive to match cursor right after an identifier. Column is
+    in UTF-8 bytes like ``col_offset``.
+    """
+    node = tree
+    while type(node) not in CURSOR_STOP_NODES:
+        child = _child_at(node, position)
+        if child is None:
+            break
+        node = child
+    return node
+
+
 SOURCE_MARK = '__supp_mark__'
 
 
@@ -0,0 +1,63 @@
+"""Background pre-warm of server caches
+
+Loads things every first request pays for: builtin scope, listing of
+``sys.path`` entries and scopes of modules imported most often by
+project sources.
+"""
+import re
+import logging
+from collections import Counter
+from itertools import islice
+from threading import Lock
+
+from .scope import builtin_scope
+from .batch import iter_files
+
+if False:
+    import typing as t
+    from .project import Project
+
+log = logging.getLogger('supp.warmup')
+
+IMPORT_RE = re.compile(r'^[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import|import[ \t]+([\w.]+))', re.M)
+
+
+def most_imported(project, max_files=2000, lock=None):
+    # type: (Project, int, t.ContextManager[t.Any] | None) -> list[str]
+    """Absolute names of imported modules, most frequent first"""
+    imports = []  # type: list[tuple[str, str]]
+    for fname in islice(iter_files(project.sources), max_files):
+        try:
+            with open(fname) as f:
+                source = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+        for from_name, name in IMPORT_RE.findall(source):
+            imports.append((from_name or name, fname))
+
+    counter = Counter()  # type: Counter[str]
+    with lock or Lock():
+        for name, fname in imports:
+            try:
+                counter[project.norm_package(name, fname)] += 1
+            except Exception:
+                pass
+    return [name for name, _ in counter.most_common()]
+
+
+def prewarm(project, modules=20, max_files=2000, lock=None):
+    # type: (Project, int, int, t.ContextManager[t.Any] | None) -> None
+    """Load caches step by step, each step holds ``lock`` of project users"""
+    lock = lock or Lock()
+    with lock:
+        builtin_scope.names
+        with project.fs_index.snapshot():
+            project.list_packages('')
+
+    for name in most_imported(project, max_files, lock)[:modules]:
+        try:
+            with lock:
+                # scope and its exported names, what attribute completion needs
+                project.get_module(name)._attrs
+        except Exception:
+            log.debug('Unable to pre-warm %s', name, exc_info=True)
@@ -0,0 +1,175 @@
+"""Linux inotify backend for change detection
+
+Uses libc through ctypes, no external services or packages. Only
+directories are watched: events for contained files carry file names.
+Watched paths are kept absolute, inotify returns the same descriptor for
+every spelling of a directory.
+"""
+import os
+import sys
+import errno
+import struct
+import logging
+
+log = logging.getLogger('supp.watcher')
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+              IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF |
+              IN_MOVE_SELF | IN_ONLYDIR)
+LISTING_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+SELF_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+EVENT = struct.Struct('iIII')
+
+if False:
+    import typing as t
+
+
+class Changes(object):
+    def __init__(self):
+        # type: () -> None
+        self.files = set()  # type: set[str]
+        self.dirs = set()   # type: set[str]
+        self.overflow = False
+
+    def __bool__(self):
+        # type: () -> bool
+        return bool(self.files or self.dirs or self.overflow)
+
+    __nonzero__ = __bool__
+
+
+class InotifyWatcher(object):
+    def __init__(self):
+        # type: () -> None
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self.fd = fd
+        self._wds = {}   # type: dict[int, str]
+        self._paths = {}  # type: dict[str, int]
+        self._failed = set()  # type: set[str]
+        self._errno = ctypes.get_errno
+
+    def __contains__(self, path):
+        # type: (str) -> bool
+        return os.path.abspath(path) in self._paths
+
+    def watch(self, path):
+        # type: (str) -> bool
+        path = os.path.abspath(path)
+        if path in self._paths:
+            return True
+        if path in self._failed:
+            return False
+
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = self._errno()
+            if err == errno.ENOSPC:
+                log.warning('inotify watch limit reached, polling %s', path)
+            self._failed.add(path)
+            return False
+
+        self._wds[wd] = path
+        self._paths[path] = wd
+        return True
+
+    def _forget(self, wd):
+        # type: (int) -> str | None
+        path = self._wds.pop(wd, None)
+        if path is not None:
+            self._paths.pop(path, None)
+        return path
+
+    def poll(self):
+        # type: () -> Changes
+        """Read pending events without blocking"""
+        changes = Changes()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not data:
+                break
+
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, size = EVENT.unpack_from(data, pos)
+                pos += EVENT.size
+                name = os.fsdecode(data[pos:pos + size].rstrip(b'\0'))
+                pos += size
+
+                if mask & IN_Q_OVERFLOW:
+                    changes.overflow = True
+                    continue
+
+                dname = self._wds.get(wd)
+                if dname is None:
+                    continue
+
+                if mask & SELF_MASK:
+                    self._forget(wd)
+                    changes.dirs.add(dname)
+                    continue
+
+                if name:
+                    path = os.path.join(dname, name)
+                    changes.files.add(path)
+                    if mask & LISTING_MASK:
+                        changes.dirs.add(dname)
+                        changes.dirs.add(path)
+
+        for d in changes.dirs:
+            self._failed.discard(d)
+        return changes
+
+    def close(self):
+        # type: () -> None
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self._wds.clear()
+        self._paths.clear()
+
+
+def create_watcher():
+    # type: () -> InotifyWatcher | None
+    """Return watcher or None if platform doesn't support it"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return InotifyWatcher()
+    except (OSError, AttributeError) as e:
+        log.warning('inotify is not available: %s', e)
+        return None
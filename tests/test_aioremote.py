@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from supp.aioremote import AsyncEnvironment
+from .helpers import sp
+
+
+def test_pipelined_calls_and_timeout():
+    source, p = sp('''\
+        foo = 10
+        |
+    ''')
+
+    async def main():
+        env = AsyncEnvironment()
+        await env.configure({'sources': ['.']})
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await env.eval('import time\ntime.sleep(0.3)', timeout=0.05)
+
+            results = await asyncio.gather(
+                *[env.assist(source, p[0], 'boo.py') for _ in range(5)])
+            for m, names in results:
+                assert 'foo' in names
+            assert not env.futures
+        finally:
+            await env.close()
+
+    asyncio.run(main())
+
+
+def test_reader_error_fails_pending_and_new_calls():
+    import socket
+    events = []
+
+    def on_event(event, payload):
+        events.append(event)
+        raise ValueError('handler bug')
+
+    async def main():
+        env = AsyncEnvironment(on_event=on_event)
+        csock, ssock = socket.socketpair()
+        env.reader, env.writer = await asyncio.open_connection(sock=csock)
+        sreader, swriter = await asyncio.open_connection(sock=ssock)
+        env._read_task = asyncio.get_running_loop().create_task(
+            env._read_responses())
+
+        def send(data):
+            swriter.write(len(data).to_bytes(4, 'big') + data)
+
+        call = asyncio.ensure_future(env.eval('return 1', timeout=5))
+        await asyncio.sleep(0.05)
+        send(env.codec.dumps((None, 'diagnostics', ())))
+        send(b'\xc1')  # never used msgpack code
+        with pytest.raises(Exception) as e:
+            await call
+        assert not isinstance(e.value, asyncio.TimeoutError)
+        assert events == ['diagnostics']
+        assert not env.futures
+
+        with pytest.raises(Exception) as e:
+            await env.eval('return 1', timeout=5)
+        assert e.value is env._error
+        assert not env.futures
+
+        env.writer.close()
+        swriter.close()
+
+    asyncio.run(main())
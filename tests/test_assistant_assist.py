@@ -420,3 +420,40 @@ def test_cached_property():
 
     _, result = tassist(source, p[0])
     assert 'startswith' in result
+
+
+def test_eval_cache_between_requests(project):
+    fname = project.add_m('base', '''\
+        class Conn(object):
+            def send(self): pass
+
+        conn = Conn()
+        Alias = conn
+    ''')
+    source, p = sp('''\
+        import base
+        class Boo(object):
+            def foo(self):
+                self.conn = base.Alias
+                self.conn.|
+    ''')
+
+    with project.check_changes():
+        assert 'send' in tassist(source, p[0], project)[1]
+    hits = project.eval_cache.hits
+
+    with project.check_changes():
+        assert 'send' in tassist(source, p[0], project)[1]
+    assert project.eval_cache.hits > hits
+    assert project.eval_cache.stats()['modules'] == 1
+
+    with open(fname, 'w') as f:
+        f.write('class Conn(object):\n    def recv(self): pass\nAlias = Conn()\n')
+    mtime = os.path.getmtime(fname) + 10
+    os.utime(fname, (mtime, mtime))
+
+    with project.check_changes():
+        result = tassist(source, p[0], project)[1]
+    assert 'recv' in result
+    assert 'send' not in result
+    assert project.eval_cache.invalidations == 1
@@ -123,3 +123,26 @@ def test_imported_attr_location(project):
 #     loc, fname = tlocation(source, (4, 23), project, filename=__file__)
 #     print loc, fname
 #     assert False
+
+
+def test_location_after_non_ascii_text():
+    source, p = sp(u'''\
+        alpha = beta = gamma = 1
+        x = 'éééééééé' + alpha + be|ta + gam|ma
+    ''')
+
+    loc, = tlocation(source, p[0])
+    assert loc['loc'] == (1, 8)
+    loc, = tlocation(source, p[1])
+    assert loc['loc'] == (1, 15)
+
+
+def test_location_in_dict_with_unpacking():
+    source, p = sp('''\
+        a = 1
+        x = {}
+        d = {1: a, 2: a, 3: a, 4: a, 5: a, 6: a, 7: a, 8: a, 9: a, **x|, 10: a}
+    ''')
+
+    loc, = tlocation(source, p[0])
+    assert loc['loc'] == (2, 0)
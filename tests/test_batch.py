@@ -0,0 +1,71 @@
+from supp import batch
+
+
+def test_parallel_lint_is_stable(tmpdir):
+    for i in range(10):
+        tmpdir.join('m{}.py'.format(i)).write('import os\nboo{}\n'.format(i))
+    tmpdir.join('sub').ensure(dir=True).join('a.py').write('foo = 1\n')
+
+    files = list(batch.iter_files([str(tmpdir)]))
+    assert files[0].endswith('m0.py')
+    assert files[-1].endswith('sub/a.py')
+
+    sequential = list(batch.run(batch.lint_file, files, [str(tmpdir)]))
+    parallel = list(batch.run(batch.lint_file, files, [str(tmpdir)], jobs=3))
+    assert sequential == parallel
+    assert [r[0] for r in parallel] == files
+    assert [r[:4] for r in parallel[1][1]] == [
+        ('E02', 'Undefined name: boo1', 2, 0),
+        ('W02', 'Unused import: os', 1, 7)]
+
+
+def test_prepare_summaries(tmpdir):
+    tmpdir.join('popular.py').write('foo = 1\nbar = 2\n')
+    for i in range(4):
+        tmpdir.join('m{}.py'.format(i)).write('from popular import *\nfoo, bar\n')
+
+    options = {'cache_db': str(tmpdir.join('cache.db'))}
+    files = list(batch.iter_files([str(tmpdir)]))
+    sources = [str(tmpdir)]
+    assert batch.prepare_summaries(files, sources, 2, options) == [
+        str(tmpdir.join('popular.py'))]
+
+    batch.init_worker(sources, options)
+    _, errors = batch.lint_file(files[0])
+    assert errors == []
+    assert batch.get_project().scope_cache.stats()['hits'] == 1
+
+
+def test_check_imports_resolves_each_module_once(tmpdir, monkeypatch):
+    from supp import imports
+    tmpdir.join('util.py').write('foo = 1\n')
+    for i in range(5):
+        tmpdir.join('m{}.py'.format(i)).write(
+            'from util import foo, bar{}\nimport missing\n'.format(i))
+
+    calls = []
+    resolve = imports.resolve
+    monkeypatch.setattr(imports, 'resolve',
+                        lambda p, m, n: calls.append(m) or resolve(p, m, n))
+
+    files = list(batch.iter_files([str(tmpdir)]))
+    result = dict(batch.check_imports(files, [str(tmpdir)]))
+    assert sorted(calls) == ['missing', 'util']
+    assert [r[:4] for r in result[files[2]]] == [
+        ('E04', 'Missing name: bar2 in util', 1, 0),
+        ('E03', 'Unresolved import: missing', 2, 0)]
+    assert result[files[-1]] == []
+
+    assert dict(batch.check_imports(files, [str(tmpdir)], jobs=2)) == result
+
+
+def test_lint_reports_unreadable_file(tmpdir):
+    tmpdir.join('good.py').write('foo = 1\n')
+    tmpdir.join('bad.py').write_binary(b'foo = "\xff"\n')
+
+    files = list(batch.iter_files([str(tmpdir)]))
+    result = dict(batch.run(batch.lint_file, files, [str(tmpdir)]))
+    assert result[str(tmpdir.join('good.py'))] == []
+    [(e, msg, line, col, _)] = result[str(tmpdir.join('bad.py'))]
+    assert (e, line, col) == ('E01', 1, 0)
+    assert msg.startswith('Unable to read file')
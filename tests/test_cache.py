@@ -0,0 +1,98 @@
+import os
+
+from supp.project import Project
+from supp.cache import ScopeCache, ModuleSummary
+
+
+def cproject(tmpdir, **kwargs):
+    src = tmpdir.join('src').ensure(dir=True)
+    return Project([str(src)], cache_dir=str(tmpdir.join('cache')), **kwargs), src
+
+
+def test_summary_is_reused_between_projects(tmpdir):
+    project, src = cproject(tmpdir)
+    src.join('boo.py').write('import os\nfoo = 10\ndef bar(): pass\n')
+
+    m = project.get_module('boo')
+    assert set(m.attr_list(None)) == {'os', 'foo', 'bar'}
+    assert project.scope_cache.stats()['misses'] == 1
+
+    project, _ = cproject(tmpdir)
+    m = project.get_module('boo')
+    assert set(m.attr_list(None)) == {'os', 'foo', 'bar'}
+    assert m.summary.names['bar'] == (3, 4)
+    assert m.summary.imports == ['os']
+    assert 'scope' not in m.__dict__
+    assert project.scope_cache.stats()['hits'] == 1
+
+
+def test_content_hash_keeps_entry_valid(tmpdir):
+    project, src = cproject(tmpdir)
+    fname = src.join('boo.py')
+    fname.write('foo = 10\n')
+    project.get_module('boo').summary
+
+    os.utime(str(fname), (1, 1))
+    project, _ = cproject(tmpdir)
+    assert set(project.get_module('boo').attr_list(None)) == {'foo'}
+    assert project.scope_cache.hits == 1
+
+    fname.write('bar = 10\n')
+    os.utime(str(fname), (2, 2))
+    project, _ = cproject(tmpdir)
+    assert set(project.get_module('boo').attr_list(None)) == {'bar'}
+    assert project.scope_cache.misses == 1
+
+
+def test_star_import_dependency_invalidates_entry(tmpdir):
+    project, src = cproject(tmpdir)
+    src.join('foo.py').write('foo = 10\n')
+    src.join('boo.py').write('from foo import *\n')
+    assert set(project.get_module('boo').attr_list(None)) == {'foo'}
+
+    src.join('foo.py').write('foo = 10\nbar = 20\n')
+    os.utime(str(src.join('foo.py')), (1, 1))
+    project, _ = cproject(tmpdir)
+    assert set(project.get_module('boo').attr_list(None)) == {'foo', 'bar'}
+
+
+def test_transitive_star_import_invalidates_entry(tmpdir):
+    project, src = cproject(tmpdir)
+    src.join('c.py').write('foo = 10\n')
+    src.join('b.py').write('from c import *\n')
+    src.join('a.py').write('from b import *\n')
+    assert set(project.get_module('a').attr_list(None)) == {'foo'}
+
+    src.join('c.py').write('foo = 10\nbar = 20\n')
+    os.utime(str(src.join('c.py')), (1, 1))
+    project, _ = cproject(tmpdir)
+    assert set(project.get_module('a').attr_list(None)) == {'foo', 'bar'}
+
+
+def test_cache_size_limit(tmpdir):
+    cache = ScopeCache(str(tmpdir), max_entries=10)
+    for i in range(15):
+        cache.put('/m{}.py'.format(i), i, '', ModuleSummary({}, [], []))
+    assert cache.size <= 10
+    assert cache.evictions
+    assert cache.size == len(os.listdir(str(tmpdir)))
+
+
+def test_sqlite_store_is_shared(tmpdir):
+    db = str(tmpdir.join('cache.db'))
+    src = tmpdir.join('src').ensure(dir=True)
+    src.join('boo.py').write('foo = 10\n')
+
+    project = Project([str(src)], cache_db=db)
+    assert set(project.get_module('boo').attr_list(None)) == {'foo'}
+    assert project.scope_cache.stats() == {
+        'hits': 0, 'misses': 1, 'evictions': 0, 'size': 1}
+
+    project = Project([str(src)], cache_db=db)
+    assert set(project.get_module('boo').attr_list(None)) == {'foo'}
+    assert project.scope_cache.hits == 1
+
+    project.scope_cache.max_entries = 2
+    for i in range(5):
+        project.scope_cache.put('/m{}.py'.format(i), i, '', ModuleSummary({}, [], []))
+    assert project.scope_cache.size <= 2
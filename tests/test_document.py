@@ -0,0 +1,46 @@
+import pytest
+
+from supp.document import Document, VersionError, text_edits
+
+
+def test_apply_edits():
+    doc = Document('boo.py', 'foo = 1\nbar = 2\n')
+    doc.apply(1, [(1, 6, 1, 7, '10'), (2, 0, 3, 0, '')])
+    assert doc.text == 'foo = 10\n'
+
+    doc.apply(2, [(1, 8, 1, 8, '\nbaz = foo')])
+    assert doc.text == 'foo = 10\nbaz = foo\n'
+
+    with pytest.raises(VersionError):
+        doc.apply(2, [])
+
+
+def test_failed_change_keeps_document():
+    doc = Document('boo.py', 'foo = 1\n')
+    with pytest.raises(ValueError):
+        doc.apply(1, [(1, 0, 1, 3, 'bar'), (5, 0, 5, 0, 'x')])
+    assert doc.text == 'foo = 1\n'
+    assert doc.version == 0
+
+    doc.apply(1, [(1, 0, 1, 3, 'bar')])
+    assert doc.text == 'bar = 1\n'
+
+
+@pytest.mark.parametrize('old, new', [
+    ('foo\nbar\n', 'foo\nbaz\n'),
+    ('foo\nbar\n', 'foo\n'),
+    ('foo\n', 'foo\nbar\nbaz\n'),
+    ('foo', ''),
+    ('', 'foo\n'),
+    ('a\na\na\n', 'a\na\n'),
+])
+def test_text_edits(old, new):
+    doc = Document('boo.py', old)
+    doc.apply(1, text_edits(old, new))
+    assert doc.text == new
+
+
+def test_text_edits_are_minimal():
+    old = 'import os\n\ndef boo():\n    return os\n'
+    new = old.replace('return os', 'return os.path')
+    assert text_edits(old, new) == [(4, 13, 4, 13, '.path')]
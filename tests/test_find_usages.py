@@ -17,3 +17,135 @@ def test_simple():
 
     tusages(source)
     # assert False
+
+
+def test_usage_index(tmpdir):
+    import os
+    from supp.usages import UsageIndex
+    from supp.assistant import references
+
+    util = tmpdir.join('util.py')
+    util.write('def foo():\n    pass\n')
+    tmpdir.join('boo.py').write('from util import foo\nfoo()\n')
+    tmpdir.join('bar.py').write('import util\nutil.foo()\n')
+    tmpdir.join('other.py').write('x = 1\nx\n')
+
+    path = str(tmpdir.join('index.json'))
+    files = sorted(str(r) for r in tmpdir.listdir() if r.ext == '.py')
+    sources = [str(tmpdir)]
+
+    index = UsageIndex(path)
+    assert index.update(files, sources, jobs=2) == 4
+    assert index.references(str(util), (1, 4)) == [
+        (str(tmpdir.join('bar.py')), (2, 0)),
+        (str(tmpdir.join('boo.py')), (2, 0))]
+
+    index = UsageIndex(path)
+    assert index.update(files, sources) == 0
+
+    # declaration moved, files referencing it are reindexed too
+    util.write('\ndef foo():\n    pass\n')
+    mtime = os.path.getmtime(str(util)) + 10
+    os.utime(str(util), (mtime, mtime))
+    assert index.update(files, sources) == 3
+    assert index.references(str(util), (1, 4)) == []
+    assert len(index.references(str(util), (2, 4))) == 2
+
+    result = references(Project(sources), index, 'from util import foo\nfoo()\n',
+                        (2, 1), str(tmpdir.join('boo.py')))
+    assert result == [{'loc': (2, 0), 'file': str(tmpdir.join('bar.py'))},
+                      {'loc': (2, 0), 'file': str(tmpdir.join('boo.py'))}]
+
+
+def test_evaluate_many_shares_bindings(monkeypatch):
+    from supp.util import Source, get_all_usages
+    from supp.nast import extract_scope
+    from supp.evaluator import EvalCtx
+    from supp.name import AssignedName
+
+    source, _p = sp('''\
+        import os
+        a = os.path
+        b = a
+        b.join(b.sep, a.join)
+        def foo():
+            return foo()
+        foo()
+        undefined.attr
+    ''')
+    project = Project()
+    src = Source(source, 'test.py')
+    extract_scope(src, project)
+    nodes = [r[3] for r in get_all_usages(src.tree)]
+
+    def key(values):
+        # objects are recreated by evaluation, compare their origin
+        return [(type(r), getattr(r, 'declared_at', None)) for r in values]
+
+    expected = key(EvalCtx(project).evaluate(r) for r in nodes)
+    decls = [EvalCtx(project).declarations(r, []) for r in nodes]
+
+    calls = []
+    orig = EvalCtx._guarded_evaluate
+
+    def guarded_evaluate(ctx, node):
+        if type(node) is AssignedName:
+            calls.append(node)
+        return orig(ctx, node)
+
+    monkeypatch.setattr(EvalCtx, '_guarded_evaluate', guarded_evaluate)
+    ctx = EvalCtx(project)
+    assert key(ctx.evaluate_many(nodes)) == expected
+    assert calls and len(calls) == len(set(calls))
+    assert ctx.declarations_many(nodes) == decls
+
+
+def test_usage_index_partial_update(tmpdir, caplog):
+    from supp.usages import UsageIndex
+
+    sub = tmpdir.join('sub').ensure(dir=True)
+    tmpdir.join('util.py').write('def foo():\n    pass\n')
+    sub.join('boo.py').write('from util import foo\nfoo()\n')
+    sub.join('bar.py').write('from util import foo\nfoo()\n')
+    sources = [str(tmpdir)]
+
+    index = UsageIndex()
+    files = sorted(str(r) for r in tmpdir.visit('*.py'))
+    assert index.update(files, sources, paths=sources) == 3
+
+    # refresh of a subdirectory keeps the rest of the index
+    sub.join('bar.py').remove()
+    files = [str(sub.join('boo.py'))]
+    assert index.update(files, sources, paths=[str(sub)]) == 0
+    assert sorted(index.files) == [str(sub.join('boo.py')), str(tmpdir.join('util.py'))]
+
+    # deleted file is dropped even if still listed
+    sub.join('boo.py').remove()
+    assert index.update(files, sources) == 0
+    assert list(index.files) == [str(tmpdir.join('util.py'))]
+
+    broken = tmpdir.join('broken.py')
+    broken.write(b'\xff\xfe', 'wb')
+    assert index.update([str(broken)], sources) == 1
+    assert 'Unable to index {}'.format(broken) in caplog.text
+
+
+def test_usage_index_relative_paths(tmpdir, monkeypatch):
+    from supp import batch
+    from supp.usages import UsageIndex
+
+    monkeypatch.chdir(tmpdir)
+    tmpdir.join('util.py').write('def foo():\n    pass\n')
+    tmpdir.join('boo.py').write('from util import foo\nfoo()\n')
+
+    index = UsageIndex()
+    files = list(batch.iter_files(['.']))
+    assert index.update(files, ['.'], paths=['.']) == 2
+    assert index.references('util.py', (1, 4)) == [(str(tmpdir.join('boo.py')), (2, 0))]
+    assert index.references(str(tmpdir.join('util.py')), (1, 4)) == \
+        index.references('./util.py', (1, 4))
+
+    # same tree listed by absolute path is up to date
+    assert index.update(batch.iter_files([str(tmpdir)]), [str(tmpdir)],
+                        paths=[str(tmpdir)]) == 0
+    assert sorted(index.files) == [str(tmpdir.join('boo.py')), str(tmpdir.join('util.py'))]
@@ -0,0 +1,139 @@
+from supp.assistant import assist, location
+from supp.incremental import BufferCache
+from supp.project import Project
+from supp.util import Source
+
+from .helpers import sp, dedent
+
+
+SOURCE = dedent('''\
+    import os
+
+    class Boo(object):
+        def __init__(self):
+            self.foo = 10
+
+        def boo(self, arg):
+            bar = arg
+            return bar
+
+    def func(a, b):
+        baz = a
+        return baz
+''')
+
+
+def edit(source, line, col, text):
+    lines = source.split('\n')
+    l = lines[line - 1]
+    lines[line - 1] = l[:col] + text + l[col:]
+    return '\n'.join(lines)
+
+
+def tbuffer(source, buffers, filename='boo.py'):
+    buf = buffers.get(filename)
+    return buf, buf.update(Source(source, filename))
+
+
+def test_function_body_edit_reuses_scope():
+    project = Project()
+    buffers = BufferCache()
+    buf, source = tbuffer(SOURCE, buffers)
+    scope = buf.scope(project)
+    boo_flow = scope.flow.names['Boo'].flow
+
+    new = edit(SOURCE, 12, 4, 'x = 1; ')
+    buf, source = tbuffer(new, buffers)
+    assert buf._plan[0] == 'func'
+    assert buf.scope(project) is scope
+    assert scope.flow.names['Boo'].flow is boo_flow
+
+    fscope = scope.flow.names['func']
+    assert set(fscope.flow.names_at((13, 0))) >= {'x', 'a', 'b', 'baz'}
+
+
+def test_top_level_edit_reparses_statement():
+    buffers = BufferCache()
+    buf, source = tbuffer(SOURCE, buffers)
+    tree = source.tree
+    stmt = tree.body[1]
+
+    new = edit(SOURCE, 1, 0, 'import sys\n')
+    buf, source = tbuffer(new, buffers)
+    assert source.tree is tree
+    assert source.tree.body[2] is stmt
+    assert stmt.lineno == 4
+    assert len(source.tree.body) == 4
+    assert buf._plan == ('full',)
+
+
+def test_results_match_full_extraction():
+    project = Project()
+    buffers = BufferCache()
+    source = SOURCE
+    cursors = [(8, 17), (9, 18), (5, 16), (13, 14)]
+    edits = [('self.foo = 10', 'self.foo = 11'), ('bar = arg', 'bar  = arg'),
+             ('baz = a', 'baz = a + 1'), ('import os', 'import sys')]
+    for old, new in edits:
+        source = source.replace(old, new)
+        for pos in cursors:
+            expected = assist(project, source, pos, 'boo.py')
+            assert assist(project, source, pos, 'boo.py', buffers=buffers) == expected
+
+            expected = location(project, source, pos, 'boo.py')
+            assert location(project, source, pos, 'boo.py', buffers=buffers) == expected
+
+
+def test_edit_of_semicolon_joined_statements():
+    project = Project()
+    buffers = BufferCache()
+    source = 'import os\nzz = 1; from os import path\nyy = 2\n'
+
+    for new in ('import os\nyy = 2\n', 'import os\nzz = 1; ww = 3\nyy = 2\n'):
+        tbuffer(source, buffers)[1].tree
+        buf, result = tbuffer(new, buffers)
+        assert buf._plan == ('full',)
+        expected = Source(new, 'boo.py').tree
+        assert [type(r) for r in result.tree.body] == [type(r) for r in expected.body]
+        assert ([r.lineno for r in result.tree.body]
+                == [r.lineno for r in expected.body])
+
+        pos = (new.count('\n') + 1, 0)
+        assert (assist(project, new, pos, 'boo.py', buffers=buffers)
+                == assist(project, new, pos, 'boo.py'))
+
+
+def test_instance_attributes_follow_edits():
+    project = Project()
+    buffers = BufferCache()
+    source, p = sp('''\
+        class Boo(object):
+            def __init__(self):
+                self.foo = 10
+
+            def boo(self):
+                self.|
+    ''')
+    _, result = assist(project, source, p[0], 'boo.py', buffers=buffers)
+    assert 'foo' in result
+
+    source = source.replace('self.foo', 'self.bar')
+    _, result = assist(project, source, p[0], 'boo.py', buffers=buffers)
+    assert 'bar' in result
+    assert 'foo' not in result
+
+
+def test_cursor_move_reuses_scope():
+    project = Project()
+    buffers = BufferCache()
+    assert 'bar' in assist(project, SOURCE, (9, 18), 'boo.py', buffers=buffers)[1]
+    buf = buffers.get(('boo.py', False))
+    scope = buf._scope
+    tree = buf.source.tree
+
+    assert 'baz' in assist(project, SOURCE, (13, 14), 'boo.py', buffers=buffers)[1]
+    result = location(project, SOURCE, (8, 15), 'boo.py', buffers=buffers)
+    assert result == [{'loc': (7, 18), 'file': 'boo.py'}]
+    assert buf._scope is scope
+    assert buf.source.tree is tree
+    assert ('boo.py', True) not in buffers._buffers
@@ -217,3 +217,77 @@ def test_args_kwarrgs_annotations():
             print(args, kwargs)
     ''')
     assert not result
+
+
+def test_check_imports(project):
+    from supp.imports import check
+    project.add_m('pkg.util', 'foo = 1\n')
+    project.add_m('pkg.sub.mod')
+    fname = project.add_m('pkg.boo')
+    source = dedent('''\
+        import os, missing_module
+        from .util import foo, bar
+        from . import sub, nothing
+        from __future__ import print_function
+        try:
+            import other_missing
+        except ImportError:
+            pass
+        from sys import path
+    ''')
+
+    assert strip(check(project, source, fname)) == [
+        ('E03', 'Unresolved import: missing_module', 1, 0),
+        ('E04', 'Missing name: bar in pkg.util', 2, 0),
+        ('E04', 'Missing name: nothing in pkg', 3, 0)]
+
+
+def test_noqa_suppressions():
+    result = tlint('''\
+        import os  # noqa
+        import sys  # noqa: E02
+        def boo(a):  # NOQA: W01
+            return foo + bar  # noqa:E02
+        baz
+    ''')
+    assert strip(result) == [('E02', 'Undefined name: baz', 5, 0),
+                             ('W02', 'Unused import: sys', 2, 7)]
+
+
+def test_noqa_whole_file():
+    result = tlint('''\
+        # supp: noqa: W01, W02
+        import os
+        def boo(a):
+            foo
+    ''')
+    assert strip(result) == [('E02', 'Undefined name: foo', 4, 4)]
+
+    result = tlint('''\
+        import os
+        # supp: noqa
+        foo
+    ''')
+    assert result == []
+
+    # inline form applies only to its line
+    result = tlint('''\
+        foo  # supp: noqa
+        bar
+    ''')
+    assert strip(result) == [('E02', 'Undefined name: bar', 2, 0)]
+
+
+def test_names_used_by_loop_back_edge():
+    # prevname is read on the next iteration only
+    result = tlint('''\
+        def boo(names):
+            prevname = ''
+            for name in names:
+                if name[:3] == 'do_':
+                    if name == prevname:
+                        continue
+                    prevname = name
+                    print(name)
+    ''')
+    assert strip(result) == []
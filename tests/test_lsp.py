@@ -0,0 +1,137 @@
+import io
+import os
+import json
+from threading import Thread
+
+from supp.lsp import LanguageServer, path_to_uri
+
+
+class Client(object):
+    def __init__(self, tmpdir, capabilities=None):
+        rfd, self._wfd = os.pipe()
+        self._rfd, wfd = os.pipe()
+        self.server = LanguageServer(io.open(rfd, 'rb'), io.open(wfd, 'wb'),
+                                     lint_delay=0.01)
+        self.rfile = io.open(self._rfd, 'rb')
+        self.wfile = io.open(self._wfd, 'wb')
+        self.thread = Thread(target=self.server.run)
+        self.thread.daemon = True
+        self.thread.start()
+        self.ids = 0
+        self.notifications = []
+        self.initialized = self.request('initialize', {
+            'rootUri': path_to_uri(str(tmpdir)), 'capabilities': capabilities or {}})
+
+    def send(self, message):
+        message['jsonrpc'] = '2.0'
+        body = json.dumps(message).encode('utf-8')
+        self.wfile.write('Content-Length: {}\r\n\r\n'.format(len(body)).encode())
+        self.wfile.write(body)
+        self.wfile.flush()
+
+    def recv(self):
+        size = int(self.rfile.readline().split(b':')[1])
+        self.rfile.readline()
+        return json.loads(self.rfile.read(size).decode('utf-8'))
+
+    def request(self, method, params):
+        self.ids += 1
+        self.send({'id': self.ids, 'method': method, 'params': params})
+        while True:
+            message = self.recv()
+            if message.get('id') == self.ids:
+                return message
+            self.notifications.append(message)
+
+    def notify(self, method, params):
+        self.send({'method': method, 'params': params})
+
+    def close(self):
+        self.request('shutdown', None)
+        self.notify('exit', None)
+        self.thread.join(5)
+
+
+def test_completion_definition_and_diagnostics(tmpdir):
+    client = Client(tmpdir)
+    uri = path_to_uri(str(tmpdir.join('boo.py')))
+    doc = {'uri': uri}
+
+    client.notify('textDocument/didOpen', {'textDocument': dict(
+        doc, languageId='python', version=1, text='import os\nfoo = 1\n')})
+    client.notify('textDocument/didChange', {
+        'textDocument': dict(doc, version=2),
+        'contentChanges': [{'range': {'start': {'line': 2, 'character': 0},
+                                      'end': {'line': 2, 'character': 0}},
+                            'text': 'bar = foo'}]})
+
+    result = client.request('textDocument/completion', {
+        'textDocument': doc, 'position': {'line': 2, 'character': 8}})['result']
+    assert 'foo' in [r['label'] for r in result['items']]
+
+    result = client.request('textDocument/definition', {
+        'textDocument': doc, 'position': {'line': 2, 'character': 7}})['result']
+    assert result == [{'uri': uri, 'range': {'start': {'line': 1, 'character': 0},
+                                             'end': {'line': 1, 'character': 0}}}]
+
+    while True:
+        message = client.notifications.pop(0) if client.notifications else client.recv()
+        if message.get('method') == 'textDocument/publishDiagnostics':
+            break
+    codes = [r['code'] for r in message['params']['diagnostics']]
+    assert message['params']['version'] == 2
+    assert 'W02' in codes  # unused os
+    client.close()
+
+
+def test_utf16_positions(tmpdir):
+    client = Client(tmpdir)
+    assert client.initialized['result']['capabilities']['positionEncoding'] == 'utf-16'
+    uri = path_to_uri(str(tmpdir.join('boo.py')))
+    doc = {'uri': uri}
+
+    # astral char takes two UTF-16 units
+    client.notify('textDocument/didOpen', {'textDocument': dict(
+        doc, languageId='python', version=1, text="foo = 1\nx = '\U0001d4b3' + f\n")})
+    client.notify('textDocument/didChange', {
+        'textDocument': dict(doc, version=2),
+        'contentChanges': [{'range': {'start': {'line': 1, 'character': 11},
+                                      'end': {'line': 1, 'character': 12}},
+                            'text': 'foo'}]})
+
+    result = client.request('textDocument/definition', {
+        'textDocument': doc, 'position': {'line': 1, 'character': 13}})['result']
+    assert result[0]['range']['start'] == {'line': 0, 'character': 0}
+    assert client.server.server.documents[str(tmpdir.join('boo.py'))].lines[1] == \
+        "x = '\U0001d4b3' + foo"
+    client.close()
+    assert not client.server.requests
+
+
+def test_utf32_positions(tmpdir):
+    client = Client(tmpdir, {'general': {'positionEncodings': ['utf-32', 'utf-16']}})
+    assert client.initialized['result']['capabilities']['positionEncoding'] == 'utf-32'
+    client.close()
+
+
+def test_result_columns_are_converted_from_bytes(tmpdir):
+    # yy is at byte 14, code point 10 and UTF-16 unit 11
+    for capabilities, char in ((None, 11), ({'general': {'positionEncodings': ['utf-32']}}, 10)):
+        client = Client(tmpdir, capabilities)
+        uri = path_to_uri(str(tmpdir.join('boo.py')))
+        doc = {'uri': uri}
+        client.notify('textDocument/didOpen', {'textDocument': dict(
+            doc, languageId='python', version=1,
+            text='s = "é\U0001d4b3"; yy = 1\nyy\né = "ééé"; zz\n')})
+
+        result = client.request('textDocument/definition', {
+            'textDocument': doc, 'position': {'line': 1, 'character': 1}})['result']
+        assert result[0]['range']['start'] == {'line': 0, 'character': char}
+
+        while True:
+            message = client.notifications.pop(0) if client.notifications else client.recv()
+            if message.get('method') == 'textDocument/publishDiagnostics':
+                break
+        [diag] = [r for r in message['params']['diagnostics'] if r['code'] == 'E02']
+        assert diag['range']['start'] == {'line': 2, 'character': 11}
+        client.close()
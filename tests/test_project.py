@@ -1,3 +1,4 @@
+import pytest
 from supp.project import Project
 
 
@@ -11,3 +12,208 @@ def test_import_of_compiled_modules():
     p = Project()
     m = p.get_module('datetime')
     assert 'timedelta' in m.attr_list(None)
+
+
+def test_module_lookup_uses_fs_index(project):
+    fname = project.add_m('testp.module')
+    index = project.fs_index
+
+    with project.check_changes():
+        assert project.find_module('testp.module') == fname
+        assert index.stats()['stat'] == 1
+        assert 'module' in project.list_packages('testp')
+        stats = index.stats()
+        assert project.find_module('testp.module') == fname
+        assert 'module' in project.list_packages('testp')
+        assert index.stats()['stat'] == stats['stat']
+        assert index.stats()['lookups'] > stats['lookups']
+
+
+def test_fs_index_sees_new_modules(project):
+    with project.check_changes():
+        assert 'boo' not in project.list_packages('')
+
+    project.add_m('boo')
+    with project.check_changes():
+        assert 'boo' in project.list_packages('')
+        assert project.get_module('boo').filename == project.get_m('boo')
+
+
+def test_watcher_invalidates_modules(tmpdir):
+    from supp.watcher import create_watcher
+    if not create_watcher():
+        pytest.skip('inotify is not available')
+
+    project = Project([str(tmpdir)], watch=True)
+    tmpdir.join('boo.py').write('foo = 1\n')
+
+    with project.check_changes():
+        m = project.get_module('boo')
+        assert m.watched
+        assert 'boo' in project.list_packages('')
+        stats = project.fs_index.stats()
+
+    with project.check_changes():
+        assert project.get_module('boo') is m
+        assert 'boo' in project.list_packages('')
+        assert project.fs_index.stats()['stat'] == stats['stat']
+
+    tmpdir.join('boo.py').write('bar = 1\n')
+    tmpdir.join('baz.py').write('')
+    with project.check_changes():
+        m = project.get_module('boo')
+        assert set(m.attr_list(None)) == {'bar'}
+        assert 'baz' in project.list_packages('')
+
+
+def test_watcher_handles_moved_directory(tmpdir):
+    from supp.watcher import create_watcher
+    if not create_watcher():
+        pytest.skip('inotify is not available')
+
+    project = Project([str(tmpdir)], watch=True)
+    pkg = tmpdir.join('pkg').ensure(dir=True)
+    pkg.join('__init__.py').ensure()
+    pkg.join('boo.py').write('foo = 1\n')
+
+    with project.check_changes():
+        m = project.get_module('pkg.boo')
+        assert m.watched
+        m.scope
+
+    pkg.move(tmpdir.join('old'))
+    pkg = tmpdir.join('pkg').ensure(dir=True)
+    pkg.join('__init__.py').ensure()
+    pkg.join('boo.py').write('bar = 1\n')
+    with project.check_changes():
+        m = project.get_module('pkg.boo')
+        assert set(m.attr_list(None)) == {'bar'}
+
+
+def test_prewarm_loads_most_imported(project):
+    from supp.warmup import most_imported, prewarm
+    project.add_m('pkg.util', 'foo = 1\n')
+    project.add_m('pkg.boo', 'from .util import foo\nimport os\n')
+    project.add_m('bar', 'from pkg.util import foo\nimport pkg.boo\n')
+
+    assert most_imported(project)[:1] == ['pkg.util']
+    prewarm(project)
+    assert 'scope' in project.get_module('pkg.util').__dict__
+
+
+def test_prewarm_steps_hold_lock(project):
+    from threading import RLock
+    from supp.warmup import prewarm
+    project.add_m('pkg.util', 'foo = 1\n')
+    project.add_m('bar', 'from pkg.util import foo\n')
+
+    lock = RLock()
+    owned = []
+    get_module = project.get_module
+    project.get_module = lambda name: owned.append(lock._is_owned()) or get_module(name)
+    prewarm(project, lock=lock)
+    assert owned and all(owned)
+
+
+def test_changed_module_evicts_dependents(project):
+    import os
+    fname = project.add_m('pkg.util', 'foo = 1\n')
+    project.add_m('pkg.boo', 'from .util import foo\n')
+    project.add_m('bar', 'from pkg.boo import *\n')
+    project.add_m('other', 'import os\n')
+
+    with project.check_changes():
+        bar = project.get_module('bar')
+        assert set(bar.scope.exported_names) == {'foo'}
+        boo = project.get_module('pkg.boo')
+        project.get_module('pkg.util').scope
+        other = project.get_module('other')
+        other.scope
+
+    assert project.affected_modules(['pkg.util']) == ['bar', 'pkg.boo', 'pkg.util']
+    assert project.affected_modules([fname]) == ['bar', 'pkg.boo', 'pkg.util']
+
+    with open(fname, 'w') as f:
+        f.write('foo = 1\nbaz = 2\n')
+    mtime = os.path.getmtime(fname) + 10
+    os.utime(fname, (mtime, mtime))
+
+    with project.check_changes():
+        new_bar = project.get_module('bar')
+        assert new_bar is not bar
+        assert project.get_module('pkg.boo') is not boo
+        assert project.get_module('other') is other
+
+
+def test_scope_budget_evicts_least_recently_used(tmpdir):
+    project = Project([str(tmpdir)], scope_budget=40)
+    for name in 'abc':
+        tmpdir.join(name + '.py').write('foo = 1\nbar = 2\n')  # 16 chars
+
+    with project.check_changes():
+        a = project.get_module('a')
+        b = project.get_module('b')
+        a._attrs
+        b._attrs
+        a._attrs  # b is least recently used now
+        project.get_module('c')._attrs
+
+    assert 'scope' not in b.__dict__
+    assert 'scope' in a.__dict__
+    assert set(b.attr_list(None)) == {'foo', 'bar'}
+    assert 'scope' not in b.__dict__
+    stats = project.scope_stats()
+    assert stats['scopes'] == 2
+    assert stats['size'] == 32
+    assert stats['evictions'] == 1
+
+    assert b.get_attr(None, 'foo').name == 'foo'
+    assert 'scope' in b.__dict__
+    assert project.scope_stats()['rebuilds'] == 1
+    assert project.scope_stats()['evictions'] == 2
+
+
+def test_eval_cache_checks_module_once_per_context(project):
+    import os
+    fname = project.add_m('boo', 'foo = 1\n')
+    cache = project.eval_cache
+
+    with project.check_changes():
+        m = project.get_module('boo')
+        cache.put(m, 'foo', 1)
+
+    calls = []
+    get_module = project.get_module
+    project.get_module = lambda name: calls.append(name) or get_module(name)
+    with project.check_changes():
+        assert cache.get(project, m, 'foo') == 1
+        assert cache.get(project, m, 'foo') == 1
+    assert calls == ['boo']
+
+    mtime = os.path.getmtime(fname) + 10
+    os.utime(fname, (mtime, mtime))
+    with project.check_changes():
+        assert cache.get(project, m, 'foo') is None
+    assert cache.stats()['modules'] == 0
+
+
+def test_watcher_with_relative_sources(tmpdir, monkeypatch):
+    from supp.watcher import create_watcher
+    if not create_watcher():
+        pytest.skip('inotify is not available')
+
+    monkeypatch.chdir(tmpdir)
+    project = Project(['.'], watch=True)
+    pkg = tmpdir.join('pkg').ensure(dir=True)
+    pkg.join('__init__.py').ensure()
+    pkg.join('a.py').write('foo = 1\n')
+
+    with project.check_changes():
+        assert project.list_packages('pkg') == {'a'}
+        assert project.get_module('pkg.a').watched
+
+    pkg.join('b.py').write('bar = 1\n')
+    with project.check_changes():
+        assert project.list_packages('pkg') == {'a', 'b'}
+        m = project.get_module('pkg.b')
+        assert set(m.attr_list(None)) == {'bar'}
@@ -1,4 +1,9 @@
+import time
+
+import pytest
+
 from supp.remote import Environment
+from supp.umsgpack import dumps, loads
 from .helpers import sp
 
 
@@ -12,3 +17,171 @@ def test_remote_assist():
     m, result = env.assist(source, p[0], 'boo.py')
     assert m == ''
     assert 'foo' in result
+
+
+def tserver(workers=1):
+    from multiprocessing import Pipe
+    from threading import Thread
+    from supp.server import Server
+
+    client, conn = Pipe()
+    server = Server(conn, workers)
+    th = Thread(target=server.run)
+    th.daemon = True
+    th.start()
+    return client
+
+
+def test_server_priority_and_cancel():
+    client = tserver()
+    send = lambda *msg: client.send_bytes(dumps(msg))
+    recv = lambda: tuple(loads(client.recv_bytes()))
+
+    send('configure', ({'sources': ['.']},), {})
+    assert recv() == (None, True)
+
+    send(1, 'eval', ('import time\ntime.sleep(0.3)\nreturn 1',), {})
+    time.sleep(0.1)
+    send(2, 'lint', ('import os', 'boo.py'), {})
+    send(3, 'lint', ('import sys', 'boo.py'), {})
+    send(4, 'assist', ('foo = 10\n', (2, 0), 'boo.py'), {})
+    send(0, 'cancel', (2,), {})
+
+    assert recv() == (1, 1, True)
+    rid, (_, names), is_ok = recv()
+    assert rid == 4 and 'foo' in names
+    assert recv()[0] == 3
+    assert not client.poll(0.1)
+
+    send('close', (), {})
+
+
+def test_remote_futures():
+    env = Environment()
+    env.configure({'sources': ['.']})
+    source, p = sp('''\
+        foo = 10
+        |
+    ''')
+    # both workers are busy, assist calls stay queued
+    slow = [env._call_future('eval', 'import time\ntime.sleep(0.3)') for _ in range(2)]
+    futures = [env.assist_future(source, p[0], 'boo.py') for _ in range(5)]
+    assert env.cancel(futures[0])
+    assert [r.result(5) for r in slow] == [None, None]
+    for f in futures[1:]:
+        assert 'foo' in f.result(5)[1]
+    assert futures[0].cancelled()
+    env.close()
+
+
+def test_reader_error_fails_pending_calls():
+    from multiprocessing import Pipe
+    from threading import Thread
+
+    env = Environment(timeout=0.2)
+    env.conn, server = Pipe()
+    env.reader_thread = Thread(target=env._read_responses, args=(env.conn,))
+    env.reader_thread.daemon = True
+    env.reader_thread.start()
+
+    with pytest.raises(TimeoutError):
+        env.eval('return 1')
+    assert server.recv_bytes()
+    assert server.recv_bytes()  # cancel of timed out call
+
+    future = env._call_future('eval', 'return 1')
+    server.send_bytes(b'\xc1')  # never used msgpack code
+    with pytest.raises(Exception):
+        future.result(5)
+    env.reader_thread.join(5)
+    assert not env.futures
+
+
+def test_server_calls_hold_project_lock(monkeypatch):
+    from supp import linter
+    from supp.server import Server
+
+    server = Server(None)
+    server.configure({'sources': ['.']})
+    owned = []
+    monkeypatch.setattr(linter, 'lint', lambda *args: owned.append(
+        server.project_lock._is_owned()) or [])
+    server.lint('import os', 'boo.py')
+    assert owned == [True]
+
+
+def test_codec_handshake():
+    from supp import codec
+    client = tserver()
+    client.send_bytes(dumps((1, 'handshake', (['unknown', 'umsgpack'],), {})))
+    assert loads(client.recv_bytes()) == [1, 'umsgpack', True]
+
+    fast = codec.available()[0]
+    client.send_bytes(dumps((2, 'handshake', ([fast.name],), {})))
+    assert loads(client.recv_bytes()) == [2, fast.name, True]
+
+    client.send_bytes(fast.dumps((3, 'eval', ('return (1, "boo")',), {})))
+    rid, result, is_ok = fast.loads(client.recv_bytes())
+    assert (rid, list(result), is_ok) == (3, [1, 'boo'], True)
+    client.send_bytes(fast.dumps(('close', (), {})))
+
+
+def test_codecs_decode_same_values():
+    from supp import codec
+    message = (1, [{'loc': (3, 4), 'file': None}, ('foo', [(1, 2)])], True)
+    expected = codec.DEFAULT.loads(codec.DEFAULT.dumps(message))
+    for c in codec.available():
+        assert c.loads(c.dumps(message)) == expected, c
+
+    source, p = sp('''\
+        foo = 10
+        f|oo
+    ''')
+    results = []
+    for c in codec.available():
+        env = Environment(codecs=[c.name])
+        env.configure({'sources': ['.']})
+        results.append(env.location(source, p[0], 'boo.py'))
+        env.close()
+    assert results == [results[0]] * len(results)
+
+
+def test_document_sync():
+    from supp.document import text_edits
+    env = Environment()
+    env.configure({'sources': ['.']})
+    source, p = sp('''\
+        foo = 10
+        |
+    ''')
+    env.doc_open('boo.py', '')
+    env.doc_change('boo.py', 1, text_edits('', source))
+    m, result = env.doc_assist('boo.py', 1, p[0])
+    assert 'foo' in result
+
+    new = source.replace('foo', 'bar')
+    env.doc_change('boo.py', 2, text_edits(source, new))
+    assert 'bar' in env.doc_assist('boo.py', 2, p[0])[1]
+    with pytest.raises(Exception, match='version'):
+        env.doc_assist('boo.py', 1, p[0])
+    env.close()
+
+
+def test_scheduled_lint_pushes_diagnostics():
+    from threading import Event
+    events = []
+    done = Event()
+
+    def on_event(event, payload):
+        events.append((event, list(payload)))
+        done.set()
+
+    env = Environment(on_event=on_event)
+    env.configure({'sources': ['.'], 'lint_delay': 0.01})
+    env.doc_open('boo.py', 'import os\n', 1)
+    env.schedule_lint('boo.py', 1)
+    assert done.wait(5)
+    event, (fname, version, result) = events[0]
+    assert (event, fname, version) == ('diagnostics', 'boo.py', 1)
+    assert [r[0] for r in result] == ['W02']
+    env.close()
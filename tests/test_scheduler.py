@@ -0,0 +1,56 @@
+import time
+from threading import Event
+
+from supp.scheduler import LintScheduler
+
+
+class Docs(object):
+    def __init__(self):
+        self.versions = {}
+        self.linted = []
+        self.published = []
+        self.busy = False
+        self.done = Event()
+
+    def lint(self, filename, version):
+        self.linted.append((filename, version))
+        return ['result', version]
+
+    def publish(self, filename, version, result):
+        self.published.append((filename, version, result))
+        self.done.set()
+
+    def scheduler(self, delay=0.02):
+        return LintScheduler(self.lint, self.publish, self.versions.get,
+                             lambda: self.busy, delay)
+
+
+def test_requests_are_coalesced():
+    docs = Docs()
+    scheduler = docs.scheduler()
+    for v in range(1, 4):
+        docs.versions['boo.py'] = v
+        scheduler.schedule('boo.py', v)
+
+    assert docs.done.wait(2)
+    time.sleep(0.05)
+    assert docs.published == [('boo.py', 3, ['result', 3])]
+    assert scheduler.stats()['coalesced'] == 2
+    scheduler.stop()
+
+
+def test_waits_for_interactive_and_drops_stale():
+    docs = Docs()
+    docs.busy = True
+    scheduler = docs.scheduler(0)
+    docs.versions['boo.py'] = 1
+    scheduler.schedule('boo.py', 1)
+    time.sleep(0.05)
+    assert docs.linted == []
+
+    docs.versions['boo.py'] = 2
+    docs.busy = False
+    time.sleep(0.05)
+    assert docs.linted == []
+    assert scheduler.stats()['dropped'] == 1
+    scheduler.stop()
@@ -768,3 +768,62 @@ def test_walrus():
 #     scope = create_scope(open('/usr/lib/python2.7/posixpath.py').read())
 #     print scope.flows[0]
 #     assert False
+
+
+def test_names_and_flows_have_no_dict():
+    scope, _ = csp('''\
+        import os
+        from os import path
+        def boo(a):
+            b = a
+            return b
+    ''')
+
+    names = [n for _, n in scope.all_names if type(n).__name__ != 'FuncScope']
+    assert {type(n).__name__ for n in names} == {
+        'ImportedName', 'AssignedName', 'ArgumentName'}
+    for n in names:
+        assert not hasattr(n, '__dict__')
+        assert not n.used
+    for f in scope._all_flows:
+        assert not hasattr(f, '__dict__')
+
+
+def test_flow_names_at_rebinding():
+    scope, p = csp('''\
+        foo = 1
+        bar = foo
+        |foo = 2
+        |boo = 3
+        |
+    ''')
+
+    flow = scope.flow
+    assert flow.names_at(p[0])['foo'].declared_at == (1, 0)
+    assert flow.names_at(p[1])['foo'].declared_at == (3, 0)
+    assert 'boo' not in flow.names_at(p[1])
+    assert flow.names_at(p[1]).get('boo') is None
+    assert nvalues(flow.names_at(p[2])) == {'foo': 2, 'bar': 'foo', 'boo': 3}
+
+    flow.add_name(AssignedName('baz', (3, 0), (3, 0), None))
+    assert 'baz' in flow.names_at(p[1])
+
+
+def test_join_materializes_only_branch_names():
+    from supp.merged_dict import MergedDict
+    scope, p = csp('''\
+        foo = 1
+        bar = 2
+        if foo:
+            boo = 3
+            bar = 4
+        else:
+            bar = 5
+        |
+    ''')
+
+    join = scope.flow
+    names = join.parent_names
+    assert type(names) is MergedDict
+    assert sorted(names._dicts[0]) == ['bar', 'boo']
+    assert nvalues(names) == {'foo': 1, 'bar': {4, 5}, 'boo': {3, 'undefined'}}
@@ -1,4 +1,7 @@
-from supp.util import unmark, SOURCE_MARK, get_marked_import, Source, split_pkg
+import pytest
+
+from supp.util import (unmark, SOURCE_MARK, get_marked_import, Source, split_pkg,
+                       node_at)
 from .helpers import sp
 
 
@@ -66,3 +69,39 @@ def test_split_pkg():
     assert split_pkg('..foo.boo') == ('..foo', 'boo')
     assert split_pkg('os.') == ('os', '')
     assert split_pkg('.boo.') == ('.boo', '')
+
+
+def test_node_at():
+    source, p = sp('''\
+        @de|co
+        def foo(a, b=boo.b|ar):
+            x = [i for i in range(b|az)]
+            return fo|o.attr(x, y=z)
+    ''')
+    tree = Source(source).tree
+    assert node_at(tree, p[0]).id == 'deco'
+    assert node_at(tree, p[1]).attr == 'bar'
+    assert node_at(tree, p[2]).id == 'baz'
+    assert node_at(tree, p[3]).id == 'foo'
+    assert node_at(tree, (4, 3)) is tree.body[0]
+
+
+def test_merged_dict():
+    from supp.merged_dict import MergedDict, FLATTEN_AFTER
+    parent = MergedDict({'a': 1}, {'a': 2, 'b': 3})
+    child = MergedDict({'c': 4}, parent)
+
+    assert child['a'] == 1
+    assert child.get('b') == 3
+    assert 'c' in child and 'd' not in child
+    assert child.get('d', 5) == 5
+    with pytest.raises(KeyError):
+        child['d']
+
+    for _ in range(FLATTEN_AFTER):
+        parent.get('b')
+    assert parent._flat == {'a': 1, 'b': 3}
+    assert child._flat is None
+    assert sorted(child.items()) == [('a', 1), ('b', 3), ('c', 4)]
+    assert sorted(child) == ['a', 'b', 'c']
+    assert len(child) == 3